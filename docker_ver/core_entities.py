@@ -10,7 +10,7 @@ NOTES:
 
 import time
 import hashlib
-from collections import deque
+from collections import OrderedDict
 
 class Message:
     """
@@ -24,6 +24,9 @@ class Message:
         has_been_read (bool): Whether the message has been read
         timestamp (int): Unix timestamp of when the message was sent
     """
+    # Slots instead of a per-instance __dict__: a node can hold millions of messages
+    __slots__ = ("uid", "contents", "sender_id", "receiver_id", "has_been_read", "timestamp")
+
     def __init__(self, uid: int, contents: str, sender_id: int, receiver_id: int, 
                  has_been_read: bool = False, timestamp: int = None):
         self.uid = uid
@@ -41,37 +44,39 @@ class User:
         user_id (int): Unique identifier for the user
         username (str): User's chosen username
         password_hash (str): SHA-256 hash of the user's password
-        unread_messages (deque): Queue of unread message UIDs
-        recent_conversants (list): List of recent user IDs ordered by message recency
+        unread_messages (OrderedDict): Unread message UIDs, oldest first, as an
+            ordered set (values unused): FIFO pop, removal and membership are O(1)
+        recent_conversants (OrderedDict): Recent user IDs, most recent first, as
+            an ordered set; moving one to the front is O(1)
     """
+    __slots__ = ("userID", "username", "passwordHash", "unread_messages", "recent_conversants")
+
     def __init__(self, userID: int, username: str, passwordHash: str):
         self.userID = userID
         self.username = username
         self.passwordHash = passwordHash
-        self.unread_messages = deque()
-        self.recent_conversants = []
+        self.unread_messages: "OrderedDict[int, None]" = OrderedDict()
+        self.recent_conversants: "OrderedDict[int, None]" = OrderedDict()
 
     def add_unread_message(self, message_uid: int):
         """Add a message UID to the unread messages queue."""
-        self.unread_messages.append(message_uid)
+        self.unread_messages[message_uid] = None
     
     def mark_message_read(self, message_uid: int) -> bool:
         """
         Mark a message as read and remove it from the unread queue.
         Returns True if the message was found and marked as read.
         """
-        try:
-            self.unread_messages.remove(message_uid)
-            return True
-        except ValueError:
+        if message_uid not in self.unread_messages:
             return False
+        del self.unread_messages[message_uid]
+        return True
     
     def update_recent_conversant(self, user_id: int):
         """
         Update the recent conversants list.
         Moves the given user_id to the front if it exists, otherwise adds it.
         """
-        if user_id in self.recent_conversants:
-            self.recent_conversants.remove(user_id)
-        self.recent_conversants.insert(0, user_id)
+        self.recent_conversants[user_id] = None
+        self.recent_conversants.move_to_end(user_id, last=False)
 
@@ -1,9 +1,91 @@
-from typing import Dict, List, Tuple, Optional, Set, Union
-from collections import defaultdict
+import re
+import bisect
+import functools
+import itertools
+import threading
+from typing import Any, Callable, Dict, List, Tuple, Optional, Set, Union
+from collections import OrderedDict, defaultdict
 from core_entities import User, Message
 # from tst_implementation import TernarySearchTree
 
 
+_MISSING = object()
+
+
+class LRUStore:
+    """
+    Dict-like cache in front of a backing store. Keys that are not held are
+    fetched through `loader` (a result of None means the key does not exist),
+    and once more than `capacity` entries are held the least recently used are
+    evicted. With no loader and no capacity it behaves like a plain dict.
+    """
+    def __init__(self, loader: Optional[Callable[[Any], Any]] = None, capacity: Optional[int] = None,
+                 load_lock: Optional[threading.RLock] = None):
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+        self._loader = loader
+        self._capacity = capacity
+        self._lock = threading.RLock()
+        # Held across a load and the insert that follows it, so that writers
+        # holding the same lock never interleave with a load
+        self._load_lock = load_lock if load_lock is not None else threading.RLock()
+
+    def peek(self, key, default=None):
+        """Return the cached value for key without loading it or refreshing its recency."""
+        with self._lock:
+            return self._entries.get(key, default)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if self._loader is None:
+            return default
+
+        with self._load_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key]
+            value = self._loader(key)
+            if value is None:
+                return default
+            self[key] = value
+            return value
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if self._capacity is not None:
+                while len(self._entries) > self._capacity:
+                    self._entries.popitem(last=False)
+
+    def __delitem__(self, key):
+        # The entry may already have been evicted; the backing store is updated separately
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        """Number of entries currently held in memory."""
+        with self._lock:
+            return len(self._entries)
+
+    def keys(self) -> List[Any]:
+        """Keys currently held in memory."""
+        with self._lock:
+            return list(self._entries.keys())
+
+
 class GlobalUserBase:
     """
     Maps user IDs to User instances. Provides the primary storage for user data
@@ -22,22 +104,96 @@ class GlobalUserBase:
     # def __init__(self):
         # self.trie: TernarySearchTree[User] = TernarySearchTree[User]()
 class GlobalUserTrie:
+    """
+    Username index: maps usernames to users, and keeps the usernames sorted so
+    a wildcard query (* for any sequence, ? for any character) only scans the
+    range that starts with the pattern's literal prefix.
+    """
+    # New usernames wait in _pending until a query; beyond this many they are
+    # merged with one sort instead of one insort each
+    MAX_INSORTS = 64
+
     def __init__(self):
-        self.store = {}
+        self.store: Dict[str, User] = {}
+        self._names: List[str] = []  # Sorted
+        self._pending: List[str] = []  # Added since the last query
+        self._lock = threading.Lock()
     
     def add(self, word: str, value: User):
-        self.store[word] = value
+        with self._lock:
+            if word not in self.store:
+                self._pending.append(word)
+            self.store[word] = value
     
     def get(self, word: str) -> Optional[User]:
         return self.store.get(word)
     
-    def regex_search(self, pattern: str, return_values: bool = False) -> List[Union[str, User]]:
-        # Very basic search for debugging purposes
-        results = []
-        for key, value in self.store.items():
-            if re.fullmatch(pattern.replace("*", ".*").replace("?", "."), key):
-                results.append(value if return_values else key)
-        return results
+    def delete(self, word: str):
+        with self._lock:
+            if self.store.pop(word, None) is None:
+                return
+            if word in self._pending:
+                self._pending.remove(word)
+                return
+            i = bisect.bisect_left(self._names, word)
+            del self._names[i]
+    
+    def _merge_pending(self):
+        # Called with _lock held
+        if len(self._pending) > self.MAX_INSORTS:
+            self._names.extend(self._pending)
+            self._names.sort()
+        else:
+            for word in self._pending:
+                bisect.insort(self._names, word)
+        self._pending.clear()
+    
+    def regex_search(self, pattern: str, return_values: bool = False, limit: Optional[int] = None,
+                     after: Optional[str] = None) -> List[Union[str, User]]:
+        """
+        Return the usernames (or users) matching a wildcard pattern, in username
+        order: at most `limit` of them, and only those after `after` if given.
+        """
+        prefix, matcher = _compile_wildcard(pattern)
+        with self._lock:
+            if self._pending:
+                self._merge_pending()
+            names = self._names
+            lo = bisect.bisect_left(names, prefix)
+            if after is not None and after >= prefix:
+                lo = bisect.bisect_right(names, after)
+            if prefix == pattern:
+                hi = bisect.bisect_right(names, prefix)  # No wildcards: at most the name itself
+            else:
+                hi = bisect.bisect_left(names, _prefix_end(prefix)) if prefix else len(names)
+            if matcher is None:
+                # The whole range matches
+                keys = names[lo:hi if limit is None else min(hi, lo + limit)]
+            else:
+                keys = list(itertools.islice(filter(matcher, names[lo:hi]), limit))
+            return [self.store[key] for key in keys] if return_values else keys
+
+
+def _prefix_end(prefix: str) -> str:
+    """The lowest string above every string that starts with prefix."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_wildcard(pattern: str) -> Tuple[str, Optional[Callable[[str], Any]]]:
+    """
+    Split a wildcard pattern into its literal prefix and a matcher for whole
+    usernames, or None if every username with the prefix matches (the pattern
+    is literal, or ends in its first *).
+    """
+    i = 0
+    while i < len(pattern) and pattern[i] not in "*?":
+        i += 1
+    prefix = pattern[:i]
+    if pattern[i:] == "*" * (len(pattern) - i):
+        return prefix, None
+    regex = "".join(".*" if c == "*" else "." if c == "?" else re.escape(c) for c in pattern)
+    return prefix, re.compile(regex, re.DOTALL).fullmatch
 
 
         
@@ -54,18 +210,200 @@ class GlobalMessageBase:
     """
     Maps message UIDs to Message instances. Provides the primary storage for
     message data and manages message ID generation.
+
+    Given a loader, messages not in memory are fetched on first access and at
+    most `capacity` of them are kept.
     """
-    def __init__(self):
-        self.messages: Dict[int, Message] = {}
+    def __init__(self, loader: Optional[Callable[[int], Optional[Message]]] = None,
+                 capacity: Optional[int] = None, load_lock: Optional[threading.RLock] = None):
+        self.messages: LRUStore = LRUStore(loader, capacity, load_lock)
         self._next_message_id = 1
         self._deleted_message_ids: Set[int] = set()
 
+# Rough per-message cost of a cached Message beyond its text, used for the memory budget
+MESSAGE_OVERHEAD_BYTES = 200
+
+
+def message_size(message: Message) -> int:
+    return MESSAGE_OVERHEAD_BYTES + len(message.contents)
+
+
+class ConversationWindow:
+    """
+    The most recent messages of one conversation, oldest first. If `complete`
+    is set the window holds the whole conversation; otherwise older messages
+    exist only in the backing store.
+    """
+    def __init__(self, messages: List[Message], complete: bool):
+        self.messages = messages
+        self.ids = [message.uid for message in messages]  # Parallel to messages, for bisect
+        self.complete = complete
+        self.size = sum(message_size(message) for message in messages)
+
+
 class GlobalConversations:
     """
-    Maps user ID pairs to lists of messages between those users. Maintains
-    the conversation history between any two users.
+    Maps user ID pairs to the messages between those users. Maintains the
+    conversation history between any two users.
+
+    Only recently used conversations are kept in memory, each as a window of at
+    most `window` of its newest messages, and the least recently used are
+    evicted once the cached messages exceed `memory_budget` bytes. Pages a
+    window can't answer are read through `pager`. Without a pager, budget or
+    window, every conversation is held in full.
+
+    `pager(key, before_id, after_id, limit)` must return, oldest first, the
+    earliest `limit` messages after `after_id` if it is given, otherwise the
+    latest `limit` messages before `before_id` (None meaning unbounded).
     """
-    def __init__(self):
-        self.conversations: Dict[Tuple[int, int], List[Message]] = defaultdict(list)
+    def __init__(self, pager: Optional[Callable[..., List[Message]]] = None, window: Optional[int] = None,
+                 memory_budget: Optional[int] = None, load_lock: Optional[threading.RLock] = None):
+        self.conversations: "OrderedDict[Tuple[int, int], ConversationWindow]" = OrderedDict()
+        self._pager = pager
+        self._window = window
+        self._memory_budget = memory_budget
+        self._cached_bytes = 0
+        self._lock = threading.RLock()
+        # Held across a load and the insert that follows it, so that writers
+        # holding the same lock never interleave with a load
+        self._load_lock = load_lock if load_lock is not None else threading.RLock()
+
+    def page(self, key: Tuple[int, int], before_id: Optional[int] = None, after_id: Optional[int] = None,
+             limit: Optional[int] = None) -> List[Message]:
+        """
+        Return part of a conversation, oldest first.
+
+        With after_id, the earliest `limit` messages newer than it (and older
+        than before_id, if given); otherwise the latest `limit` messages older
+        than before_id. A limit of None returns every matching message.
+        """
+        with self._lock:
+            window = self._touch(key)
+            if window is not None:
+                result = self._slice(window, before_id, after_id, limit)
+                if result is not None:
+                    return result
+
+        if self._pager is None:
+            return []
+
+        with self._load_lock:
+            with self._lock:
+                window = self._touch(key)
+                if window is None:
+                    window = self._load_window(key)
+                result = self._slice(window, before_id, after_id, limit)
+                if result is not None:
+                    return result
+
+            # Older than anything held in memory: read the page straight from the store
+            return self._pager(key, before_id, after_id, limit)
+
+    def set_conversation(self, key: Tuple[int, int], messages: List[Message]):
+        """Cache a whole conversation, oldest first."""
+        with self._lock:
+            self._store(key, ConversationWindow(messages, complete=True))
+
+    def add_message(self, key: Tuple[int, int], message: Message):
+        """Add a newly stored message to the conversation if it is in memory."""
+        with self._lock:
+            window = self.conversations.get(key)
+            if window is None:
+                return
+            position = bisect.bisect_left(window.ids, message.uid)
+            if position == 0 and window.ids and not window.complete:
+                return  # Older than the window; only the store has it
+            window.messages.insert(position, message)
+            window.ids.insert(position, message.uid)
+            window.size += message_size(message)
+            self._cached_bytes += message_size(message)
+            self._trim(window)
+            self._evict()
+
+    def remove_message(self, key: Tuple[int, int], message_id: int):
+        """Drop a deleted message from the conversation if it is in memory."""
+        with self._lock:
+            window = self.conversations.get(key)
+            if window is None:
+                return
+            position = bisect.bisect_left(window.ids, message_id)
+            if position < len(window.ids) and window.ids[position] == message_id:
+                removed = window.messages.pop(position)
+                del window.ids[position]
+                window.size -= message_size(removed)
+                self._cached_bytes -= message_size(removed)
+
+    def keys(self) -> List[Tuple[int, int]]:
+        """Conversations currently held in memory."""
+        with self._lock:
+            return list(self.conversations.keys())
+
+    @property
+    def cached_bytes(self) -> int:
+        """Estimated memory held by cached messages."""
+        return self._cached_bytes
+
+    def _touch(self, key: Tuple[int, int]) -> Optional[ConversationWindow]:
+        window = self.conversations.get(key)
+        if window is not None:
+            self.conversations.move_to_end(key)
+        return window
+
+    def _load_window(self, key: Tuple[int, int]) -> ConversationWindow:
+        """Read the newest messages of a conversation from the store and cache them."""
+        if self._window is None:
+            window = ConversationWindow(self._pager(key, None, None, None), complete=True)
+        else:
+            # Ask for one extra message to learn whether the window holds everything
+            messages = self._pager(key, None, None, self._window + 1)
+            complete = len(messages) <= self._window
+            window = ConversationWindow(messages[-self._window:] if self._window else [], complete)
+        self._store(key, window)
+        return window
+
+    def _store(self, key: Tuple[int, int], window: ConversationWindow):
+        previous = self.conversations.pop(key, None)
+        if previous is not None:
+            self._cached_bytes -= previous.size
+        self.conversations[key] = window
+        self._cached_bytes += window.size
+        self._trim(window)
+        self._evict()
+
+    def _slice(self, window: ConversationWindow, before_id: Optional[int], after_id: Optional[int],
+               limit: Optional[int]) -> Optional[List[Message]]:
+        """Answer a page from the window, or return None if it may need older messages."""
+        end = len(window.ids) if before_id is None else bisect.bisect_left(window.ids, before_id)
+        if after_id is not None:
+            start = bisect.bisect_right(window.ids, after_id)
+            if not window.complete and (not window.ids or after_id + 1 < window.ids[0]):
+                return None
+            stop = end if limit is None else min(end, start + limit)
+            return window.messages[start:stop]
+        if limit is None:
+            return window.messages[:end] if window.complete else None
+        if end < limit and not window.complete:
+            return None
+        return window.messages[max(0, end - limit):end]
+
+    def _trim(self, window: ConversationWindow):
+        """Drop the oldest messages of a window beyond the per-conversation limit."""
+        if self._window is None or len(window.messages) <= self._window:
+            return
+        excess = len(window.messages) - self._window
+        dropped = sum(message_size(message) for message in window.messages[:excess])
+        del window.messages[:excess]
+        del window.ids[:excess]
+        window.size -= dropped
+        self._cached_bytes -= dropped
+        window.complete = False
+
+    def _evict(self):
+        """Evict least recently used conversations until the cache fits the memory budget."""
+        if self._memory_budget is None:
+            return
+        while self._cached_bytes > self._memory_budget and self.conversations:
+            _, window = self.conversations.popitem(last=False)
+            self._cached_bytes -= window.size
 
         
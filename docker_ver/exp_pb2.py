@@ -24,17 +24,19 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\texp.proto\x12\tmessaging\"?\n\x14\x43reateAccountRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x15\n\rpassword_hash\x18\x02 \x01(\x0c\".\n\x15\x43reateAccountResponse\x12\x15\n\rsession_token\x18\x01 \x01(\x0c\"7\n\x0cLoginRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x15\n\rpassword_hash\x18\x02 \x01(\x0c\"_\n\rLoginResponse\x12!\n\x06status\x18\x01 \x01(\x0e\x32\x11.messaging.Status\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x14\n\x0cunread_count\x18\x03 \x01(\r\"O\n\x13ListAccountsRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x10\n\x08wildcard\x18\x03 \x01(\t\"@\n\x14ListAccountsResponse\x12\x15\n\raccount_count\x18\x01 \x01(\r\x12\x11\n\tusernames\x18\x02 \x03(\t\"[\n\x1a\x44isplayConversationRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x15\n\rconversant_id\x18\x03 \x01(\r\"O\n\x13\x43onversationMessage\x12\x12\n\nmessage_id\x18\x01 \x01(\r\x12\x13\n\x0bsender_flag\x18\x02 \x01(\x08\x12\x0f\n\x07\x63ontent\x18\x03 \x01(\t\"f\n\x1b\x44isplayConversationResponse\x12\x15\n\rmessage_count\x18\x01 \x01(\r\x12\x30\n\x08messages\x18\x02 \x03(\x0b\x32\x1e.messaging.ConversationMessage\"w\n\x12SendMessageRequest\x12\x16\n\x0esender_user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x19\n\x11recipient_user_id\x18\x03 \x01(\r\x12\x17\n\x0fmessage_content\x18\x04 \x01(\t\"\x15\n\x13SendMessageResponse\"]\n\x13ReadMessagesRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x1e\n\x16number_of_messages_req\x18\x03 \x01(\r\"\x16\n\x14ReadMessagesResponse\"S\n\x14\x44\x65leteMessageRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x13\n\x0bmessage_uid\x18\x02 \x01(\r\x12\x15\n\rsession_token\x18\x03 \x01(\x0c\"\x17\n\x15\x44\x65leteMessageResponse\">\n\x14\x44\x65leteAccountRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\"\x17\n\x15\x44\x65leteAccountResponse\"B\n\x18GetUnreadMessagesRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\"P\n\x11UnreadMessageInfo\x12\x13\n\x0bmessage_uid\x18\x01 \x01(\r\x12\x11\n\tsender_id\x18\x02 \x01(\r\x12\x13\n\x0breceiver_id\x18\x03 \x01(\r\"Z\n\x19GetUnreadMessagesResponse\x12\r\n\x05\x63ount\x18\x01 \x01(\r\x12.\n\x08messages\x18\x02 \x03(\x0b\x32\x1c.messaging.UnreadMessageInfo\"[\n\x1cGetMessageInformationRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x13\n\x0bmessage_uid\x18\x03 \x01(\r\"v\n\x1dGetMessageInformationResponse\x12\x11\n\tread_flag\x18\x01 \x01(\x08\x12\x11\n\tsender_id\x18\x02 \x01(\r\x12\x16\n\x0e\x63ontent_length\x18\x03 \x01(\r\x12\x17\n\x0fmessage_content\x18\x04 \x01(\t\")\n\x16GetUsernameByIDRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\"+\n\x17GetUsernameByIDResponse\x12\x10\n\x08username\x18\x01 \x01(\t\"W\n\x18MarkMessageAsReadRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x13\n\x0bmessage_uid\x18\x03 \x01(\r\"\x1b\n\x19MarkMessageAsReadResponse\",\n\x18GetUserByUsernameRequest\x12\x10\n\x08username\x18\x01 \x01(\t\"T\n\x19GetUserByUsernameResponse\x12&\n\x06status\x18\x01 \x01(\x0e\x32\x16.messaging.FoundStatus\x12\x0f\n\x07user_id\x18\x02 \x01(\r\"g\n\x12RequestVoteRequest\x12\x0c\n\x04term\x18\x01 \x01(\x04\x12\x14\n\x0c\x63\x61ndidate_id\x18\x02 \x01(\t\x12\x16\n\x0elast_log_index\x18\x03 \x01(\x03\x12\x15\n\rlast_log_term\x18\x04 \x01(\x04\"9\n\x13RequestVoteResponse\x12\x0c\n\x04term\x18\x01 \x01(\x04\x12\x14\n\x0cvote_granted\x18\x02 \x01(\x08\")\n\x08LogEntry\x12\x0c\n\x04term\x18\x01 \x01(\x04\x12\x0f\n\x07\x63ommand\x18\x02 \x01(\t\"\xa3\x01\n\x14\x41ppendEntriesRequest\x12\x0c\n\x04term\x18\x01 \x01(\x04\x12\x11\n\tleader_id\x18\x02 \x01(\t\x12\x16\n\x0eprev_log_index\x18\x03 \x01(\x03\x12\x15\n\rprev_log_term\x18\x04 \x01(\x04\x12$\n\x07\x65ntries\x18\x05 \x03(\x0b\x32\x13.messaging.LogEntry\x12\x15\n\rleader_commit\x18\x06 \x01(\x03\"6\n\x15\x41ppendEntriesResponse\x12\x0c\n\x04term\x18\x01 \x01(\x04\x12\x0f\n\x07success\x18\x02 \x01(\x08\"\x13\n\x11LeaderPingRequest\"\x14\n\x12LeaderPingResponse*0\n\x06Status\x12\x12\n\x0eSTATUS_SUCCESS\x10\x00\x12\x12\n\x0eSTATUS_FAILURE\x10\x01*\'\n\x0b\x46oundStatus\x12\t\n\x05\x46OUND\x10\x00\x12\r\n\tNOT_FOUND\x10\x01\x32\xd1\t\n\x10MessagingService\x12R\n\rCreateAccount\x12\x1f.messaging.CreateAccountRequest\x1a .messaging.CreateAccountResponse\x12:\n\x05Login\x12\x17.messaging.LoginRequest\x1a\x18.messaging.LoginResponse\x12O\n\x0cListAccounts\x12\x1e.messaging.ListAccountsRequest\x1a\x1f.messaging.ListAccountsResponse\x12\x64\n\x13\x44isplayConversation\x12%.messaging.DisplayConversationRequest\x1a&.messaging.DisplayConversationResponse\x12L\n\x0bSendMessage\x12\x1d.messaging.SendMessageRequest\x1a\x1e.messaging.SendMessageResponse\x12O\n\x0cReadMessages\x12\x1e.messaging.ReadMessagesRequest\x1a\x1f.messaging.ReadMessagesResponse\x12R\n\rDeleteMessage\x12\x1f.messaging.DeleteMessageRequest\x1a .messaging.DeleteMessageResponse\x12R\n\rDeleteAccount\x12\x1f.messaging.DeleteAccountRequest\x1a .messaging.DeleteAccountResponse\x12^\n\x11GetUnreadMessages\x12#.messaging.GetUnreadMessagesRequest\x1a$.messaging.GetUnreadMessagesResponse\x12j\n\x15GetMessageInformation\x12\'.messaging.GetMessageInformationRequest\x1a(.messaging.GetMessageInformationResponse\x12X\n\x0fGetUsernameByID\x12!.messaging.GetUsernameByIDRequest\x1a\".messaging.GetUsernameByIDResponse\x12^\n\x11MarkMessageAsRead\x12#.messaging.MarkMessageAsReadRequest\x1a$.messaging.MarkMessageAsReadResponse\x12^\n\x11GetUserByUsername\x12#.messaging.GetUserByUsernameRequest\x1a$.messaging.GetUserByUsernameResponse\x12I\n\nLeaderPing\x12\x1c.messaging.LeaderPingRequest\x1a\x1d.messaging.LeaderPingResponse2\xaf\x01\n\x0bRaftService\x12L\n\x0bRequestVote\x12\x1d.messaging.RequestVoteRequest\x1a\x1e.messaging.RequestVoteResponse\x12R\n\rAppendEntries\x12\x1f.messaging.AppendEntriesRequest\x1a .messaging.AppendEntriesResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\texp.proto\x12\tmessaging\"?\n\x14\x43reateAccountRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x15\n\rpassword_hash\x18\x02 \x01(\x0c\".\n\x15\x43reateAccountResponse\x12\x15\n\rsession_token\x18\x01 \x01(\x0c\"7\n\x0cLoginRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x15\n\rpassword_hash\x18\x02 \x01(\x0c\"_\n\rLoginResponse\x12!\n\x06status\x18\x01 \x01(\x0e\x32\x11.messaging.Status\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x14\n\x0cunread_count\x18\x03 \x01(\r\"v\n\x13ListAccountsRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x10\n\x08wildcard\x18\x03 \x01(\t\x12\r\n\x05limit\x18\x04 \x01(\r\x12\x16\n\x0e\x61\x66ter_username\x18\x05 \x01(\t\"d\n\x14ListAccountsResponse\x12\x15\n\raccount_count\x18\x01 \x01(\r\x12\x11\n\tusernames\x18\x02 \x03(\t\x12\x10\n\x08has_more\x18\x03 \x01(\x08\x12\x10\n\x08user_ids\x18\x04 \x03(\r\"\xe9\x01\n\x1a\x44isplayConversationRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x15\n\rconversant_id\x18\x03 \x01(\r\x12\x1e\n\x11\x62\x65\x66ore_message_id\x18\x04 \x01(\rH\x00\x88\x01\x01\x12\x1d\n\x10\x61\x66ter_message_id\x18\x05 \x01(\rH\x01\x88\x01\x01\x12\r\n\x05limit\x18\x06 \x01(\r\x12\x13\n\x0b\x61llow_stale\x18\x07 \x01(\x08\x42\x14\n\x12_before_message_idB\x13\n\x11_after_message_id\"O\n\x13\x43onversationMessage\x12\x12\n\nmessage_id\x18\x01 \x01(\r\x12\x13\n\x0bsender_flag\x18\x02 \x01(\x08\x12\x0f\n\x07\x63ontent\x18\x03 \x01(\t\"x\n\x1b\x44isplayConversationResponse\x12\x15\n\rmessage_count\x18\x01 \x01(\r\x12\x30\n\x08messages\x18\x02 \x03(\x0b\x32\x1e.messaging.ConversationMessage\x12\x10\n\x08has_more\x18\x03 \x01(\x08\"w\n\x12SendMessageRequest\x12\x16\n\x0esender_user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x19\n\x11recipient_user_id\x18\x03 \x01(\r\x12\x17\n\x0fmessage_content\x18\x04 \x01(\t\"\x15\n\x13SendMessageResponse\"]\n\x13ReadMessagesRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x1e\n\x16number_of_messages_req\x18\x03 \x01(\r\"\x16\n\x14ReadMessagesResponse\"S\n\x14\x44\x65leteMessageRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x13\n\x0bmessage_uid\x18\x02 \x01(\r\x12\x15\n\rsession_token\x18\x03 \x01(\x0c\"\x17\n\x15\x44\x65leteMessageResponse\">\n\x14\x44\x65leteAccountRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\"\x17\n\x15\x44\x65leteAccountResponse\"W\n\x18GetUnreadMessagesRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x13\n\x0b\x61llow_stale\x18\x03 \x01(\x08\"P\n\x11UnreadMessageInfo\x12\x13\n\x0bmessage_uid\x18\x01 \x01(\r\x12\x11\n\tsender_id\x18\x02 \x01(\r\x12\x13\n\x0breceiver_id\x18\x03 \x01(\r\"Z\n\x19GetUnreadMessagesResponse\x12\r\n\x05\x63ount\x18\x01 \x01(\r\x12.\n\x08messages\x18\x02 \x03(\x0b\x32\x1c.messaging.UnreadMessageInfo\"p\n\x1cGetMessageInformationRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x13\n\x0bmessage_uid\x18\x03 \x01(\r\x12\x13\n\x0b\x61llow_stale\x18\x04 \x01(\x08\"v\n\x1dGetMessageInformationResponse\x12\x11\n\tread_flag\x18\x01 \x01(\x08\x12\x11\n\tsender_id\x18\x02 \x01(\r\x12\x16\n\x0e\x63ontent_length\x18\x03 \x01(\r\x12\x17\n\x0fmessage_content\x18\x04 \x01(\t\")\n\x16GetUsernameByIDRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\"+\n\x17GetUsernameByIDResponse\x12\x10\n\x08username\x18\x01 \x01(\t\"W\n\x18MarkMessageAsReadRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x13\n\x0bmessage_uid\x18\x03 \x01(\r\"\x1b\n\x19MarkMessageAsReadResponse\",\n\x18GetUserByUsernameRequest\x12\x10\n\x08username\x18\x01 \x01(\t\"T\n\x19GetUserByUsernameResponse\x12&\n\x06status\x18\x01 \x01(\x0e\x32\x16.messaging.FoundStatus\x12\x0f\n\x07user_id\x18\x02 \x01(\r\"f\n\x10SubscribeRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12\x19\n\x0cresume_after\x18\x03 \x01(\x04H\x00\x88\x01\x01\x42\x0f\n\r_resume_after\"\xcd\x01\n\tUserEvent\x12\x0e\n\x06offset\x18\x01 \x01(\x04\x12&\n\x04type\x18\x02 \x01(\x0e\x32\x18.messaging.UserEventType\x12\x13\n\x0bmessage_ids\x18\x03 \x03(\r\x12\x11\n\tsender_id\x18\x04 \x01(\r\x12\x13\n\x0breceiver_id\x18\x05 \x01(\r\x12\x0f\n\x07\x63ontent\x18\x06 \x01(\t\x12\x14\n\x0cunread_count\x18\x07 \x01(\r\x12\x12\n\naccount_id\x18\x08 \x01(\r\x12\x10\n\x08username\x18\t \x01(\t\"E\n\x0fOutgoingMessage\x12\x19\n\x11recipient_user_id\x18\x01 \x01(\r\x12\x17\n\x0fmessage_content\x18\x02 \x01(\t\"r\n\x13SendMessagesRequest\x12\x16\n\x0esender_user_id\x18\x01 \x01(\r\x12\x15\n\rsession_token\x18\x02 \x01(\x0c\x12,\n\x08messages\x18\x03 \x03(\x0b\x32\x1a.messaging.OutgoingMessage\"+\n\x14SendMessagesResponse\x12\x13\n\x0bmessage_ids\x18\x01 \x03(\r\"y\n\x12RequestVoteRequest\x12\x0c\n\x04term\x18\x01 \x01(\x04\x12\x14\n\x0c\x63\x61ndidate_id\x18\x02 \x01(\t\x12\x16\n\x0elast_log_index\x18\x03 \x01(\x03\x12\x15\n\rlast_log_term\x18\x04 \x01(\x04\x12\x10\n\x08group_id\x18\x05 \x01(\r\"9\n\x13RequestVoteResponse\x12\x0c\n\x04term\x18\x01 \x01(\x04\x12\x14\n\x0cvote_granted\x18\x02 \x01(\x08\")\n\x08LogEntry\x12\x0c\n\x04term\x18\x01 \x01(\x04\x12\x0f\n\x07\x63ommand\x18\x02 \x01(\x0c\"\xc9\x03\n\x07\x43ommand\x12&\n\x04noop\x18\x01 \x01(\x0b\x32\x16.messaging.NoopCommandH\x00\x12\x39\n\x0e\x63reate_account\x18\x02 \x01(\x0b\x32\x1f.messaging.CreateAccountCommandH\x00\x12\x39\n\x0e\x63reate_session\x18\x03 \x01(\x0b\x32\x1f.messaging.CreateSessionCommandH\x00\x12\x35\n\x0csend_message\x18\x04 \x01(\x0b\x32\x1d.messaging.SendMessageCommandH\x00\x12\x37\n\rread_messages\x18\x05 \x01(\x0b\x32\x1e.messaging.ReadMessagesCommandH\x00\x12/\n\tmark_read\x18\x06 \x01(\x0b\x32\x1a.messaging.MarkReadCommandH\x00\x12\x39\n\x0e\x64\x65lete_message\x18\x07 \x01(\x0b\x32\x1f.messaging.DeleteMessageCommandH\x00\x12\x39\n\x0e\x64\x65lete_account\x18\x08 \x01(\x0b\x32\x1f.messaging.DeleteAccountCommandH\x00\x42\t\n\x07\x63ommand\"\r\n\x0bNoopCommand\"z\n\x14\x43reateAccountCommand\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x15\n\rpassword_hash\x18\x02 \x01(\t\x12\x0f\n\x07user_id\x18\x03 \x01(\x04\x12\x15\n\rsession_token\x18\x04 \x01(\t\x12\x11\n\ttimestamp\x18\x05 \x01(\x03\">\n\x14\x43reateSessionCommand\x12\x0f\n\x07user_id\x18\x01 \x01(\x04\x12\x15\n\rsession_token\x18\x02 \x01(\t\"\x88\x01\n\x12SendMessageCommand\x12\x11\n\tsender_id\x18\x01 \x01(\x04\x12\x13\n\x0breceiver_id\x18\x02 \x01(\x04\x12\x0f\n\x07\x63ontent\x18\x03 \x01(\t\x12\x11\n\ttimestamp\x18\x04 \x01(\x03\x12\x17\n\nmessage_id\x18\x05 \x01(\x04H\x00\x88\x01\x01\x42\r\n\x0b_message_id\"H\n\x13ReadMessagesCommand\x12\x0f\n\x07user_id\x18\x01 \x01(\x04\x12\r\n\x05\x63ount\x18\x02 \x01(\r\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\"I\n\x0fMarkReadCommand\x12\x0f\n\x07user_id\x18\x01 \x01(\x04\x12\x12\n\nmessage_id\x18\x02 \x01(\x04\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\"\x8d\x01\n\x14\x44\x65leteMessageCommand\x12\x12\n\nmessage_id\x18\x01 \x01(\x04\x12\x11\n\ttimestamp\x18\x02 \x01(\x03\x12\x16\n\tsender_id\x18\x03 \x01(\x04H\x00\x88\x01\x01\x12\x18\n\x0breceiver_id\x18\x04 \x01(\x04H\x01\x88\x01\x01\x42\x0c\n\n_sender_idB\x0e\n\x0c_receiver_id\":\n\x14\x44\x65leteAccountCommand\x12\x0f\n\x07user_id\x18\x01 \x01(\x04\x12\x11\n\ttimestamp\x18\x02 \x01(\x03\"\xb5\x01\n\x14\x41ppendEntriesRequest\x12\x0c\n\x04term\x18\x01 \x01(\x04\x12\x11\n\tleader_id\x18\x02 \x01(\t\x12\x16\n\x0eprev_log_index\x18\x03 \x01(\x03\x12\x15\n\rprev_log_term\x18\x04 \x01(\x04\x12$\n\x07\x65ntries\x18\x05 \x03(\x0b\x32\x13.messaging.LogEntry\x12\x15\n\rleader_commit\x18\x06 \x01(\x03\x12\x10\n\x08group_id\x18\x07 \x01(\r\"e\n\x15\x41ppendEntriesResponse\x12\x0c\n\x04term\x18\x01 \x01(\x04\x12\x0f\n\x07success\x18\x02 \x01(\x08\x12\x15\n\rconflict_term\x18\x03 \x01(\x04\x12\x16\n\x0e\x63onflict_index\x18\x04 \x01(\x03\"\xb0\x01\n\x16InstallSnapshotRequest\x12\x0c\n\x04term\x18\x01 \x01(\x04\x12\x11\n\tleader_id\x18\x02 \x01(\t\x12\x1b\n\x13last_included_index\x18\x03 \x01(\x03\x12\x1a\n\x12last_included_term\x18\x04 \x01(\x04\x12\x0e\n\x06offset\x18\x05 \x01(\x03\x12\x0c\n\x04\x64\x61ta\x18\x06 \x01(\x0c\x12\x0c\n\x04\x64one\x18\x07 \x01(\x08\x12\x10\n\x08group_id\x18\x08 \x01(\r\"8\n\x17InstallSnapshotResponse\x12\x0c\n\x04term\x18\x01 \x01(\x04\x12\x0f\n\x07success\x18\x02 \x01(\x08\"2\n\x10ReadIndexRequest\x12\x0c\n\x04term\x18\x01 \x01(\x04\x12\x10\n\x08group_id\x18\x02 \x01(\r\"F\n\x11ReadIndexResponse\x12\x0c\n\x04term\x18\x01 \x01(\x04\x12\x0f\n\x07success\x18\x02 \x01(\x08\x12\x12\n\nread_index\x18\x03 \x01(\x03\"E\n\x0eProposeRequest\x12\x10\n\x08group_id\x18\x01 \x01(\r\x12\x0f\n\x07\x63ommand\x18\x02 \x01(\x0c\x12\x10\n\x08\x63ommands\x18\x03 \x03(\x0c\"1\n\x0fProposeResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\r\n\x05index\x18\x02 \x01(\x03\"%\n\x11LeaderPingRequest\x12\x10\n\x08group_id\x18\x01 \x01(\r\")\n\x12LeaderPingResponse\x12\x13\n\x0bgroup_count\x18\x01 \x01(\r*0\n\x06Status\x12\x12\n\x0eSTATUS_SUCCESS\x10\x00\x12\x12\n\x0eSTATUS_FAILURE\x10\x01*\'\n\x0b\x46oundStatus\x12\t\n\x05\x46OUND\x10\x00\x12\r\n\tNOT_FOUND\x10\x01*\x8f\x01\n\rUserEventType\x12\x08\n\x04SYNC\x10\x00\x12\x0f\n\x0bNEW_MESSAGE\x10\x01\x12\x11\n\rMESSAGES_READ\x10\x02\x12\x13\n\x0fMESSAGE_DELETED\x10\x03\x12\x11\n\rACCOUNTS_SYNC\x10\x04\x12\x13\n\x0f\x41\x43\x43OUNT_CREATED\x10\x05\x12\x13\n\x0f\x41\x43\x43OUNT_DELETED\x10\x06\x32\xe4\n\n\x10MessagingService\x12R\n\rCreateAccount\x12\x1f.messaging.CreateAccountRequest\x1a .messaging.CreateAccountResponse\x12:\n\x05Login\x12\x17.messaging.LoginRequest\x1a\x18.messaging.LoginResponse\x12O\n\x0cListAccounts\x12\x1e.messaging.ListAccountsRequest\x1a\x1f.messaging.ListAccountsResponse\x12\x64\n\x13\x44isplayConversation\x12%.messaging.DisplayConversationRequest\x1a&.messaging.DisplayConversationResponse\x12L\n\x0bSendMessage\x12\x1d.messaging.SendMessageRequest\x1a\x1e.messaging.SendMessageResponse\x12O\n\x0cReadMessages\x12\x1e.messaging.ReadMessagesRequest\x1a\x1f.messaging.ReadMessagesResponse\x12R\n\rDeleteMessage\x12\x1f.messaging.DeleteMessageRequest\x1a .messaging.DeleteMessageResponse\x12R\n\rDeleteAccount\x12\x1f.messaging.DeleteAccountRequest\x1a .messaging.DeleteAccountResponse\x12^\n\x11GetUnreadMessages\x12#.messaging.GetUnreadMessagesRequest\x1a$.messaging.GetUnreadMessagesResponse\x12j\n\x15GetMessageInformation\x12\'.messaging.GetMessageInformationRequest\x1a(.messaging.GetMessageInformationResponse\x12X\n\x0fGetUsernameByID\x12!.messaging.GetUsernameByIDRequest\x1a\".messaging.GetUsernameByIDResponse\x12^\n\x11MarkMessageAsRead\x12#.messaging.MarkMessageAsReadRequest\x1a$.messaging.MarkMessageAsReadResponse\x12^\n\x11GetUserByUsername\x12#.messaging.GetUserByUsernameRequest\x1a$.messaging.GetUserByUsernameResponse\x12I\n\nLeaderPing\x12\x1c.messaging.LeaderPingRequest\x1a\x1d.messaging.LeaderPingResponse\x12@\n\tSubscribe\x12\x1b.messaging.SubscribeRequest\x1a\x14.messaging.UserEvent0\x01\x12O\n\x0cSendMessages\x12\x1e.messaging.SendMessagesRequest\x1a\x1f.messaging.SendMessagesResponse2\x95\x03\n\x0bRaftService\x12L\n\x0bRequestVote\x12\x1d.messaging.RequestVoteRequest\x1a\x1e.messaging.RequestVoteResponse\x12R\n\rAppendEntries\x12\x1f.messaging.AppendEntriesRequest\x1a .messaging.AppendEntriesResponse\x12Z\n\x0fInstallSnapshot\x12!.messaging.InstallSnapshotRequest\x1a\".messaging.InstallSnapshotResponse(\x01\x12\x46\n\tReadIndex\x12\x1b.messaging.ReadIndexRequest\x1a\x1c.messaging.ReadIndexResponse\x12@\n\x07Propose\x12\x19.messaging.ProposeRequest\x1a\x1a.messaging.ProposeResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'exp_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_STATUS']._serialized_start=2443
-  _globals['_STATUS']._serialized_end=2491
-  _globals['_FOUNDSTATUS']._serialized_start=2493
-  _globals['_FOUNDSTATUS']._serialized_end=2532
+  _globals['_STATUS']._serialized_start=5025
+  _globals['_STATUS']._serialized_end=5073
+  _globals['_FOUNDSTATUS']._serialized_start=5075
+  _globals['_FOUNDSTATUS']._serialized_end=5114
+  _globals['_USEREVENTTYPE']._serialized_start=5117
+  _globals['_USEREVENTTYPE']._serialized_end=5260
   _globals['_CREATEACCOUNTREQUEST']._serialized_start=24
   _globals['_CREATEACCOUNTREQUEST']._serialized_end=87
   _globals['_CREATEACCOUNTRESPONSE']._serialized_start=89
@@ -44,69 +46,109 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_LOGINRESPONSE']._serialized_start=194
   _globals['_LOGINRESPONSE']._serialized_end=289
   _globals['_LISTACCOUNTSREQUEST']._serialized_start=291
-  _globals['_LISTACCOUNTSREQUEST']._serialized_end=370
-  _globals['_LISTACCOUNTSRESPONSE']._serialized_start=372
-  _globals['_LISTACCOUNTSRESPONSE']._serialized_end=436
-  _globals['_DISPLAYCONVERSATIONREQUEST']._serialized_start=438
-  _globals['_DISPLAYCONVERSATIONREQUEST']._serialized_end=529
-  _globals['_CONVERSATIONMESSAGE']._serialized_start=531
-  _globals['_CONVERSATIONMESSAGE']._serialized_end=610
-  _globals['_DISPLAYCONVERSATIONRESPONSE']._serialized_start=612
-  _globals['_DISPLAYCONVERSATIONRESPONSE']._serialized_end=714
-  _globals['_SENDMESSAGEREQUEST']._serialized_start=716
-  _globals['_SENDMESSAGEREQUEST']._serialized_end=835
-  _globals['_SENDMESSAGERESPONSE']._serialized_start=837
-  _globals['_SENDMESSAGERESPONSE']._serialized_end=858
-  _globals['_READMESSAGESREQUEST']._serialized_start=860
-  _globals['_READMESSAGESREQUEST']._serialized_end=953
-  _globals['_READMESSAGESRESPONSE']._serialized_start=955
-  _globals['_READMESSAGESRESPONSE']._serialized_end=977
-  _globals['_DELETEMESSAGEREQUEST']._serialized_start=979
-  _globals['_DELETEMESSAGEREQUEST']._serialized_end=1062
-  _globals['_DELETEMESSAGERESPONSE']._serialized_start=1064
-  _globals['_DELETEMESSAGERESPONSE']._serialized_end=1087
-  _globals['_DELETEACCOUNTREQUEST']._serialized_start=1089
-  _globals['_DELETEACCOUNTREQUEST']._serialized_end=1151
-  _globals['_DELETEACCOUNTRESPONSE']._serialized_start=1153
-  _globals['_DELETEACCOUNTRESPONSE']._serialized_end=1176
-  _globals['_GETUNREADMESSAGESREQUEST']._serialized_start=1178
-  _globals['_GETUNREADMESSAGESREQUEST']._serialized_end=1244
-  _globals['_UNREADMESSAGEINFO']._serialized_start=1246
-  _globals['_UNREADMESSAGEINFO']._serialized_end=1326
-  _globals['_GETUNREADMESSAGESRESPONSE']._serialized_start=1328
-  _globals['_GETUNREADMESSAGESRESPONSE']._serialized_end=1418
-  _globals['_GETMESSAGEINFORMATIONREQUEST']._serialized_start=1420
-  _globals['_GETMESSAGEINFORMATIONREQUEST']._serialized_end=1511
-  _globals['_GETMESSAGEINFORMATIONRESPONSE']._serialized_start=1513
-  _globals['_GETMESSAGEINFORMATIONRESPONSE']._serialized_end=1631
-  _globals['_GETUSERNAMEBYIDREQUEST']._serialized_start=1633
-  _globals['_GETUSERNAMEBYIDREQUEST']._serialized_end=1674
-  _globals['_GETUSERNAMEBYIDRESPONSE']._serialized_start=1676
-  _globals['_GETUSERNAMEBYIDRESPONSE']._serialized_end=1719
-  _globals['_MARKMESSAGEASREADREQUEST']._serialized_start=1721
-  _globals['_MARKMESSAGEASREADREQUEST']._serialized_end=1808
-  _globals['_MARKMESSAGEASREADRESPONSE']._serialized_start=1810
-  _globals['_MARKMESSAGEASREADRESPONSE']._serialized_end=1837
-  _globals['_GETUSERBYUSERNAMEREQUEST']._serialized_start=1839
-  _globals['_GETUSERBYUSERNAMEREQUEST']._serialized_end=1883
-  _globals['_GETUSERBYUSERNAMERESPONSE']._serialized_start=1885
-  _globals['_GETUSERBYUSERNAMERESPONSE']._serialized_end=1969
-  _globals['_REQUESTVOTEREQUEST']._serialized_start=1971
-  _globals['_REQUESTVOTEREQUEST']._serialized_end=2074
-  _globals['_REQUESTVOTERESPONSE']._serialized_start=2076
-  _globals['_REQUESTVOTERESPONSE']._serialized_end=2133
-  _globals['_LOGENTRY']._serialized_start=2135
-  _globals['_LOGENTRY']._serialized_end=2176
-  _globals['_APPENDENTRIESREQUEST']._serialized_start=2179
-  _globals['_APPENDENTRIESREQUEST']._serialized_end=2342
-  _globals['_APPENDENTRIESRESPONSE']._serialized_start=2344
-  _globals['_APPENDENTRIESRESPONSE']._serialized_end=2398
-  _globals['_LEADERPINGREQUEST']._serialized_start=2400
-  _globals['_LEADERPINGREQUEST']._serialized_end=2419
-  _globals['_LEADERPINGRESPONSE']._serialized_start=2421
-  _globals['_LEADERPINGRESPONSE']._serialized_end=2441
-  _globals['_MESSAGINGSERVICE']._serialized_start=2535
-  _globals['_MESSAGINGSERVICE']._serialized_end=3768
-  _globals['_RAFTSERVICE']._serialized_start=3771
-  _globals['_RAFTSERVICE']._serialized_end=3946
+  _globals['_LISTACCOUNTSREQUEST']._serialized_end=409
+  _globals['_LISTACCOUNTSRESPONSE']._serialized_start=411
+  _globals['_LISTACCOUNTSRESPONSE']._serialized_end=511
+  _globals['_DISPLAYCONVERSATIONREQUEST']._serialized_start=514
+  _globals['_DISPLAYCONVERSATIONREQUEST']._serialized_end=747
+  _globals['_CONVERSATIONMESSAGE']._serialized_start=749
+  _globals['_CONVERSATIONMESSAGE']._serialized_end=828
+  _globals['_DISPLAYCONVERSATIONRESPONSE']._serialized_start=830
+  _globals['_DISPLAYCONVERSATIONRESPONSE']._serialized_end=950
+  _globals['_SENDMESSAGEREQUEST']._serialized_start=952
+  _globals['_SENDMESSAGEREQUEST']._serialized_end=1071
+  _globals['_SENDMESSAGERESPONSE']._serialized_start=1073
+  _globals['_SENDMESSAGERESPONSE']._serialized_end=1094
+  _globals['_READMESSAGESREQUEST']._serialized_start=1096
+  _globals['_READMESSAGESREQUEST']._serialized_end=1189
+  _globals['_READMESSAGESRESPONSE']._serialized_start=1191
+  _globals['_READMESSAGESRESPONSE']._serialized_end=1213
+  _globals['_DELETEMESSAGEREQUEST']._serialized_start=1215
+  _globals['_DELETEMESSAGEREQUEST']._serialized_end=1298
+  _globals['_DELETEMESSAGERESPONSE']._serialized_start=1300
+  _globals['_DELETEMESSAGERESPONSE']._serialized_end=1323
+  _globals['_DELETEACCOUNTREQUEST']._serialized_start=1325
+  _globals['_DELETEACCOUNTREQUEST']._serialized_end=1387
+  _globals['_DELETEACCOUNTRESPONSE']._serialized_start=1389
+  _globals['_DELETEACCOUNTRESPONSE']._serialized_end=1412
+  _globals['_GETUNREADMESSAGESREQUEST']._serialized_start=1414
+  _globals['_GETUNREADMESSAGESREQUEST']._serialized_end=1501
+  _globals['_UNREADMESSAGEINFO']._serialized_start=1503
+  _globals['_UNREADMESSAGEINFO']._serialized_end=1583
+  _globals['_GETUNREADMESSAGESRESPONSE']._serialized_start=1585
+  _globals['_GETUNREADMESSAGESRESPONSE']._serialized_end=1675
+  _globals['_GETMESSAGEINFORMATIONREQUEST']._serialized_start=1677
+  _globals['_GETMESSAGEINFORMATIONREQUEST']._serialized_end=1789
+  _globals['_GETMESSAGEINFORMATIONRESPONSE']._serialized_start=1791
+  _globals['_GETMESSAGEINFORMATIONRESPONSE']._serialized_end=1909
+  _globals['_GETUSERNAMEBYIDREQUEST']._serialized_start=1911
+  _globals['_GETUSERNAMEBYIDREQUEST']._serialized_end=1952
+  _globals['_GETUSERNAMEBYIDRESPONSE']._serialized_start=1954
+  _globals['_GETUSERNAMEBYIDRESPONSE']._serialized_end=1997
+  _globals['_MARKMESSAGEASREADREQUEST']._serialized_start=1999
+  _globals['_MARKMESSAGEASREADREQUEST']._serialized_end=2086
+  _globals['_MARKMESSAGEASREADRESPONSE']._serialized_start=2088
+  _globals['_MARKMESSAGEASREADRESPONSE']._serialized_end=2115
+  _globals['_GETUSERBYUSERNAMEREQUEST']._serialized_start=2117
+  _globals['_GETUSERBYUSERNAMEREQUEST']._serialized_end=2161
+  _globals['_GETUSERBYUSERNAMERESPONSE']._serialized_start=2163
+  _globals['_GETUSERBYUSERNAMERESPONSE']._serialized_end=2247
+  _globals['_SUBSCRIBEREQUEST']._serialized_start=2249
+  _globals['_SUBSCRIBEREQUEST']._serialized_end=2351
+  _globals['_USEREVENT']._serialized_start=2354
+  _globals['_USEREVENT']._serialized_end=2559
+  _globals['_OUTGOINGMESSAGE']._serialized_start=2561
+  _globals['_OUTGOINGMESSAGE']._serialized_end=2630
+  _globals['_SENDMESSAGESREQUEST']._serialized_start=2632
+  _globals['_SENDMESSAGESREQUEST']._serialized_end=2746
+  _globals['_SENDMESSAGESRESPONSE']._serialized_start=2748
+  _globals['_SENDMESSAGESRESPONSE']._serialized_end=2791
+  _globals['_REQUESTVOTEREQUEST']._serialized_start=2793
+  _globals['_REQUESTVOTEREQUEST']._serialized_end=2914
+  _globals['_REQUESTVOTERESPONSE']._serialized_start=2916
+  _globals['_REQUESTVOTERESPONSE']._serialized_end=2973
+  _globals['_LOGENTRY']._serialized_start=2975
+  _globals['_LOGENTRY']._serialized_end=3016
+  _globals['_COMMAND']._serialized_start=3019
+  _globals['_COMMAND']._serialized_end=3476
+  _globals['_NOOPCOMMAND']._serialized_start=3478
+  _globals['_NOOPCOMMAND']._serialized_end=3491
+  _globals['_CREATEACCOUNTCOMMAND']._serialized_start=3493
+  _globals['_CREATEACCOUNTCOMMAND']._serialized_end=3615
+  _globals['_CREATESESSIONCOMMAND']._serialized_start=3617
+  _globals['_CREATESESSIONCOMMAND']._serialized_end=3679
+  _globals['_SENDMESSAGECOMMAND']._serialized_start=3682
+  _globals['_SENDMESSAGECOMMAND']._serialized_end=3818
+  _globals['_READMESSAGESCOMMAND']._serialized_start=3820
+  _globals['_READMESSAGESCOMMAND']._serialized_end=3892
+  _globals['_MARKREADCOMMAND']._serialized_start=3894
+  _globals['_MARKREADCOMMAND']._serialized_end=3967
+  _globals['_DELETEMESSAGECOMMAND']._serialized_start=3970
+  _globals['_DELETEMESSAGECOMMAND']._serialized_end=4111
+  _globals['_DELETEACCOUNTCOMMAND']._serialized_start=4113
+  _globals['_DELETEACCOUNTCOMMAND']._serialized_end=4171
+  _globals['_APPENDENTRIESREQUEST']._serialized_start=4174
+  _globals['_APPENDENTRIESREQUEST']._serialized_end=4355
+  _globals['_APPENDENTRIESRESPONSE']._serialized_start=4357
+  _globals['_APPENDENTRIESRESPONSE']._serialized_end=4458
+  _globals['_INSTALLSNAPSHOTREQUEST']._serialized_start=4461
+  _globals['_INSTALLSNAPSHOTREQUEST']._serialized_end=4637
+  _globals['_INSTALLSNAPSHOTRESPONSE']._serialized_start=4639
+  _globals['_INSTALLSNAPSHOTRESPONSE']._serialized_end=4695
+  _globals['_READINDEXREQUEST']._serialized_start=4697
+  _globals['_READINDEXREQUEST']._serialized_end=4747
+  _globals['_READINDEXRESPONSE']._serialized_start=4749
+  _globals['_READINDEXRESPONSE']._serialized_end=4819
+  _globals['_PROPOSEREQUEST']._serialized_start=4821
+  _globals['_PROPOSEREQUEST']._serialized_end=4890
+  _globals['_PROPOSERESPONSE']._serialized_start=4892
+  _globals['_PROPOSERESPONSE']._serialized_end=4941
+  _globals['_LEADERPINGREQUEST']._serialized_start=4943
+  _globals['_LEADERPINGREQUEST']._serialized_end=4980
+  _globals['_LEADERPINGRESPONSE']._serialized_start=4982
+  _globals['_LEADERPINGRESPONSE']._serialized_end=5023
+  _globals['_MESSAGINGSERVICE']._serialized_start=5263
+  _globals['_MESSAGINGSERVICE']._serialized_end=6643
+  _globals['_RAFTSERVICE']._serialized_start=6646
+  _globals['_RAFTSERVICE']._serialized_end=7051
 # @@protoc_insertion_point(module_scope)
@@ -5,7 +5,7 @@ import warnings
 
 import exp_pb2 as exp__pb2
 
-GRPC_GENERATED_VERSION = '1.70.0'
+GRPC_GENERATED_VERSION = '1.71.0'
 GRPC_VERSION = grpc.__version__
 _version_not_supported = False
 
@@ -107,6 +107,16 @@ class MessagingServiceStub(object):
                 request_serializer=exp__pb2.LeaderPingRequest.SerializeToString,
                 response_deserializer=exp__pb2.LeaderPingResponse.FromString,
                 _registered_method=True)
+        self.Subscribe = channel.unary_stream(
+                '/messaging.MessagingService/Subscribe',
+                request_serializer=exp__pb2.SubscribeRequest.SerializeToString,
+                response_deserializer=exp__pb2.UserEvent.FromString,
+                _registered_method=True)
+        self.SendMessages = channel.unary_unary(
+                '/messaging.MessagingService/SendMessages',
+                request_serializer=exp__pb2.SendMessagesRequest.SerializeToString,
+                response_deserializer=exp__pb2.SendMessagesResponse.FromString,
+                _registered_method=True)
 
 
 class MessagingServiceServicer(object):
@@ -213,6 +223,20 @@ class MessagingServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def Subscribe(self, request, context):
+        """15) Subscribe to a user's new-message, read and delete events, and to account changes
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SendMessages(self, request, context):
+        """16) Send Messages from one user in a single request
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_MessagingServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -286,6 +310,16 @@ def add_MessagingServiceServicer_to_server(servicer, server):
                     request_deserializer=exp__pb2.LeaderPingRequest.FromString,
                     response_serializer=exp__pb2.LeaderPingResponse.SerializeToString,
             ),
+            'Subscribe': grpc.unary_stream_rpc_method_handler(
+                    servicer.Subscribe,
+                    request_deserializer=exp__pb2.SubscribeRequest.FromString,
+                    response_serializer=exp__pb2.UserEvent.SerializeToString,
+            ),
+            'SendMessages': grpc.unary_unary_rpc_method_handler(
+                    servicer.SendMessages,
+                    request_deserializer=exp__pb2.SendMessagesRequest.FromString,
+                    response_serializer=exp__pb2.SendMessagesResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'messaging.MessagingService', rpc_method_handlers)
@@ -678,6 +712,60 @@ class MessagingService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def Subscribe(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/messaging.MessagingService/Subscribe',
+            exp__pb2.SubscribeRequest.SerializeToString,
+            exp__pb2.UserEvent.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def SendMessages(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/messaging.MessagingService/SendMessages',
+            exp__pb2.SendMessagesRequest.SerializeToString,
+            exp__pb2.SendMessagesResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
 
 class RaftServiceStub(object):
     """--------------------------------------------------------------------
@@ -703,6 +791,21 @@ class RaftServiceStub(object):
                 request_serializer=exp__pb2.AppendEntriesRequest.SerializeToString,
                 response_deserializer=exp__pb2.AppendEntriesResponse.FromString,
                 _registered_method=True)
+        self.InstallSnapshot = channel.stream_unary(
+                '/messaging.RaftService/InstallSnapshot',
+                request_serializer=exp__pb2.InstallSnapshotRequest.SerializeToString,
+                response_deserializer=exp__pb2.InstallSnapshotResponse.FromString,
+                _registered_method=True)
+        self.ReadIndex = channel.unary_unary(
+                '/messaging.RaftService/ReadIndex',
+                request_serializer=exp__pb2.ReadIndexRequest.SerializeToString,
+                response_deserializer=exp__pb2.ReadIndexResponse.FromString,
+                _registered_method=True)
+        self.Propose = channel.unary_unary(
+                '/messaging.RaftService/Propose',
+                request_serializer=exp__pb2.ProposeRequest.SerializeToString,
+                response_deserializer=exp__pb2.ProposeResponse.FromString,
+                _registered_method=True)
 
 
 class RaftServiceServicer(object):
@@ -727,6 +830,27 @@ class RaftServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def InstallSnapshot(self, request_iterator, context):
+        """InstallSnapshot streams the leader's state, in chunks, to a follower that needs compacted entries
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReadIndex(self, request, context):
+        """ReadIndex is invoked by followers to learn the commit index a linearizable read must wait for
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Propose(self, request, context):
+        """Propose forwards a command to the group's leader, e.g. a cross-group message delivery
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_RaftServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -740,6 +864,21 @@ def add_RaftServiceServicer_to_server(servicer, server):
                     request_deserializer=exp__pb2.AppendEntriesRequest.FromString,
                     response_serializer=exp__pb2.AppendEntriesResponse.SerializeToString,
             ),
+            'InstallSnapshot': grpc.stream_unary_rpc_method_handler(
+                    servicer.InstallSnapshot,
+                    request_deserializer=exp__pb2.InstallSnapshotRequest.FromString,
+                    response_serializer=exp__pb2.InstallSnapshotResponse.SerializeToString,
+            ),
+            'ReadIndex': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReadIndex,
+                    request_deserializer=exp__pb2.ReadIndexRequest.FromString,
+                    response_serializer=exp__pb2.ReadIndexResponse.SerializeToString,
+            ),
+            'Propose': grpc.unary_unary_rpc_method_handler(
+                    servicer.Propose,
+                    request_deserializer=exp__pb2.ProposeRequest.FromString,
+                    response_serializer=exp__pb2.ProposeResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'messaging.RaftService', rpc_method_handlers)
@@ -809,3 +948,84 @@ class RaftService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def InstallSnapshot(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/messaging.RaftService/InstallSnapshot',
+            exp__pb2.InstallSnapshotRequest.SerializeToString,
+            exp__pb2.InstallSnapshotResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ReadIndex(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/messaging.RaftService/ReadIndex',
+            exp__pb2.ReadIndexRequest.SerializeToString,
+            exp__pb2.ReadIndexResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Propose(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/messaging.RaftService/Propose',
+            exp__pb2.ProposeRequest.SerializeToString,
+            exp__pb2.ProposeResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
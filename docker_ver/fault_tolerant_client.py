@@ -6,11 +6,14 @@ import json
 import random
 import logging
 import sys
-from typing import Optional, Tuple, List, Dict, Any
+import threading
+from typing import Optional, Tuple, List, Dict, Any, Iterator
 
 # Protobuf-generated modules
 import exp_pb2
 import exp_pb2_grpc
+from raft_groups import group_for_user, group_for_username, group_for_conversation, group_for_message
+from rpc_metrics import RETRY_AFTER_METADATA_KEY
 
 # Configure logging
 logging.basicConfig(
@@ -23,6 +26,83 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds an overloaded leader asked us to wait before retrying a write, or None."""
+    if not isinstance(error, grpc.RpcError) or error.code() != grpc.StatusCode.RESOURCE_EXHAUSTED:
+        return None
+    for key, value in error.trailing_metadata() or ():
+        if key == RETRY_AFTER_METADATA_KEY:
+            return int(value) / 1000
+    return None
+
+# Subscribe events about every account rather than the user's own; they carry no offset
+ACCOUNT_EVENT_TYPES = (exp_pb2.ACCOUNTS_SYNC, exp_pb2.ACCOUNT_CREATED, exp_pb2.ACCOUNT_DELETED)
+
+class EventSubscription:
+    """
+    Iterates over a user's Subscribe events, reconnecting to another node when
+    the stream breaks and resuming after the last event received. cancel()
+    ends the iteration from any thread.
+    """
+
+    def __init__(self, client: "FaultTolerantClient", user_id: int, session_token: str,
+                 resume_after: Optional[int] = None):
+        self.client = client
+        self.user_id = user_id
+        self.session_token = session_token
+        self.offset = resume_after  # Offset of the last event received
+        self._call = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Stop the subscription; a blocked iteration ends promptly."""
+        self._cancelled.set()
+        call = self._call
+        if call is not None:
+            call.cancel()
+
+    def __iter__(self) -> Iterator[Any]:
+        attempt = 0
+        while not self._cancelled.is_set():
+            stubs = list(self.client.stubs.items())
+            if not stubs:
+                try:
+                    self.client._ensure_connected()
+                except ConnectionError:
+                    pass
+                self._cancelled.wait(1.0)
+                continue
+            # Subscriptions can be served by any node, so spread them out
+            node_id, stub = random.choice(stubs)
+            request = exp_pb2.SubscribeRequest(
+                user_id=self.user_id,
+                session_token=bytes.fromhex(self.session_token),
+                resume_after=self.offset
+            )
+            try:
+                self._call = stub.Subscribe(request)
+                if self._cancelled.is_set():
+                    self._call.cancel()
+                for event in self._call:
+                    attempt = 0
+                    if event.type not in ACCOUNT_EVENT_TYPES:
+                        self.offset = event.offset
+                    yield event
+                logger.info(f"Subscription stream from node {node_id} ended; resuming after {self.offset}")
+            except grpc.RpcError as e:
+                if self._cancelled.is_set():
+                    return
+                # A follower may not have applied a just-issued session token yet,
+                # so only give up once other nodes have rejected it too
+                if e.code() == grpc.StatusCode.UNAUTHENTICATED and attempt >= self.client.max_retry_attempts:
+                    raise
+                logger.info(f"Subscription to node {node_id} failed: {e.code()}; resuming after {self.offset}")
+                attempt += 1
+            finally:
+                self._call = None
+            self._cancelled.wait(min(0.1 * (2 ** attempt), 5.0))
+
+
 class FaultTolerantClient:
     """
     A fault-tolerant client implementation that can handle server failures
@@ -41,8 +121,11 @@ class FaultTolerantClient:
         self.channels = {}  # Maps node_id to grpc.Channel
         self.stubs = {}     # Maps node_id to MessagingServiceStub
         self.leader_id = None
+        self.group_count = 1  # Raft groups the cluster shards users across, learned from LeaderPing
+        self.group_leaders = {}  # Maps group ID to the node_id of its leader, as last seen
         self._connected = False
         self.dead_nodes = {} # Maps node_id to timestamp of last failure
+        self._targets = threading.local()  # node_id each thread's current call went to
         self.dead_timeout = 3 # Seconds to wait before retrying a dead node
         
         
@@ -67,16 +150,22 @@ class FaultTolerantClient:
         # Try to identify the leader
         self._find_leader()
 
-    def _find_leader(self) -> bool:
+    def _set_leader(self, group_id: int, node_id: str):
+        self.group_leaders[group_id] = node_id
+        if group_id == 0:
+            self.leader_id = node_id
+
+    def _find_leader(self, group_id: int = 0) -> bool:
         # Try for a fixed number of attempts
         for attempt in range(10):
             logger.info(f"Attempt {attempt+1}: available stubs: {list(self.stubs.keys())}")
             for node_id, stub in self.stubs.items():
                 try:
-                    request = exp_pb2.LeaderPingRequest()
-                    stub.LeaderPing(request, timeout=5.0)
-                    self.leader_id = node_id
-                    logger.info(f"Found leader: node {node_id}")
+                    request = exp_pb2.LeaderPingRequest(group_id=group_id)
+                    response = stub.LeaderPing(request, timeout=5.0)
+                    self.group_count = response.group_count or 1
+                    self._set_leader(group_id, node_id)
+                    logger.info(f"Found leader of group {group_id}: node {node_id}")
                     self._connected = True
                     return True
                 except grpc.RpcError as e:
@@ -86,9 +175,16 @@ class FaultTolerantClient:
                         new_addr = details.split("Try ")[1].strip()
                         for possible_id, address in self.cluster_config.items():
                             if address == new_addr:
-                                self.leader_id = possible_id
-                                logger.info(f"Found leader via redirect: node {possible_id}")
+                                self._set_leader(group_id, possible_id)
+                                logger.info(f"Found leader of group {group_id} via redirect: node {possible_id}")
                                 self._connected = True
+                                # Only the leader's own answer says how many groups there are
+                                if possible_id in self.stubs:
+                                    try:
+                                        response = self.stubs[possible_id].LeaderPing(request, timeout=5.0)
+                                        self.group_count = response.group_count or 1
+                                    except grpc.RpcError:
+                                        pass
                                 return True
             logger.warning("Leader not found. Waiting for leader election to complete...")
             time.sleep(2)
@@ -151,11 +247,41 @@ class FaultTolerantClient:
             raise ConnectionError("Could not connect to any server in the cluster")
 
 
+    def _leader_stub(self, group_id: int = 0):
+        """
+        Pick the leader of a Raft group for a write, finding it first if it isn't
+        known. Group 0's leader is refreshed before every operation; others are
+        remembered until a request to them fails.
+        """
+        leader_id = self.group_leaders.get(group_id)
+        if leader_id not in self.stubs and self._find_leader(group_id):
+            leader_id = self.group_leaders.get(group_id)
+        if leader_id in self.stubs:
+            return self._stub(leader_id)
+        # If no leader is known, try a random server
+        return self._stub(random.choice(list(self.stubs.keys())))
+
+    def _read_stub(self):
+        """
+        Pick a random node for a read. Every node serves linearizable reads via
+        ReadIndex, so reads don't need to queue up at the leader.
+        """
+        return self._stub(random.choice(list(self.stubs.keys())))
+
+    def _stub(self, node_id: str):
+        """
+        Return a node's stub, recording it as the target of this thread's call
+        so that a failure is blamed on that node alone.
+        """
+        self._targets.node_id = node_id
+        return self.stubs[node_id]
+
     def _execute_with_retry(self, operation, *args, **kwargs):
         attempt = 0
         last_error = None
 
         while attempt < self.max_retry_attempts:
+            self._targets.node_id = None
             try:
                 self._ensure_connected()
                 return operation(*args, **kwargs)
@@ -164,27 +290,34 @@ class FaultTolerantClient:
                 code = e.code()
                 logger.info(f"_execute_with_retry: caught RpcError code={code}, details={details}")
 
+                # The leader turned the write away under load; it is still the
+                # leader, so wait as long as it asked and try it again
+                retry_after = _retry_after(e)
+                if retry_after is not None:
+                    attempt += 1
+                    last_error = e
+                    time.sleep(retry_after)
+                    continue
+
                 # If the error indicates the server is unreachable, remove that node's stub.
                 if code in (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED):
-                    # If the current leader is unreachable, remove it from the pool
-                    if self.leader_id and self.leader_id in self.stubs:
-                        logger.info(f"Marking unreachable leader {self.leader_id} as dead")
-                        self.dead_nodes[self.leader_id] = time.time()
-                        del self.stubs[self.leader_id]
+                    # Only the node the call went to is known to be down; reads
+                    # go to any node, so it need not be a leader
+                    node_id = self._targets.node_id
+                    if node_id in self.stubs:
+                        logger.info(f"Marking unreachable node {node_id} as dead")
+                        self.dead_nodes[node_id] = time.time()
+                        del self.stubs[node_id]
+                    for group_id, leader_id in list(self.group_leaders.items()):
+                        if leader_id == node_id:
+                            del self.group_leaders[group_id]
+                    if self.leader_id == node_id:
                         self.leader_id = None
-                    else:
-                        # Otherwise, remove any stub that errors out
-                        for node_id in list(self.stubs.keys()):
-                            try:
-                                # Optionally, you could perform a quick health-check here
-                                logger.info(f"Marking unreachable node {node_id} as dead")
-                                self.dead_nodes[node_id] = time.time()
-                                del self.stubs[node_id]
-                                logger.info(f"Removed unreachable node {node_id} from stubs")
-                            except Exception:
-                                pass
                     attempt += 1
                 else:
+                    # A group's leadership may have moved; look its leader up again
+                    if code == grpc.StatusCode.FAILED_PRECONDITION:
+                        self.group_leaders.clear()
                     attempt += 1
                     last_error = e
                     
@@ -215,13 +348,8 @@ class FaultTolerantClient:
                 password_hash=hashed_password
             )
             
-            # Use the leader stub if available
-            if self.leader_id and self.leader_id in self.stubs:
-                stub = self.stubs[self.leader_id]
-            else:
-                # If no leader is known, use a random stub
-                node_id = random.choice(list(self.stubs.keys()))
-                stub = self.stubs[node_id]
+            # Sent to the leader of the username's Raft group
+            stub = self._leader_stub(group_for_username(username, self.group_count))
             
             response = stub.CreateAccount(request)
             return response.session_token.hex()
@@ -247,13 +375,8 @@ class FaultTolerantClient:
                 password_hash=hashed_password
             )
             
-            # Use the leader stub if available
-            if self.leader_id and self.leader_id in self.stubs:
-                stub = self.stubs[self.leader_id]
-            else:
-                # If no leader is known, use a random stub
-                node_id = random.choice(list(self.stubs.keys()))
-                stub = self.stubs[node_id]
+            # Sent to the leader of the username's Raft group
+            stub = self._leader_stub(group_for_username(username, self.group_count))
             
             response = stub.Login(request)
             success = (response.status == exp_pb2.STATUS_SUCCESS)
@@ -263,17 +386,33 @@ class FaultTolerantClient:
         
         return self._execute_with_retry(operation)
     
-    def ListAccounts(self, user_id: int, session_token: str, wildcard: str) -> List[str]:
+    def ListAccounts(self, user_id: int, session_token: str, wildcard: str, limit: int = 0,
+                     after_username: str = "") -> List[str]:
         """
-        List matching accounts.
+        List matching accounts, or one page of them.
 
         Args:
             user_id (int): The user ID
             session_token (str): The session token
             wildcard (str): Wildcard pattern for matching usernames
+            limit (int): Most usernames to return (0 for all)
+            after_username (str): Return only usernames after this one, e.g. the
+                last of the previous page
+
+        Returns:
+            List[str]: A list of usernames, sorted
+        """
+        return [username for username, _ in self.ListAccountIDs(user_id, session_token, wildcard, limit, after_username)]
+    
+    def ListAccountIDs(self, user_id: int, session_token: str, wildcard: str, limit: int = 0,
+                       after_username: str = "") -> List[Tuple[str, int]]:
+        """
+        List matching accounts with their user IDs, or one page of them.
+
+        Takes the same arguments as ListAccounts.
 
         Returns:
-            List[str]: A list of usernames
+            List[Tuple[str, int]]: (username, user_id) pairs, sorted by username
         """
         def operation():
             token_bytes = bytes.fromhex(session_token)
@@ -281,30 +420,40 @@ class FaultTolerantClient:
             request = exp_pb2.ListAccountsRequest(
                 user_id=user_id,
                 session_token=token_bytes,
-                wildcard=wildcard
+                wildcard=wildcard,
+                limit=limit,
+                after_username=after_username
             )
             
             # This operation can be performed on any node, not just the leader
             # We'll still start with the leader for consistency
             if self.leader_id and self.leader_id in self.stubs:
-                stub = self.stubs[self.leader_id]
+                stub = self._stub(self.leader_id)
             else:
-                node_id = random.choice(list(self.stubs.keys()))
-                stub = self.stubs[node_id]
+                stub = self._stub(random.choice(list(self.stubs.keys())))
             
             response = stub.ListAccounts(request)
-            return list(response.usernames)
+            return list(zip(response.usernames, response.user_ids))
         
         return self._execute_with_retry(operation)
     
-    def DisplayConversation(self, user_id: int, session_token: str, conversant_id: int) -> List[Tuple[int, str, bool]]:
+    def DisplayConversation(self, user_id: int, session_token: str, conversant_id: int,
+                            before_message_id: Optional[int] = None, after_message_id: Optional[int] = None,
+                            limit: int = 0, allow_stale: bool = False) -> List[Tuple[int, str, bool]]:
         """
-        Display the conversation between user_id and conversant_id.
+        Display the conversation between user_id and conversant_id, or one page of it.
+        Served by any node, linearizably unless allow_stale is set.
 
         Args:
             user_id (int): The user ID
             session_token (str): The session token
             conversant_id (int): The ID of the user to converse with
+            before_message_id (int, optional): Only messages older than this ID
+            after_message_id (int, optional): Only messages newer than this ID; pass the
+                last message ID seen to fetch just the new messages
+            limit (int): Most messages to return (the newest unless after_message_id
+                is given), 0 for no limit
+            allow_stale (bool): Accept the serving node's possibly stale state
 
         Returns:
             A list of tuples (message_id, message_content, sender_flag).
@@ -316,17 +465,14 @@ class FaultTolerantClient:
             request = exp_pb2.DisplayConversationRequest(
                 user_id=user_id,
                 session_token=token_bytes,
-                conversant_id=conversant_id
+                conversant_id=conversant_id,
+                before_message_id=before_message_id,
+                after_message_id=after_message_id,
+                limit=limit,
+                allow_stale=allow_stale
             )
             
-            # This operation can be performed on any node
-            if self.leader_id and self.leader_id in self.stubs:
-                stub = self.stubs[self.leader_id]
-            else:
-                node_id = random.choice(list(self.stubs.keys()))
-                stub = self.stubs[node_id]
-            
-            response = stub.DisplayConversation(request)
+            response = self._read_stub().DisplayConversation(request)
             
             # Convert repeated ConversationMessage -> list of (msg_id, content, is_sender)
             result = []
@@ -389,11 +535,8 @@ class FaultTolerantClient:
                 recipient_user_id=recipient_user_id,
                 message_content=message_content
             )
-            # Prefer the leader's stub if available, else pick one at random.
-            if self.leader_id and self.leader_id in self.stubs:
-                stub = self.stubs[self.leader_id]
-            else:
-                stub = random.choice(list(self.stubs.values()))
+            # Sent to the leader of the conversation's home Raft group
+            stub = self._leader_stub(group_for_conversation(sender_user_id, recipient_user_id, self.group_count))
 
             # Try sending the message. Any error here will be retried.
             stub.SendMessage(request)
@@ -401,6 +544,41 @@ class FaultTolerantClient:
 
         return self._execute_with_retry(operation)
 
+    def SendMessages(self, sender_user_id: int, session_token: str, messages: List[Tuple[int, str]]) -> List[int]:
+        """
+        Send several messages with one request per conversation home group.
+
+        Args:
+            sender_user_id (int): Sender's user ID
+            session_token (str): Session token
+            messages (List[Tuple[int, str]]): (recipient user ID, message content) pairs
+
+        Returns:
+            List[int]: The IDs of the sent messages, in the order given
+        """
+        # Each request goes to the leader of the home group of all its conversations
+        batches = {}
+        for position, (recipient_user_id, _) in enumerate(messages):
+            group_id = group_for_conversation(sender_user_id, recipient_user_id, self.group_count)
+            batches.setdefault(group_id, []).append(position)
+
+        message_ids = [0] * len(messages)
+        for group_id, positions in batches.items():
+            request = exp_pb2.SendMessagesRequest(
+                sender_user_id=sender_user_id,
+                session_token=bytes.fromhex(session_token),
+                messages=[exp_pb2.OutgoingMessage(recipient_user_id=messages[position][0],
+                                                  message_content=messages[position][1])
+                          for position in positions]
+            )
+
+            def operation():
+                return self._leader_stub(group_id).SendMessages(request).message_ids
+
+            for position, message_id in zip(positions, self._execute_with_retry(operation)):
+                message_ids[position] = message_id
+        return message_ids
+
     
     def ReadMessages(self, user_id: int, session_token: str, number_of_messages_req: int) -> bool:
         """
@@ -423,18 +601,18 @@ class FaultTolerantClient:
                 number_of_messages_req=number_of_messages_req
             )
             
-            # This must be sent to the leader
-            if self.leader_id and self.leader_id in self.stubs:
-                stub = self.stubs[self.leader_id]
-            else:
-                node_id = random.choice(list(self.stubs.keys()))
-                stub = self.stubs[node_id]
+            # This must be sent to the leader of the user's Raft group
+            group_id = group_for_user(user_id, self.group_count)
+            stub = self._leader_stub(group_id)
             
             try:
                 stub.ReadMessages(request)
                 return True
             except Exception as e:
+                if _retry_after(e) is not None:
+                    raise  # The leader is shedding load; _execute_with_retry waits as asked
                 logger.error(f"Failed to read messages: {e}")
+                self.group_leaders.pop(group_id, None)
                 return False
         
         return self._execute_with_retry(operation)
@@ -460,18 +638,18 @@ class FaultTolerantClient:
                 session_token=token_bytes
             )
             
-            # This must be sent to the leader
-            if self.leader_id and self.leader_id in self.stubs:
-                stub = self.stubs[self.leader_id]
-            else:
-                node_id = random.choice(list(self.stubs.keys()))
-                stub = self.stubs[node_id]
+            # This must be sent to the leader of the message's home Raft group
+            group_id = group_for_message(message_uid, self.group_count)
+            stub = self._leader_stub(group_id)
             
             try:
                 stub.DeleteMessage(request)
                 return True
             except Exception as e:
+                if _retry_after(e) is not None:
+                    raise  # The leader is shedding load; _execute_with_retry waits as asked
                 logger.error(f"Failed to delete message: {e}")
+                self.group_leaders.pop(group_id, None)
                 return False
         
         return self._execute_with_retry(operation)
@@ -495,29 +673,31 @@ class FaultTolerantClient:
                 session_token=token_bytes
             )
             
-            # This must be sent to the leader
-            if self.leader_id and self.leader_id in self.stubs:
-                stub = self.stubs[self.leader_id]
-            else:
-                node_id = random.choice(list(self.stubs.keys()))
-                stub = self.stubs[node_id]
+            # This must be sent to the leader of the user's Raft group
+            group_id = group_for_user(user_id, self.group_count)
+            stub = self._leader_stub(group_id)
             
             try:
                 stub.DeleteAccount(request)
                 return True
             except Exception as e:
+                if _retry_after(e) is not None:
+                    raise  # The leader is shedding load; _execute_with_retry waits as asked
                 logger.error(f"Failed to delete account: {e}")
+                self.group_leaders.pop(group_id, None)
                 return False
         
         return self._execute_with_retry(operation)
     
-    def GetUnreadMessages(self, user_id: int, session_token: str) -> List[Tuple[int, int, int]]:
+    def GetUnreadMessages(self, user_id: int, session_token: str, allow_stale: bool = False) -> List[Tuple[int, int, int]]:
         """
-        Fetch unread messages for a user.
+        Fetch unread messages for a user. Served by any node, linearizably unless
+        allow_stale is set.
 
         Args:
             user_id (int): User ID
             session_token (str): Session token
+            allow_stale (bool): Accept the serving node's possibly stale state
 
         Returns:
             List[Tuple[int, int, int]]: List of (message_uid, sender_id, receiver_id)
@@ -527,17 +707,11 @@ class FaultTolerantClient:
 
             request = exp_pb2.GetUnreadMessagesRequest(
                 user_id=user_id,
-                session_token=token_bytes
+                session_token=token_bytes,
+                allow_stale=allow_stale
             )
             
-            # This can be performed on any node
-            if self.leader_id and self.leader_id in self.stubs:
-                stub = self.stubs[self.leader_id]
-            else:
-                node_id = random.choice(list(self.stubs.keys()))
-                stub = self.stubs[node_id]
-            
-            resp = stub.GetUnreadMessages(request)
+            resp = self._read_stub().GetUnreadMessages(request)
 
             results = []
             for m in resp.messages:
@@ -546,14 +720,17 @@ class FaultTolerantClient:
         
         return self._execute_with_retry(operation)
     
-    def GetMessageInformation(self, user_id: int, session_token: str, message_uid: int) -> Tuple[bool, int, int, str]:
+    def GetMessageInformation(self, user_id: int, session_token: str, message_uid: int,
+                              allow_stale: bool = False) -> Tuple[bool, int, int, str]:
         """
         Get message info (read status, sender ID, content length, content).
+        Served by any node, linearizably unless allow_stale is set.
 
         Args:
             user_id (int): User ID
             session_token (str): Session token
             message_uid (int): Message unique ID
+            allow_stale (bool): Accept the serving node's possibly stale state
 
         Returns:
             Tuple[bool, int, int, str]: (read_flag, sender_id, content_length, message_content)
@@ -564,17 +741,11 @@ class FaultTolerantClient:
             request = exp_pb2.GetMessageInformationRequest(
                 user_id=user_id,
                 session_token=token_bytes,
-                message_uid=message_uid
+                message_uid=message_uid,
+                allow_stale=allow_stale
             )
             
-            # This can be performed on any node
-            if self.leader_id and self.leader_id in self.stubs:
-                stub = self.stubs[self.leader_id]
-            else:
-                node_id = random.choice(list(self.stubs.keys()))
-                stub = self.stubs[node_id]
-            
-            resp = stub.GetMessageInformation(request)
+            resp = self._read_stub().GetMessageInformation(request)
             return (resp.read_flag, resp.sender_id, resp.content_length, resp.message_content)
         
         return self._execute_with_retry(operation)
@@ -594,10 +765,9 @@ class FaultTolerantClient:
             
             # This can be performed on any node
             if self.leader_id and self.leader_id in self.stubs:
-                stub = self.stubs[self.leader_id]
+                stub = self._stub(self.leader_id)
             else:
-                node_id = random.choice(list(self.stubs.keys()))
-                stub = self.stubs[node_id]
+                stub = self._stub(random.choice(list(self.stubs.keys())))
             
             resp = stub.GetUsernameByID(request)
             return resp.username
@@ -625,18 +795,18 @@ class FaultTolerantClient:
                 message_uid=message_uid
             )
             
-            # This must be sent to the leader
-            if self.leader_id and self.leader_id in self.stubs:
-                stub = self.stubs[self.leader_id]
-            else:
-                node_id = random.choice(list(self.stubs.keys()))
-                stub = self.stubs[node_id]
+            # This must be sent to the leader of the user's Raft group
+            group_id = group_for_user(user_id, self.group_count)
+            stub = self._leader_stub(group_id)
             
             try:
                 stub.MarkMessageAsRead(request)
                 return True
             except Exception as e:
+                if _retry_after(e) is not None:
+                    raise  # The leader is shedding load; _execute_with_retry waits as asked
                 logger.error(f"Failed to mark message as read: {e}")
+                self.group_leaders.pop(group_id, None)
                 return False
         
         return self._execute_with_retry(operation)
@@ -656,10 +826,9 @@ class FaultTolerantClient:
             
             # This can be performed on any node
             if self.leader_id and self.leader_id in self.stubs:
-                stub = self.stubs[self.leader_id]
+                stub = self._stub(self.leader_id)
             else:
-                node_id = random.choice(list(self.stubs.keys()))
-                stub = self.stubs[node_id]
+                stub = self._stub(random.choice(list(self.stubs.keys())))
             
             resp = stub.GetUserByUsername(request)
 
@@ -670,6 +839,25 @@ class FaultTolerantClient:
         
         return self._execute_with_retry(operation)
     
+    def Subscribe(self, user_id: int, session_token: str, resume_after: Optional[int] = None) -> EventSubscription:
+        """
+        Subscribe to a user's new-message, read and delete events.
+
+        Args:
+            user_id (int): The user ID
+            session_token (str): The session token
+            resume_after (int, optional): Offset of the last event already received;
+                None to receive only events from now on
+
+        Returns:
+            EventSubscription: Iterable of exp_pb2.UserEvent that survives node
+            failures. A SYNC event (sent first, and again if events were missed)
+            means state should be refetched. Account events are included; an
+            ACCOUNTS_SYNC event starts every reconnected stream and means the
+            account list should be refetched.
+        """
+        return EventSubscription(self, user_id, session_token, resume_after)
+    
     def hash_password(self, password: str) -> str:
         """Hash a password using SHA-256."""
         return hashlib.sha256(password.encode()).hexdigest()
@@ -682,6 +870,7 @@ class FaultTolerantClient:
         self.stubs.clear()
         self._connected = False
         self.leader_id = None
+        self.group_leaders.clear()
 
     # Wrapper methods for compatibility with the original client interface
     def create_account(self, username, password):
@@ -693,8 +882,10 @@ class FaultTolerantClient:
     def list_accounts(self, user_id, session_token, wildcard):
         return self.ListAccounts(user_id, session_token, wildcard)
 
-    def display_conversation(self, user_id, session_token, conversant_id):
-        return self.DisplayConversation(user_id, session_token, conversant_id)
+    def display_conversation(self, user_id, session_token, conversant_id,
+                             before_message_id=None, after_message_id=None, limit=0):
+        return self.DisplayConversation(user_id, session_token, conversant_id,
+                                        before_message_id, after_message_id, limit)
     
     def send_message(self, sender_user_id, session_token, recipient_user_id, message_content):
         return self.SendMessage(sender_user_id, session_token, recipient_user_id, message_content)
@@ -6,6 +6,8 @@ import os
 import sys
 import hashlib
 import json
+import exp_pb2
+from fault_tolerant_client import ACCOUNT_EVENT_TYPES
 from fault_tolerant_gui_client import FaultTolerantGUIClient
 
 def print_usage():
@@ -14,6 +16,9 @@ def print_usage():
     print("Example: python fault_tolerant_gui.py cluster_config_client.json")
     sys.exit(1)
 
+# Messages fetched when a conversation is opened; later refreshes fetch only new ones
+CONVERSATION_PAGE_SIZE = 100
+
 class ChatInterface:
     def __init__(self, cluster_config_path):
         print("Initializing ChatInterface...")
@@ -29,6 +34,11 @@ class ChatInterface:
         self.current_user_id = None
         self.current_token = None
         self.message_ids = []
+        self.displayed_conversant_id = None
+        self.subscription = None
+        # Kept up to date from pushed events, so drawing the user list makes no requests
+        self.accounts = {}        # username -> user ID
+        self.unread_senders = {}  # Unread message ID -> sender ID
 
         try:
             self.client = FaultTolerantGUIClient(cluster_config_path)
@@ -144,7 +154,7 @@ class ChatInterface:
                 self.current_token = token
                 print(f"Login complete - User ID: {user_id}, Token: {token}")
                 self.show_main_screen()
-                self.check_messages()  # Start checking for messages
+                self.start_subscription()  # Start listening for messages
                 return
             
             # If login failed, try creating account
@@ -167,7 +177,7 @@ class ChatInterface:
                 self.current_token = token
                 print(f"Account creation complete - User ID: {user_id}, Token: {token}")
                 self.show_main_screen()
-                self.check_messages()  # Start checking for messages
+                self.start_subscription()  # Start listening for messages
             else:
                 error_msg = "Failed to create account"
                 print(f"Error: {error_msg}")
@@ -182,55 +192,117 @@ class ChatInterface:
             print(traceback.format_exc())
             self.error_label.config(text=error_msg)
 
+    def start_subscription(self):
+        """Subscribe to the user's events; the cluster pushes changes instead of being polled"""
+        self.subscription = self.client.Subscribe(self.current_user_id, self.current_token)
+        threading.Thread(target=self.receive_events, args=(self.subscription,), daemon=True).start()
+        self.check_messages()
+
+    def receive_events(self, subscription):
+        """Background thread: hand pushed events to the Tk thread through the message queue"""
+        try:
+            for event in subscription:
+                self.message_queue.put(event)
+        except Exception as e:
+            print(f"Subscription ended: {str(e)}")
+
     def check_messages(self):
-        """Periodically check for new messages and update the display"""
+        """Apply pushed events to the display; makes no requests unless something changed"""
         if self.current_user_id and self.current_token:  # Only check if logged in
-            print(f"\n=== Checking Messages for User {self.current_user_id} ===")
+            events = []
+            while not self.message_queue.empty():
+                events.append(self.message_queue.get())
+            if events:
+                self.handle_events(events)
+            self.root.after(200, self.check_messages)
+
+    def get_selected_username(self):
+        """Username selected in the user list without its unread markers, or None"""
+        if not hasattr(self, 'users_list'):
+            return None
+        selected_indices = self.users_list.curselection()
+        if not selected_indices:
+            return None
+        current_selection = self.users_list.get(selected_indices[0])
+        if '[NEW]' in current_selection:
+            current_selection = current_selection.replace('[NEW] ', '')
+        if ' (UNREAD:' in current_selection:
+            current_selection = current_selection.split(' (UNREAD:')[0]
+        print(f"[DEBUG] Current selection: {current_selection}")
+        return current_selection
+
+    def restore_selection(self, current_selection):
+        """Select a username again after the user list was refreshed"""
+        if current_selection and hasattr(self, 'users_list'):
+            for i in range(self.users_list.size()):
+                item = self.users_list.get(i)
+                clean_item = item.replace('[NEW] ', '').split(' (UNREAD:')[0]
+                if clean_item == current_selection:
+                    self.users_list.selection_set(i)
+                    self.users_list.see(i)
+                    print(f"[DEBUG] Restored selection to: {clean_item}")
+                    break
+
+    def handle_events(self, events):
+        """Update local state from a batch of pushed events and redraw what they affect"""
+        if self.current_user_id and self.current_token:
+            print(f"\n=== Received {len(events)} event(s) for User {self.current_user_id} ===")
             
             # Get current selection to maintain it after refresh
-            current_selection = None
-            if hasattr(self, 'users_list'):
-                selected_indices = self.users_list.curselection()
-                if selected_indices:
-                    current_selection = self.users_list.get(selected_indices[0])
-                    if '[NEW]' in current_selection:
-                        current_selection = current_selection.replace('[NEW] ', '')
-                    if ' (UNREAD:' in current_selection:
-                        current_selection = current_selection.split(' (UNREAD:')[0]
-                    print(f"[DEBUG] Current selection: {current_selection}")
+            current_selection = self.get_selected_username()
             
             try:
-                # Get unread messages before refresh
-                old_unread = self.client.GetUnreadMessages(self.current_user_id, self.current_token)
-                old_count = len(old_unread) if old_unread else 0
-                print(f"[DEBUG] Unread messages before refresh: {old_count}")
+                unread_count = None
+                conversants = set()
+                reload_conversants = set()
+                for event in events:
+                    if event.type == exp_pb2.ACCOUNTS_SYNC:
+                        self.reload_accounts()
+                    elif event.type == exp_pb2.ACCOUNT_CREATED:
+                        self.accounts[event.username] = event.account_id
+                    elif event.type == exp_pb2.ACCOUNT_DELETED:
+                        self.accounts.pop(event.username, None)
+                    elif event.type == exp_pb2.SYNC:
+                        self.reload_unread_messages()
+                        reload_conversants.add(self.displayed_conversant_id)
+                    elif event.type == exp_pb2.NEW_MESSAGE:
+                        if event.receiver_id == self.current_user_id:
+                            for message_id in event.message_ids:
+                                self.unread_senders[message_id] = event.sender_id
+                        conversants.update((event.sender_id, event.receiver_id))
+                    elif event.type == exp_pb2.MESSAGES_READ:
+                        for message_id in event.message_ids:
+                            self.unread_senders.pop(message_id, None)
+                    elif event.type == exp_pb2.MESSAGE_DELETED:
+                        for message_id in event.message_ids:
+                            self.unread_senders.pop(message_id, None)
+                        reload_conversants.update((event.sender_id, event.receiver_id))
+                    if event.type not in ACCOUNT_EVENT_TYPES:
+                        unread_count = event.unread_count
                 
-                # Refresh lists and counts
-                print("[DEBUG] Refreshing user list and unread count...")
-                self.refresh_user_list()
-                self.update_unread_count()
+                # Events about the user carry the unread count, so the counter needs no request
+                if unread_count is not None:
+                    self.unread_counter_label.config(text=f"Unread Messages: {unread_count}")
+                    print(f"[DEBUG] Unread messages after events: {unread_count}")
                 
-                # Get unread messages after refresh
-                new_unread = self.client.GetUnreadMessages(self.current_user_id, self.current_token)
-                new_count = len(new_unread) if new_unread else 0
-                print(f"[DEBUG] Unread messages after refresh: {new_count}")
+                # Redraw the user list and its unread markers
+                self.refresh_user_list()
+                self.restore_selection(current_selection)
                 
-                # Restore selection if needed
-                if current_selection and hasattr(self, 'users_list'):
-                    for i in range(self.users_list.size()):
-                        item = self.users_list.get(i)
-                        clean_item = item.replace('[NEW] ', '').split(' (UNREAD:')[0]
-                        if clean_item == current_selection:
-                            self.users_list.selection_set(i)
-                            self.users_list.see(i)
-                            print(f"[DEBUG] Restored selection to: {clean_item}")
-                            break
+                # Append new messages to the open conversation, or reload it if
+                # messages were deleted from it
+                if self.displayed_conversant_id in reload_conversants:
+                    # Forget what is shown so the latest page is fetched again
+                    self.displayed_conversant_id = None
+                    self.message_ids = []
+                    if self.users_list.curselection():
+                        self.on_user_select(None)
+                elif self.displayed_conversant_id in conversants and self.users_list.curselection():
+                    self.on_user_select(None)
             except Exception as e:
-                print(f"Error during message check: {str(e)}")
+                print(f"Error handling events: {str(e)}")
             
-            print("=== Message Check Complete ===\n")
-            # Check messages every 3 seconds
-            self.root.after(3000, self.check_messages)
+            print("=== Events Handled ===\n")
 
     def show_main_screen(self):
         print("\n=== Setting up main screen... ===\n")
@@ -308,9 +380,8 @@ class ChatInterface:
             self.users_list.bind('<<ListboxSelect>>', self.on_user_select)
             self.message_input.bind('<Return>', lambda e: self.send_message())
             
-            # Initial user list population
-            self.refresh_user_list()
-            self.update_unread_count()
+            # The user list and unread counter are filled in by the first events
+            # of the subscription
             
             print("Main screen setup complete")
             
@@ -318,50 +389,40 @@ class ChatInterface:
             print(f"Error setting up main screen: {str(e)}")
             messagebox.showerror("Error", f"Failed to set up main screen: {str(e)}")
 
-    def refresh_user_list(self):
-        """Refresh the list of users"""
-        if not self.current_user_id or not self.current_token:
-            return
-        
+    def reload_accounts(self):
+        """Fetch the account list; account events keep it up to date afterwards"""
+        try:
+            self.accounts = dict(self.client.ListAccountIDs(self.current_user_id, self.current_token, "*"))
+        except Exception as e:
+            print(f"Error fetching accounts: {str(e)}")
+
+    def reload_unread_messages(self):
+        """Fetch the unread messages; message events keep them up to date afterwards"""
         try:
-            # Get list of all users
-            users = self.client.ListAccounts(self.current_user_id, self.current_token, "*")
-            if not users:
-                return
-            
-            # Get unread messages
             unread_messages = self.client.GetUnreadMessages(self.current_user_id, self.current_token)
-            unread_by_user = {}
-            for msg_id, sender_id, _ in unread_messages:
-                unread_by_user[sender_id] = unread_by_user.get(sender_id, 0) + 1
-            
-            # Clear current list
-            self.users_list.delete(0, tk.END)
-            
-            # Add users to list
-            for username in users:
-                if username:  # Skip empty usernames
-                    found, user_id = self.client.GetUserByUsername(username)
-                    if found and user_id != self.current_user_id:
-                        display_name = username
-                        if user_id in unread_by_user:
-                            display_name = f"[NEW] {display_name} (UNREAD: {unread_by_user[user_id]})"
-                        self.users_list.insert(tk.END, display_name)
-            
+            self.unread_senders = {msg_id: sender_id for msg_id, sender_id, _ in unread_messages}
         except Exception as e:
-            print(f"Error refreshing user list: {str(e)}")
+            print(f"Error fetching unread messages: {str(e)}")
 
-    def update_unread_count(self):
-        """Update the unread messages counter"""
+    def refresh_user_list(self):
+        """Redraw the list of users from the accounts and unread messages held locally"""
         if not self.current_user_id or not self.current_token:
             return
         
-        try:
-            unread = self.client.GetUnreadMessages(self.current_user_id, self.current_token)
-            count = len(unread) if unread else 0
-            self.unread_counter_label.config(text=f"Unread Messages: {count}")
-        except Exception as e:
-            print(f"Error updating unread count: {str(e)}")
+        unread_by_user = {}
+        for sender_id in self.unread_senders.values():
+            unread_by_user[sender_id] = unread_by_user.get(sender_id, 0) + 1
+        
+        # Clear current list
+        self.users_list.delete(0, tk.END)
+        
+        # Add users to list
+        for username, user_id in sorted(self.accounts.items()):
+            if username and user_id != self.current_user_id:  # Skip empty usernames
+                display_name = username
+                if user_id in unread_by_user:
+                    display_name = f"[NEW] {display_name} (UNREAD: {unread_by_user[user_id]})"
+                self.users_list.insert(tk.END, display_name)
 
     def on_user_select(self, event):
         """Handle user selection from the list"""
@@ -376,21 +437,31 @@ class ChatInterface:
         
         try:
             # Get user ID for selected username
-            found, conversant_id = self.client.GetUserByUsername(selected)
-            if not found:
+            conversant_id = self.accounts.get(selected)
+            if conversant_id is None:
                 print(f"Could not find user ID for username: {selected}")
                 return
             
-            # Get conversation
-            messages = self.client.DisplayConversation(
-                self.current_user_id,
-                self.current_token,
-                conversant_id
-            )
-            
-            # Clear and update message display
             self.message_display.config(state=tk.NORMAL)
-            self.message_display.delete(1.0, tk.END)
+            if conversant_id == self.displayed_conversant_id and self.message_ids:
+                # Same conversation: append only what arrived since the last message shown
+                messages = self.client.DisplayConversation(
+                    self.current_user_id,
+                    self.current_token,
+                    conversant_id,
+                    after_message_id=self.message_ids[-1]
+                )
+            else:
+                # New conversation: show its latest page
+                messages = self.client.DisplayConversation(
+                    self.current_user_id,
+                    self.current_token,
+                    conversant_id,
+                    limit=CONVERSATION_PAGE_SIZE
+                )
+                self.message_display.delete(1.0, tk.END)
+                self.message_ids = []
+                self.displayed_conversant_id = conversant_id
             
             for msg_id, content, is_sender in messages:
                 sender = "You" if is_sender else selected
@@ -421,8 +492,8 @@ class ChatInterface:
         
         try:
             # Get recipient ID
-            found, recipient_id = self.client.GetUserByUsername(selected)
-            if not found:
+            recipient_id = self.accounts.get(selected)
+            if recipient_id is None:
                 messagebox.showerror("Error", f"Could not find user ID for: {selected}")
                 return
             
@@ -462,9 +533,16 @@ class ChatInterface:
 
     def handle_logout(self):
         """Handle logout"""
+        if self.subscription is not None:
+            self.subscription.cancel()
+            self.subscription = None
+        self.message_queue = Queue()  # Drop events still pending for this user
         self.current_user_id = None
         self.current_token = None
         self.message_ids = []
+        self.displayed_conversant_id = None
+        self.accounts = {}
+        self.unread_senders = {}
         self.show_login_screen()
 
     def run(self):
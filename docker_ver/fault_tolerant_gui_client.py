@@ -66,14 +66,17 @@ class FaultTolerantGUIClient(FaultTolerantClient):
         """
         return super().ListAccounts(user_id, session_token, wildcard)
 
-    def DisplayConversation(self, user_id: int, session_token: str, conversant_id: int) -> List[Tuple[int, str, bool]]:
+    def DisplayConversation(self, user_id: int, session_token: str, conversant_id: int,
+                            before_message_id: Optional[int] = None, after_message_id: Optional[int] = None,
+                            limit: int = 0, allow_stale: bool = False) -> List[Tuple[int, str, bool]]:
         """
-        Display the conversation between user_id and conversant_id.
+        Display the conversation between user_id and conversant_id, or one page of it.
         
         Returns:
             List[Tuple[int, str, bool]]: List of (message_id, message_content, sender_flag)
         """
-        return super().DisplayConversation(user_id, session_token, conversant_id)
+        return super().DisplayConversation(user_id, session_token, conversant_id,
+                                           before_message_id, after_message_id, limit, allow_stale)
 
     def SendMessage(self, sender_id: int, session_token: str, recipient_id: int, message: str) -> bool:
         """
@@ -131,23 +134,24 @@ class FaultTolerantGUIClient(FaultTolerantClient):
             print(f"[CLIENT] DeleteAccount failed: {e}")
             return False
 
-    def GetUnreadMessages(self, user_id: int, session_token: str) -> List[Tuple[int, int, int]]:
+    def GetUnreadMessages(self, user_id: int, session_token: str, allow_stale: bool = False) -> List[Tuple[int, int, int]]:
         """
         Get unread messages for the user.
         
         Returns:
             List[Tuple[int, int, int]]: List of (message_id, sender_id, receiver_id)
         """
-        return super().GetUnreadMessages(user_id, session_token)
+        return super().GetUnreadMessages(user_id, session_token, allow_stale)
 
-    def GetMessageInformation(self, user_id: int, session_token: str, message_id: int) -> Tuple[bool, int, int, str]:
+    def GetMessageInformation(self, user_id: int, session_token: str, message_id: int,
+                              allow_stale: bool = False) -> Tuple[bool, int, int, str]:
         """
         Get information about a specific message.
         
         Returns:
             Tuple[bool, int, int, str]: (read_flag, sender_id, content_length, message_content)
         """
-        return super().GetMessageInformation(user_id, session_token, message_id)
+        return super().GetMessageInformation(user_id, session_token, message_id, allow_stale)
 
     def GetUsernameByID(self, user_id: int) -> str:
         """
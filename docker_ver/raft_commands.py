@@ -0,0 +1,79 @@
+# raft_commands.py
+"""
+Encoding of the commands carried by Raft log entries.
+
+In memory a command is a dict with a "type" key, as built by RaftNode and read
+by _apply_command. In the log, on disk and in AppendEntries and Propose RPCs it
+is a serialized exp_pb2.Command, whose oneof holds one typed message per
+command type; it is encoded once when appended, and the bytes are replicated
+and stored as a BLOB as they are.
+
+Entries written by earlier versions hold JSON text instead. decode_command()
+accepts either, so an existing log loads as is; RaftNode rewrites such entries
+in the binary form when it starts (see is_legacy_encoding). Every node of a
+cluster must run the same version, as the RPCs carry only the binary form.
+"""
+import json
+from typing import Dict, List, Tuple, Union
+
+import exp_pb2
+
+# Command type -> (Command oneof field, message class)
+COMMAND_TYPES = {
+    "NOOP": ("noop", exp_pb2.NoopCommand),
+    "CREATE_ACCOUNT": ("create_account", exp_pb2.CreateAccountCommand),
+    "CREATE_SESSION": ("create_session", exp_pb2.CreateSessionCommand),
+    "SEND_MESSAGE": ("send_message", exp_pb2.SendMessageCommand),
+    "READ_MESSAGES": ("read_messages", exp_pb2.ReadMessagesCommand),
+    "MARK_READ": ("mark_read", exp_pb2.MarkReadCommand),
+    "DELETE_MESSAGE": ("delete_message", exp_pb2.DeleteMessageCommand),
+    "DELETE_ACCOUNT": ("delete_account", exp_pb2.DeleteAccountCommand),
+}
+
+
+def _message_fields(message_class) -> Tuple[List[str], List[str]]:
+    # (fields always present, fields present only when set)
+    fields = message_class.DESCRIPTOR.fields
+    return ([field.name for field in fields if not field.has_presence],
+            [field.name for field in fields if field.has_presence])
+
+
+# Command oneof field -> (command type, fields of its message)
+_ONEOF_FIELDS = {field: (cmd_type, _message_fields(message_class))
+                 for cmd_type, (field, message_class) in COMMAND_TYPES.items()}
+
+
+def encode_command(command: Dict) -> bytes:
+    """Serialize a command dict; missing keys take their default, keys the message lacks are dropped."""
+    field = COMMAND_TYPES[command["type"]][0]
+    required, optional = _ONEOF_FIELDS[field][1]
+    entry = exp_pb2.Command()
+    message = getattr(entry, field)
+    message.SetInParent()  # Selects the oneof field even if every value is a default
+    for name in required + optional:
+        value = command.get(name)
+        if value is not None:
+            setattr(message, name, value)
+    return entry.SerializeToString()
+
+
+def decode_command(encoded: Union[bytes, str]) -> Dict:
+    """Rebuild the command dict from encode_command() output, or from a legacy JSON entry."""
+    if is_legacy_encoding(encoded):
+        return json.loads(encoded)
+    entry = exp_pb2.Command.FromString(encoded)
+    field = entry.WhichOneof("command")
+    cmd_type, (required, optional) = _ONEOF_FIELDS[field]
+    message = getattr(entry, field)
+    command = {"type": cmd_type}
+    for name in required:
+        command[name] = getattr(message, name)
+    for name in optional:
+        if message.HasField(name):
+            command[name] = getattr(message, name)
+    return command
+
+
+def is_legacy_encoding(encoded: Union[bytes, str]) -> bool:
+    """Whether a stored command is JSON text from before the binary encoding (SQLite returns it as str)."""
+    return isinstance(encoded, str)
@@ -0,0 +1,52 @@
+# raft_groups.py
+"""
+Placement of users, conversations and messages across Raft groups.
+
+A sharded cluster runs several independent Raft groups, each with its own
+leader, log and database, on the same processes. A user belongs to the group
+their username hashes to, and the IDs a group hands out encode that group, so
+any node or client can route a request from the IDs alone:
+
+  * user IDs are congruent to their group modulo the number of groups;
+  * a conversation lives in the group of its lower user ID (its home group),
+    which assigns message IDs, so every message of a conversation, and with
+    it the paging cursors, comes from one ordered sequence;
+  * message IDs are derived from the home group's log index, and likewise
+    encode the group.
+
+With a single group everything maps to group 0, as in an unsharded cluster.
+The number of groups is fixed when a cluster is created; existing data is not
+repartitioned.
+"""
+import zlib
+
+
+def group_for_username(username: str, num_groups: int) -> int:
+    """Return the group that owns a username (stable across processes, unlike hash())."""
+    return zlib.crc32(username.encode()) % num_groups
+
+
+def group_for_user(user_id: int, num_groups: int) -> int:
+    """Return the group that owns a user ID."""
+    return user_id % num_groups
+
+
+def group_for_conversation(user_a: int, user_b: int, num_groups: int) -> int:
+    """Return the home group of the conversation between two users."""
+    return group_for_user(min(user_a, user_b), num_groups)
+
+
+def group_for_message(message_id: int, num_groups: int) -> int:
+    """Return the home group of a message, i.e. the one that assigned its ID."""
+    return (message_id - 1) % num_groups
+
+
+def message_id_for_index(index: int, group_id: int, num_groups: int) -> int:
+    """Return the ID of the message sent by the entry at a group's log index."""
+    return index * num_groups + group_id + 1
+
+
+def next_user_id(after: int, group_id: int, num_groups: int) -> int:
+    """Return the lowest user ID above `after` that belongs to the group."""
+    user_id = after + 1
+    return user_id + (group_id - user_id) % num_groups
@@ -1,17 +1,20 @@
-<<<<<<< HEAD
 # raft_node.py
 import os
-import sys
 import time
 import json
 import random
 import threading
-import sqlite3
 import grpc
 import hashlib
+import functools
+import glob
+import heapq
+import asyncio
+import itertools
 from concurrent import futures
-from typing import Dict, List, Optional, Tuple, Set, Any
-from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict, defaultdict
 import logging
 
 # Existing imports
@@ -19,6 +22,15 @@ import exp_pb2
 import exp_pb2_grpc
 from core_entities import User, Message
 from core_structures import GlobalUserBase, GlobalUserTrie, GlobalSessionTokens, GlobalMessageBase, GlobalConversations
+from raft_storage import (
+    RaftStorage, GroupCommitLog, StateWriteBatch, SELECT_RAFT_STATE, SELECT_LOG_ENTRIES, SELECT_USERS, SELECT_MESSAGES, SELECT_SESSION_TOKENS,
+    UPSERT_RAFT_STATE, UPSERT_LOG_ENTRY, UPSERT_SESSION_TOKEN, DELETE_LOG_PREFIX,
+    SELECT_MESSAGE, SELECT_CONVERSATION_AFTER, SELECT_CONVERSATION_BEFORE, SELECT_MESSAGE_TOMBSTONE
+)
+from user_events import UserEventHub, ACCOUNT_EVENTS
+from raft_groups import group_for_user, group_for_message, message_id_for_index, next_user_id
+from raft_commands import encode_command, decode_command, is_legacy_encoding
+from raft_steps import Steps, Wait, run_steps, run_steps_async
 
 # Configure logging
 logging.basicConfig(
@@ -31,6 +43,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def _await_rpc(call: grpc.Future):
+    """Await a gRPC call started with .future() on a synchronous stub, without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    call.add_done_callback(lambda _: loop.call_soon_threadsafe(lambda: done.done() or done.set_result(None)))
+    await done
+    return call.result()
+
 # Define Raft node states
 class NodeState:
     FOLLOWER = "FOLLOWER"
@@ -40,19 +60,62 @@ class NodeState:
 class RaftNode(exp_pb2_grpc.RaftServiceServicer):
     """Implementation of a Raft consensus node for the chat system."""
     
-    def __init__(self, node_id: str, cluster_config: Dict[str, str], data_dir: str):
+    def __init__(self, node_id: str, cluster_config: Dict[str, str], data_dir: str,
+                 sqlite_synchronous: str = "FULL", max_append_entries: int = 512,
+                 max_append_bytes: int = 1 << 20, max_inflight_appends: int = 4,
+                 snapshot_threshold: int = 10000, snapshot_trailing: int = 1000,
+                 lazy_state: bool = False, message_cache_size: int = 100000,
+                 conversation_cache_bytes: int = 64 << 20, conversation_window: int = 1000,
+                 max_subscribers: int = 100, lease_reads: bool = False,
+                 group_id: int = 0, num_groups: int = 1, raft_addresses: Optional[Dict[str, str]] = None,
+                 max_pending_entries: int = 1000, max_pending_bytes: int = 8 << 20):
         """
         Initialize a Raft node.
-        
+
         Args:
             node_id: Unique identifier for this node
             cluster_config: Dict mapping node_ids to "host:port" addresses
             data_dir: Directory to store persistent data
+            sqlite_synchronous: SQLite synchronous level (OFF, NORMAL, FULL or EXTRA)
+            max_append_entries: Most log entries sent in one AppendEntries RPC
+            max_append_bytes: Most encoded command bytes sent in one AppendEntries RPC
+            max_inflight_appends: AppendEntries RPCs kept outstanding per follower
+            snapshot_threshold: Applied entries that accumulate before the log is compacted
+            snapshot_trailing: Applied entries kept in the log after compaction for slow followers
+            lazy_state: Load only users and session tokens at startup; fetch messages and
+                conversations from SQLite on first access
+            message_cache_size: Messages kept in memory when lazy_state is set
+            conversation_cache_bytes: Approximate memory budget for cached conversations
+                when lazy_state is set; least recently used ones are evicted beyond it
+            conversation_window: Newest messages of each conversation kept in memory when
+                lazy_state is set; older pages are read from SQLite
+            max_subscribers: Most Subscribe streams served at once
+            lease_reads: Let the leader serve linearizable reads without a heartbeat
+                round while it holds a lease renewed by majority acknowledgements;
+                nodes then also ignore RequestVote while they know of a live leader
+            group_id: Raft group this node belongs to, when the cluster is sharded
+                across several independent groups (see raft_groups.py)
+            num_groups: Number of Raft groups in the cluster
+            raft_addresses: Dict mapping node_ids to the addresses of their Raft
+                service, when it is served apart from client traffic; defaults to
+                cluster_config
+            max_pending_entries: Uncommitted entries the leader accepts before it turns
+                away client writes (0 for no limit)
+            max_pending_bytes: Encoded bytes of uncommitted entries the leader accepts
+                before it turns away client writes (0 for no limit)
         """
         self.node_id = node_id
         self.cluster_config = cluster_config
         self.address = cluster_config[node_id]
+        self.raft_addresses = raft_addresses or cluster_config
         self.data_dir = data_dir
+        self.sqlite_synchronous = sqlite_synchronous
+        self.lazy_state = lazy_state
+        self.message_cache_size = message_cache_size
+        self.conversation_cache_bytes = conversation_cache_bytes
+        self.conversation_window = conversation_window
+        self.group_id = group_id
+        self.num_groups = num_groups
         
         # Ensure data directory exists
         os.makedirs(data_dir, exist_ok=True)
@@ -63,17 +126,82 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         self.voted_for = None
         self.leader_id = None
         
-        # Log entries and commit index
+        # Log entries and commit index. Entries up to snapshot_index have been
+        # compacted away; their effects live in the state tables, so self.log[0]
+        # holds the entry at index snapshot_index + 1.
         self.log = []  # List of (term, command) entries
+        self.log_encoded = []  # Binary encoding of each command, parallel to self.log
+        self.snapshot_index = -1  # Index of the last compacted entry
+        self.snapshot_term = 0  # Term of the last compacted entry
+        self.snapshot_threshold = snapshot_threshold
+        self.snapshot_trailing = snapshot_trailing
+        self.snapshot_chunk_bytes = 1 << 20  # Bytes per InstallSnapshot chunk
+        self.snapshot_export = None  # (path, last_index, last_term) of the latest exported snapshot file
+        self.snapshot_export_lock = threading.Lock()
+        self.snapshot_senders = {}  # Dict mapping node_id to its running InstallSnapshot thread
+        self.apply_lock = threading.Lock()  # Held while entries or snapshots are applied to the state machine
+        self.lock = threading.RLock()  # Guards Raft state shared by RPC, replicator and client threads
+        self.durable_index = -1  # Highest log index known to be on disk
         self.commit_index = -1
         self.last_applied = -1
         
+        # Futures for client requests waiting on their entry, keyed by log index.
+        # Each value is (term, Future); the Future resolves True once the entry is
+        # applied, or False if a different entry ends up at that index.
+        self.apply_waiters: Dict[int, Tuple[int, Future]] = {}
+        self.apply_event = threading.Event()  # Set whenever commit_index advances
+        
+        # Admission control: entries this node appended as leader whose Futures
+        # haven't resolved yet. Client writes are turned away while either bound
+        # is reached, rather than queueing up until they time out.
+        self.max_pending_entries = max_pending_entries
+        self.max_pending_bytes = max_pending_bytes
+        self.pending_lock = threading.Lock()
+        self.pending_entries = 0
+        self.pending_bytes = 0
+        self.commit_latency = 0.0  # Moving average of seconds from append to apply
+        
         # Leader state (initialized when becoming leader)
         self.next_index = {}  # Dict mapping node_id to next log index
         self.match_index = {}  # Dict mapping node_id to highest log index known to be replicated
+        self.inflight_appends = {}  # Dict mapping node_id to outstanding AppendEntries RPCs
+        
+        # Replication batching and pipelining limits
+        self.max_append_entries = max_append_entries
+        self.max_append_bytes = max_append_bytes
+        self.max_inflight_appends = max_inflight_appends
+        self.append_timeout = 1.0  # Seconds before an outstanding AppendEntries is given up on
+        
+        # Committed entries are applied in runs of up to max_apply_entries, each in
+        # one transaction; state-table writes of the run are staged in state_writes
+        self.max_apply_entries = 512
+        self.state_writes: Optional[StateWriteBatch] = None
+        
+        # ReadIndex: every AppendEntries carries the heartbeat round current when it
+        # was sent, and a read is served once a majority has acknowledged a round
+        # started after its read index was taken
+        self.heartbeat_round = 0
+        self.sent_round = {}  # Dict mapping node_id to the round of its latest AppendEntries
+        self.acked_round = {}  # Dict mapping node_id to the highest round it acknowledged this term
+        self.leader_progress = threading.Condition(self.lock)  # Notified on acks, commits and step-down
+        self.applied_cond = threading.Condition()  # Notified whenever last_applied advances
+        self.applied_futures = []  # Heap of (index, seq, Future), each resolved once last_applied reaches index
+        self.applied_future_seq = itertools.count()
+        self.read_timeout = 2.0  # Seconds a linearizable read waits before giving up
+        
+        # Leader lease: no other leader can be elected until a follower has gone the
+        # minimum election timeout without hearing from us, so once a majority has
+        # acknowledged an AppendEntries sent at time t we remain leader until
+        # t + lease_duration. The margin below the timeout absorbs clock drift.
+        self.lease_reads = lease_reads
+        self.min_election_timeout = 5.0  # Lower bound of _generate_election_timeout
+        self.lease_duration = self.min_election_timeout * 0.9
+        self.acked_sent_at = {}  # Dict mapping node_id to the send time (monotonic) of its latest acknowledged AppendEntries
+        self.last_leader_contact = 0.0  # Monotonic time we last heard from a current leader
         
         # Timing variables
         self.election_timeout = self._generate_election_timeout()
+        self.heartbeat_interval = 0.05  # Seconds between AppendEntries to an idle peer
         self.last_heartbeat = time.time()
         
         # Initialize database connection
@@ -81,15 +209,15 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         self._init_database()
         
         # Initialize in-memory state (loaded from persistent storage)
-        self.user_base = GlobalUserBase()
-        self.user_trie = GlobalUserTrie()
-        self.session_tokens = GlobalSessionTokens()
-        self.message_base = GlobalMessageBase()
-        self.conversations = GlobalConversations()
+        self._init_state_machine()
         
         # Load state from database
         self._load_state_from_db()
         
+        # Per-user events for Subscribe streams, produced as entries are applied;
+        # offsets are log indexes, so a client can resume on any node
+        self.user_events = UserEventHub(self.last_applied, max_subscribers=max_subscribers)
+        
         # Initialize peers (gRPC connections to other nodes)
         self.peers = {}
         self.unreachable_peers = set()
@@ -97,217 +225,584 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         
         # Start background threads
         self.running = True
+        self._start_replicators()
         self.raft_thread = threading.Thread(target=self._run_raft_loop)
         self.raft_thread.daemon = True
         self.raft_thread.start()
+        self.apply_thread = threading.Thread(target=self._run_apply_loop)
+        self.apply_thread.daemon = True
+        self.apply_thread.start()
         
         logger.info(f"Initialized Raft node {self.node_id} at {self.address}")
     
     def _init_database(self):
-        """Initialize the SQLite database for persistent storage."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        # Create tables if they don't exist
+        """Open the node's storage layer and create tables if they don't exist."""
+        self.storage = RaftStorage(self.db_path, synchronous=self.sqlite_synchronous)
+        self.storage.init_schema()
         
-        # Raft state table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS raft_state (
-            key TEXT PRIMARY KEY,
-            value TEXT
-        )
-        ''')
-        
-        # Log entries table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS log_entries (
-        log_index INTEGER PRIMARY KEY,
-        term INTEGER,
-        command TEXT
-        )
-        ''')
-        
-        # Users table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY,
-            username TEXT UNIQUE,
-            password_hash TEXT,
-            data TEXT
-        )
-        ''')
-        
-        # Messages table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS messages (
-            message_id INTEGER PRIMARY KEY,
-            sender_id INTEGER,
-            receiver_id INTEGER,
-            content TEXT,
-            has_been_read INTEGER,
-            timestamp INTEGER
-        )
-        ''')
-        
-        # Session tokens table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS session_tokens (
-            user_id INTEGER PRIMARY KEY,
-            token TEXT,
-            expiry INTEGER
-        )
-        ''')
+        # Log appends from concurrent client requests share one transaction
+        self.log_writer = GroupCommitLog(self.storage)
         
-        conn.commit()
-        conn.close()
+        # Snapshot files left behind by a previous run are never reused
+        for path in glob.glob(os.path.join(self.data_dir, f"snapshot_{self.node_id}_*.db")):
+            os.remove(path)
         
         logger.info(f"Database initialized at {self.db_path}")
     
     def _load_state_from_db(self):
         """Load the node's state from the database."""
         
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        # Load Raft state
-        c.execute("SELECT key, value FROM raft_state")
-        raft_state = dict(c.fetchall())
+        with self.storage.reader() as conn:
+            c = conn.cursor()
+            
+            # Load Raft state
+            c.execute(SELECT_RAFT_STATE)
+            raft_state = dict(c.fetchall())
+            
+            if "current_term" in raft_state:
+                self.current_term = int(raft_state["current_term"])
+            if "voted_for" in raft_state:
+                self.voted_for = raft_state["voted_for"] if raft_state["voted_for"] != "None" else None
+            if "commit_index" in raft_state:
+                self.commit_index = int(raft_state["commit_index"])
+            if "snapshot_index" in raft_state:
+                self.snapshot_index = int(raft_state["snapshot_index"])
+                self.snapshot_term = int(raft_state["snapshot_term"])
+            
+            # The state tables already reflect every entry up to last_applied,
+            # so only entries after it are replayed
+            if "last_applied" in raft_state:
+                self.last_applied = int(raft_state["last_applied"])
+            self.last_applied = max(self.last_applied, self.snapshot_index)
+            self.commit_index = max(self.commit_index, self.last_applied)
+            
+            # Load log entries that follow the compacted prefix
+            c.execute(SELECT_LOG_ENTRIES, (self.snapshot_index,))
+            rows = c.fetchall()
+            self.log = [(term, decode_command(command)) for term, command in rows]
+            self.log_encoded = [command for _, command in rows]
+            self.durable_index = self._last_log_index()
+        
+        self._migrate_legacy_log()
+        
+        self._load_state_machine()
         
-        if "current_term" in raft_state:
-            self.current_term = int(raft_state["current_term"])
-        if "voted_for" in raft_state:
-            self.voted_for = raft_state["voted_for"] if raft_state["voted_for"] != "None" else None
-        if "commit_index" in raft_state:
-            self.commit_index = int(raft_state["commit_index"])
-        
-        # Load log entries
-        c.execute("SELECT term, command FROM log_entries ORDER BY log_index ASC")
-        self.log = [(term, json.loads(command)) for term, command in c.fetchall()]
+        self.state = NodeState.FOLLOWER
+        self.leader_id = None
+        self.voted_for = None
+        # self.last_heartbeat = 0
+        self.last_heartbeat = time.time()
+    
+    def _init_state_machine(self):
+        """Create empty in-memory state structures backed by the state tables."""
+        self.user_base = GlobalUserBase()
+        self.user_trie = GlobalUserTrie()
+        self.session_tokens = GlobalSessionTokens()
         
+        # Cache misses are loaded under the storage write lock, so a load never
+        # interleaves with an entry being applied
+        message_capacity = self.message_cache_size if self.lazy_state else None
+        conversation_budget = self.conversation_cache_bytes if self.lazy_state else None
+        conversation_window = self.conversation_window if self.lazy_state else None
+        self.message_base = GlobalMessageBase(self._load_message, message_capacity, self.storage.write_lock)
+        self.conversations = GlobalConversations(self._page_conversation, conversation_window,
+                                                 conversation_budget, self.storage.write_lock)
+    
+    def _flush_state_writes(self):
+        """
+        Write out the staged writes of the run being applied, so a lazy load in
+        the middle of the run sees the entries applied before it. Called with
+        storage.write_lock held, which a run keeps until it commits.
+        """
+        if self.state_writes:
+            with self.storage.transaction() as c:
+                self.state_writes.flush(c)
+    
+    def _load_message(self, message_id: int) -> Optional[Message]:
+        """Fetch one message from the messages table, or None if it doesn't exist."""
+        self._flush_state_writes()
+        rows = self.storage.query_latest(SELECT_MESSAGE, (message_id,))
+        if not rows:
+            return None
+        msg_id, sender_id, receiver_id, content, has_been_read, timestamp = rows[0]
+        return Message(msg_id, content, sender_id, receiver_id, bool(has_been_read), timestamp)
+    
+    def _is_tombstoned(self, message_id: int) -> bool:
+        """Whether a message delivered from another group has been deleted here."""
+        self._flush_state_writes()
+        return bool(self.storage.query_latest(SELECT_MESSAGE_TOMBSTONE, (message_id,)))
+    
+    def _page_conversation(self, conversation_key: Tuple[int, int], before_id: Optional[int],
+                           after_id: Optional[int], limit: Optional[int]) -> List[Message]:
+        """
+        Fetch a page of messages between a pair of users, oldest first: the
+        earliest `limit` after after_id if it is given, otherwise the latest
+        `limit` before before_id.
+        """
+        self._flush_state_writes()
+        before = before_id if before_id is not None else 2 ** 63 - 1
+        limit = limit if limit is not None else -1
+        if after_id is not None:
+            rows = self.storage.query_latest(SELECT_CONVERSATION_AFTER,
+                                             conversation_key + (after_id, before, limit))
+        else:
+            rows = self.storage.query_latest(SELECT_CONVERSATION_BEFORE, conversation_key + (before, limit))
+            rows.reverse()
+        return [Message(msg_id, content, sender_id, receiver_id, bool(has_been_read), timestamp)
+                for msg_id, sender_id, receiver_id, content, has_been_read, timestamp in rows]
+    
+    def _load_state_machine(self):
+        """
+        Load users and session tokens from the state tables.
         
-        # Load users
-        c.execute("SELECT user_id, username, password_hash, data FROM users")
-        for user_id, username, password_hash, data in c.fetchall():
-            logger.info(f"(raft_node.py) _load_state_from_db: Loading user from DB: {user_id}, {username}, data: {data}")
-
-            user_data = json.loads(data)
-            user = User(user_id, username, password_hash)
-            user.unread_messages = deque(user_data.get("unread_messages", []))
-            user.recent_conversants = user_data.get("recent_conversants", [])
-            
-            self.user_base.users[user_id] = user
-            self.user_trie.add(username, user)
-
-            
-        # Load messages
-        c.execute("SELECT message_id, sender_id, receiver_id, content, has_been_read, timestamp FROM messages")
-        for msg_id, sender_id, receiver_id, content, has_been_read, timestamp in c.fetchall():
-            message = Message(
-                msg_id, 
-                content, 
-                sender_id, 
-                receiver_id,
-                bool(has_been_read),
-                timestamp
-            )
-            self.message_base.messages[msg_id] = message
+        Messages and conversations are loaded too unless lazy_state is set, in
+        which case they are fetched on first access.
+        """
+        with self.storage.reader() as conn:
+            c = conn.cursor()
             
-            # Update conversation
-            conversation_key = tuple(sorted([sender_id, receiver_id]))
-            self.conversations.conversations[conversation_key].append(message)
-        
-        # Load session tokens
-        c.execute("SELECT user_id, token, expiry FROM session_tokens WHERE expiry > ?", (int(time.time()),))
-        for user_id, token, expiry in c.fetchall():
-            self.session_tokens.tokens[user_id] = token
+            # Load users
+            c.execute(SELECT_USERS)
+            for user_id, username, password_hash, data in c.fetchall():
+                logger.info(f"(raft_node.py) _load_state_from_db: Loading user from DB: {user_id}, {username}, data: {data}")
 
-        logger.info(f"(raft_node.py) _load_state_from_db: Loaded {len(self.user_base.users)} users and {len(self.message_base.messages)} messages from DB")
-        logger.info(f"(raft_node.py) _load_state_from_db: loaded {len(self.session_tokens.tokens)} session tokens.")
+                user_data = json.loads(data)
+                user = User(user_id, username, password_hash)
+                user.unread_messages = OrderedDict.fromkeys(user_data.get("unread_messages", []))
+                user.recent_conversants = OrderedDict.fromkeys(user_data.get("recent_conversants", []))
+                
+                self.user_base.users[user_id] = user
+                self.user_trie.add(username, user)
 
-        conn.close()
+                
+            # Load messages
+            if not self.lazy_state:
+                conversations = defaultdict(list)
+                c.execute(SELECT_MESSAGES)
+                for msg_id, sender_id, receiver_id, content, has_been_read, timestamp in c.fetchall():
+                    message = Message(
+                        msg_id, 
+                        content, 
+                        sender_id, 
+                        receiver_id,
+                        bool(has_been_read),
+                        timestamp
+                    )
+                    self.message_base.messages[msg_id] = message
+                    
+                    # Update conversation
+                    conversation_key = tuple(sorted([sender_id, receiver_id]))
+                    conversations[conversation_key].append(message)
+                for conversation_key, messages in conversations.items():
+                    self.conversations.set_conversation(conversation_key, messages)
+            
+            # Load session tokens
+            c.execute(SELECT_SESSION_TOKENS, (int(time.time()),))
+            for user_id, token, expiry in c.fetchall():
+                self.session_tokens.tokens[user_id] = token
 
-        self.state = NodeState.FOLLOWER
-        self.leader_id = None
-        self.voted_for = None
-        # self.last_heartbeat = 0
-        self.last_heartbeat = time.time()
+        logger.info(f"(raft_node.py) _load_state_from_db: Loaded {len(self.user_base.users)} users and {len(self.message_base.messages)} messages from DB"
+                    f"{' (messages load on demand)' if self.lazy_state else ''}")
+        logger.info(f"(raft_node.py) _load_state_from_db: loaded {len(self.session_tokens.tokens)} session tokens.")
 
-        # Update next_user_id and next_message_id based on existing data
-        if self.user_base.users:
-            self.user_base._next_user_id = max(self.user_base.users.keys()) + 1
-        if self.message_base.messages:
-            self.message_base._next_message_id = max(self.message_base.messages.keys()) + 1
+        # Continue user IDs after the highest one stored, within this node's group
+        self.user_base._next_user_id = next_user_id(max(self.user_base.users.keys(), default=0),
+                                                    self.group_id, self.num_groups)
         
         # logger.info(f"Loaded state from database: {len(self.user_base.users)} users, {len(self.message_base.messages)} messages")
     
+    def _migrate_legacy_log(self):
+        """Rewrite log entries stored as JSON by earlier versions in the binary encoding."""
+        legacy = [i for i, encoded in enumerate(self.log_encoded) if is_legacy_encoding(encoded)]
+        if not legacy:
+            return
+        for i in legacy:
+            self.log_encoded[i] = encode_command(self.log[i][1])
+        self.storage.executemany(UPSERT_LOG_ENTRY, [
+            (self.snapshot_index + 1 + i, self.log[i][0], self.log_encoded[i]) for i in legacy
+        ])
+        logger.info(f"Rewrote {len(legacy)} JSON log entries in the binary encoding")
+    
     def _persist_raft_state(self):
         """Persist Raft state to the database."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute("DELETE FROM raft_state")
-        c.execute("INSERT INTO raft_state VALUES (?, ?)", ("current_term", str(self.current_term)))
-        c.execute("INSERT INTO raft_state VALUES (?, ?)", ("voted_for", str(self.voted_for)))
-        c.execute("INSERT INTO raft_state VALUES (?, ?)", ("commit_index", str(self.commit_index)))
-        
-        conn.commit()
-        conn.close()
+        self.storage.executemany(UPSERT_RAFT_STATE, [
+            ("current_term", str(self.current_term)),
+            ("voted_for", str(self.voted_for)),
+            ("commit_index", str(self.commit_index)),
+        ])
     
     def _persist_log_entry(self, index: int, term: int, command: Dict):
         """Persist a log entry to the database."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        self._persist_log_entries(index, [(term, encode_command(command))])
+    
+    def _persist_log_entries(self, start_index: int, entries: List[Tuple[int, str]]):
+        """
+        Persist consecutive (term, encoded command) log entries through the group-commit stage.
+        
+        Blocks until the batch containing them is durable.
+        """
+        rows = [(start_index + i, term, encoded) for i, (term, encoded) in enumerate(entries)]
+        self.log_writer.append_many(rows).result()
+        self._mark_durable(start_index + len(entries) - 1)
+    
+    def _truncate_log(self, from_index: int):
+        """Drop log entries from from_index onward, in memory and on disk; called with self.lock held."""
+        logger.info(f"Truncating log from index {from_index} (last index {self._last_log_index()})")
+        del self.log[from_index - self.snapshot_index - 1:]
+        del self.log_encoded[from_index - self.snapshot_index - 1:]
+        self.durable_index = min(self.durable_index, from_index - 1)
+        self.log_writer.truncate(from_index).result()
+        self._fail_apply_waiters(from_index)
+    
+    def _mark_durable(self, index: int):
+        """Record that every log entry up to index has been written to disk."""
+        with self.lock:
+            self.durable_index = max(self.durable_index, index)
+    
+    def _start_append_many(self, commands: List[Dict], term: int
+                           ) -> Optional[Tuple[List[int], Future, List[Future]]]:
+        """
+        Append commands to the leader's log as consecutive entries, without
+        waiting for the disk.
+        
+        The commands are encoded once here; replication and persistence reuse the
+        encoding. Concurrent callers are collected into one SQLite transaction by
+        the group-commit stage instead of each paying for its own fsync. Peers are
+        woken right away so replication overlaps with the local disk write.
+        
+        Callers check for leadership without holding the lock, so it is checked
+        again here: the entries are only appended if this node is still leader in
+        `term`, the term the caller saw. Otherwise another leader may already own
+        these indexes in that term, and an entry of ours there would break Log
+        Matching.
+        
+        Returns:
+            Optional[Tuple[List[int], Future, List[Future]]]: (log indexes assigned
+            to the commands, Future that resolves once all of them are durable,
+            Futures that resolve True once each entry has been committed and
+            applied), or None if this node is no longer leader in term
+        """
+        encoded = [encode_command(command) for command in commands]
+        with self.lock:
+            if self.state != NodeState.LEADER or self.current_term != term:
+                logger.warning(f"Refusing to append {len(commands)} entries: no longer leader in term {term}")
+                return None
+            first_index = self._last_log_index() + 1
+            indexes = list(range(first_index, first_index + len(commands)))
+            applied = []
+            for index, command, command_encoded in zip(indexes, commands, encoded):
+                self.log.append((term, command))
+                self.log_encoded.append(command_encoded)
+                future = Future()
+                self.apply_waiters[index] = (term, future)
+                applied.append(future)
+            durable = self.log_writer.append_many([(index, term, command_encoded)
+                                                   for index, command_encoded in zip(indexes, encoded)])
+        for future, command_encoded in zip(applied, encoded):
+            self._track_pending(future, len(command_encoded))
+        self._send_heartbeats()
+        return indexes, durable, applied
+    
+    def _track_pending(self, applied: Future, size: int):
+        """Count an appended entry as pending until its Future resolves."""
+        appended_at = time.monotonic()
+        with self.pending_lock:
+            self.pending_entries += 1
+            self.pending_bytes += size
+        
+        def release(_):
+            with self.pending_lock:
+                self.pending_entries -= 1
+                self.pending_bytes -= size
+                self.commit_latency += 0.2 * (time.monotonic() - appended_at - self.commit_latency)
+        
+        applied.add_done_callback(release)
+    
+    def admission_retry_after(self) -> float:
+        """
+        Admission control for client writes.
+        
+        Returns:
+            float: 0 if the leader can take another proposal; otherwise the seconds
+            a client should wait before retrying, the recent time from append to
+            apply, by which the entries now ahead of it should be done
+        """
+        with self.pending_lock:
+            if ((not self.max_pending_entries or self.pending_entries < self.max_pending_entries) and
+                    (not self.max_pending_bytes or self.pending_bytes < self.max_pending_bytes)):
+                return 0.0
+            return min(max(self.commit_latency, 0.05), 5.0)
+    
+    def _finish_append(self, index: int):
+        """Record that the entry at index is durable locally."""
+        self._mark_durable(index)
+        
+        # A single-node cluster commits on local durability alone
+        self._update_commit_index()
+    
+    def _append_to_log(self, command: Dict, term: int) -> Optional[Tuple[int, Future]]:
+        """
+        Append a command to the leader's log and wait until it is durable.
+        
+        Returns:
+            Optional[Tuple[int, Future]]: (log index assigned to the command, Future
+            that resolves True once the entry has been committed and applied), or
+            None if this node is no longer leader in term
+        """
+        appended = self._append_many_to_log([command], term)
+        if appended is None:
+            return None
+        indexes, applied = appended
+        return indexes[0], applied[0]
+    
+    async def _append_to_log_async(self, command: Dict, term: int) -> Optional[Tuple[int, Future]]:
+        """Awaitable _append_to_log, for the asyncio server."""
+        appended = await self._append_many_to_log_async([command], term)
+        if appended is None:
+            return None
+        indexes, applied = appended
+        return indexes[0], applied[0]
+    
+    def _append_many_to_log(self, commands: List[Dict], term: int) -> Optional[Tuple[List[int], List[Future]]]:
+        """
+        Append commands to the leader's log as consecutive entries and wait until
+        they are durable. Returns None if this node is no longer leader in term.
+        """
+        started = self._start_append_many(commands, term)
+        if started is None:
+            return None
+        indexes, durable, applied = started
+        durable.result()
+        self._finish_append(indexes[-1])
+        return indexes, applied
+    
+    async def _append_many_to_log_async(self, commands: List[Dict], term: int
+                                        ) -> Optional[Tuple[List[int], List[Future]]]:
+        """
+        Awaitable _append_many_to_log, for the asyncio server.
         
-        c.execute("INSERT OR REPLACE INTO log_entries VALUES (?, ?, ?)",
-                 (index, term, json.dumps(command)))
+        Appending takes self.lock, and advancing the commit index persists the
+        Raft state to SQLite while holding it, so both run on the event loop's
+        default executor; the loop never waits on the lock or on a disk sync.
+        """
+        loop = asyncio.get_running_loop()
+        started = await loop.run_in_executor(None, self._start_append_many, commands, term)
+        if started is None:
+            return None
+        indexes, durable, applied = started
+        await asyncio.wrap_future(durable)
+        await loop.run_in_executor(None, self._finish_append, indexes[-1])
+        return indexes, applied
+    
+    def _wait_for_apply(self, applied: Future, cmd_type: str, timeout: float = 5.0) -> bool:
+        """
+        Block until a proposed entry has been applied.
         
-        conn.commit()
-        conn.close()
+        Returns:
+            bool: True if the entry was committed and applied, False on timeout
+            or if the entry was replaced by another leader's entry
+        """
+        try:
+            if applied.result(timeout=timeout):
+                return True
+            logger.warning(f"{cmd_type} entry was overwritten before it could commit.")
+            return False
+        except futures.TimeoutError:
+            logger.warning(f"Timed out waiting for {cmd_type} entry to commit/apply.")
+            return False
     
-    def _persist_user(self, user: User):
-        """Persist a user to the database."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+    async def _wait_for_apply_async(self, applied: Future, cmd_type: str, timeout: float = 5.0) -> bool:
+        """Awaitable _wait_for_apply, for the asyncio server."""
+        try:
+            # Shielded so a timeout doesn't cancel the Future the apply thread resolves
+            if await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(applied)), timeout):
+                return True
+            logger.warning(f"{cmd_type} entry was overwritten before it could commit.")
+            return False
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out waiting for {cmd_type} entry to commit/apply.")
+            return False
+    
+    def _submit(self, command: Dict, wait_for_apply: bool = True) -> int:
+        """
+        Append a command as leader and wait for it to be applied, or only to be
+        durable locally if wait_for_apply is False.
         
+        Returns:
+            int: The entry's log index, or -1 if it didn't commit in time or this
+            node lost leadership before appending it
+        """
+        appended = self._append_to_log(command, self.current_term)
+        if appended is None:
+            return -1
+        index, applied = appended
+        if wait_for_apply and not self._wait_for_apply(applied, command["type"]):
+            return -1
+        return index
+    
+    async def _submit_async(self, command: Dict, wait_for_apply: bool = True) -> int:
+        """Awaitable _submit, for the asyncio server."""
+        appended = await self._append_to_log_async(command, self.current_term)
+        if appended is None:
+            return -1
+        index, applied = appended
+        if wait_for_apply and not await self._wait_for_apply_async(applied, command["type"]):
+            return -1
+        return index
+    
+    def _submit_many(self, commands: List[Dict], timeout: float = 5.0) -> Optional[List[int]]:
+        """
+        Append commands as leader in consecutive entries, sharing one disk write
+        and replication round, and wait for all of them to be applied.
+        
+        Returns:
+            Optional[List[int]]: The entries' log indexes, or None if any of them
+            didn't commit in time or this node lost leadership before appending them
+        """
+        appended = self._append_many_to_log(commands, self.current_term)
+        if appended is None:
+            return None
+        indexes, applied = appended
+        deadline = time.time() + timeout
+        for command, future in zip(commands, applied):
+            if not self._wait_for_apply(future, command["type"], max(0.0, deadline - time.time())):
+                return None
+        return indexes
+    
+    async def _submit_many_async(self, commands: List[Dict], timeout: float = 5.0) -> Optional[List[int]]:
+        """Awaitable _submit_many, for the asyncio server."""
+        appended = await self._append_many_to_log_async(commands, self.current_term)
+        if appended is None:
+            return None
+        indexes, applied = appended
+        deadline = time.time() + timeout
+        for command, future in zip(commands, applied):
+            if not await self._wait_for_apply_async(future, command["type"], max(0.0, deadline - time.time())):
+                return None
+        return indexes
+    
+    def _fail_apply_waiters(self, from_index: int):
+        """Resolve waiters at or above from_index as failed after the log was truncated."""
+        with self.lock:
+            for index in [i for i in self.apply_waiters if i >= from_index]:
+                _, applied = self.apply_waiters.pop(index)
+                applied.set_result(False)
+    
+    def _confirm_leadership(self, timeout: float) -> int:
+        """
+        Take a read index as leader (ReadIndex).
+        
+        Waits for an entry of the current term to commit, records commit_index,
+        then waits for a majority of the cluster to acknowledge a heartbeat sent
+        after that. Concurrent reads share heartbeats, since a replicator sends
+        one AppendEntries for all rounds started before it wakes.
+        
+        Returns:
+            int: The read index, or -1 if this node is not leader or could not
+            confirm it within timeout
+        """
+        deadline = time.time() + timeout
+        with self.lock:
+            if self.state != NodeState.LEADER:
+                return -1
+            term = self.current_term
+            while self._term_at(self.commit_index) != term:
+                remaining = deadline - time.time()
+                if remaining <= 0 or self.state != NodeState.LEADER or self.current_term != term:
+                    return -1
+                self.leader_progress.wait(remaining)
+            read_index = self.commit_index
+            
+            self.heartbeat_round += 1
+            read_round = self.heartbeat_round
+        
+        self._send_heartbeats()
+        
+        with self.lock:
+            while True:
+                if self.state != NodeState.LEADER or self.current_term != term:
+                    return -1
+                acks = 1 + sum(1 for acked in self.acked_round.values() if acked >= read_round)
+                if acks > len(self.cluster_config) // 2:
+                    return read_index
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return -1
+                self.leader_progress.wait(remaining)
+    
+    def _lease_read_index(self) -> int:
+        """
+        Read index under the leader lease: commit_index if this node is leader,
+        holds a valid lease and has committed an entry of its term, else -1.
+        """
+        with self.lock:
+            if self.state != NodeState.LEADER or self._term_at(self.commit_index) != self.current_term:
+                return -1
+            # The lease runs from the latest time by which a majority (counting us) had acknowledged us
+            peers_needed = len(self.cluster_config) // 2
+            if peers_needed > 0:
+                acked = sorted(self.acked_sent_at.values(), reverse=True)
+                if len(acked) < peers_needed or time.monotonic() >= acked[peers_needed - 1] + self.lease_duration:
+                    return -1
+            return self.commit_index
+    
+    def _wait_for_applied(self, index: int, timeout: float) -> bool:
+        """Block until last_applied reaches index. Returns False on timeout."""
+        with self.applied_cond:
+            return self.applied_cond.wait_for(lambda: self.last_applied >= index, timeout)
+    
+    async def _wait_for_applied_async(self, index: int, timeout: float) -> bool:
+        """Awaitable _wait_for_applied, for the asyncio server."""
+        with self.applied_cond:
+            if self.last_applied >= index:
+                return True
+            reached = Future()
+            heapq.heappush(self.applied_futures, (index, next(self.applied_future_seq), reached))
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(reached)), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+    
+    def _notify_applied(self):
+        """Wake threads and futures waiting for last_applied to advance."""
+        with self.applied_cond:
+            self.applied_cond.notify_all()
+            while self.applied_futures and self.applied_futures[0][0] <= self.last_applied:
+                heapq.heappop(self.applied_futures)[2].set_result(True)
+    
+    def _stage_user(self, user: User):
+        """Stage a user's row in the run being applied."""
         # Serialize user data
         user_data = {
             "unread_messages": list(user.unread_messages),
-            "recent_conversants": user.recent_conversants
+            "recent_conversants": list(user.recent_conversants)
         }
-        print(f"Persisting user: {user.userID}, {user.username}, {user_data}")
+        logger.debug(f"Persisting user: {user.userID}, {user.username}, {user_data}")
         
-        c.execute("INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?)",
-                 (user.userID, user.username, user.passwordHash, json.dumps(user_data)))
-        
-        conn.commit()
-        conn.close()
+        self.state_writes.upsert("users", user.userID,
+                                 (user.userID, user.username, user.passwordHash, json.dumps(user_data)))
     
-    def _persist_message(self, message: Message):
-        """Persist a message to the database."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?)",
-                 (message.uid, message.sender_id, message.receiver_id, 
-                  message.contents, int(message.has_been_read), message.timestamp))
-        
-        conn.commit()
-        conn.close()
+    def _stage_message(self, message: Message):
+        """Stage a message's row in the run being applied."""
+        self.state_writes.upsert("messages", message.uid,
+                                 (message.uid, message.sender_id, message.receiver_id, 
+                                  message.contents, int(message.has_been_read), message.timestamp))
     
-    def _persist_session_token(self, user_id: int, token: str, expiry: int = None):
-        """Persist a session token to the database."""
+    def _session_token_row(self, user_id: int, token: str, expiry: int = None) -> Tuple[int, str, int]:
+        """Return the session_tokens row for a token."""
         if expiry is None:
             # Default expiry: 1 day
             expiry = int(time.time()) + 86400
-            
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute("INSERT OR REPLACE INTO session_tokens VALUES (?, ?, ?)",
-                 (user_id, token, expiry))
-        
-        conn.commit()
-        conn.close()
+        return (user_id, token, expiry)
+    
+    def _stage_session_token(self, user_id: int, token: str):
+        """Stage a session token in the run being applied."""
+        self.state_writes.upsert("session_tokens", user_id, self._session_token_row(user_id, token))
+    
+    def _persist_session_token(self, user_id: int, token: str, expiry: int = None):
+        """Persist a session token to the database."""
+        self.storage.execute(UPSERT_SESSION_TOKEN, self._session_token_row(user_id, token, expiry))
     
     def _generate_election_timeout(self):
         """Generate a random election timeout between 150-300ms."""
@@ -319,11 +814,12 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         """Initialize gRPC connections to peer nodes."""
         print(f"[DEBUG] Node {self.node_id} initializing peer connections")
         self.unreachable_peers = set()
-        for node_id, address in self.cluster_config.items():
+        for node_id, address in self.raft_addresses.items():
             if node_id != self.node_id:
                 try:
                     print(f"[DEBUG] Node {self.node_id} connecting to peer {node_id} at {address}")
-                    channel = grpc.insecure_channel(address)
+                    # Cap reconnect backoff so a restarted peer is reached (and caught up) promptly
+                    channel = grpc.insecure_channel(address, options=[("grpc.max_reconnect_backoff_ms", 1000)])
                     stub = exp_pb2_grpc.RaftServiceStub(channel)
                     self.peers[node_id] = stub
                     print(f"[DEBUG] Successfully created stub for {node_id}")
@@ -351,26 +847,22 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
                 # Start election
                 self._start_election()
             
-            elif self.state == NodeState.LEADER:
-                logger.info("Node is leader; sending heartbeats")
-                # Send heartbeats/AppendEntries
-                self._send_heartbeats()
-            
-            # Apply committed entries to state machine
-            self._apply_committed_entries()
+            # As leader, the per-peer replicator threads send heartbeats/AppendEntries,
+            # and the apply thread applies entries as soon as they commit
             
             # Sleep briefly to avoid consuming too much CPU
             time.sleep(0.05)
     
     def _become_candidate(self):
         """Transition to candidate state and start an election."""
-        self.state = NodeState.CANDIDATE
-        self.current_term += 1
-        self.voted_for = self.node_id
-        self.election_timeout = self._generate_election_timeout()
-        self.last_heartbeat = time.time()
-        logger.debug(f"Node {self.node_id} becomes candidate for term {self.current_term}. New election timeout: {self.election_timeout}")
-        self._persist_raft_state()
+        with self.lock:
+            self.state = NodeState.CANDIDATE
+            self.current_term += 1
+            self.voted_for = self.node_id
+            self.election_timeout = self._generate_election_timeout()
+            self.last_heartbeat = time.time()
+            logger.debug(f"Node {self.node_id} becomes candidate for term {self.current_term}. New election timeout: {self.election_timeout}")
+            self._persist_raft_state()
         
         logger.info(f"Node {self.node_id} became candidate for term {self.current_term}")
     
@@ -393,10 +885,11 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
                 continue  # If there's no stub, skip this peer.
             try:
                 request = exp_pb2.RequestVoteRequest(
+                    group_id=self.group_id,
                     term=self.current_term,
                     candidate_id=self.node_id,
-                    last_log_index=len(self.log) - 1,
-                    last_log_term=self.log[-1][0] if self.log else 0
+                    last_log_index=self._last_log_index(),
+                    last_log_term=self._term_at(self._last_log_index())
                 )
                 # Use a short timeout to quickly fail if the peer is unreachable.
                 response = stub.RequestVote(request, timeout=20.0)
@@ -405,11 +898,7 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
                     votes_received += 1
                 # If the peer has a higher term, immediately revert to follower.
                 if response.term > self.current_term:
-                    self.current_term = response.term
-                    self.state = NodeState.FOLLOWER
-                    self.voted_for = None
-                    self._persist_raft_state()
-                    logger.info(f"Node {self.node_id} reverted to follower (higher term {response.term}).")
+                    self._step_down(response.term)
                     return
             except Exception as e:
                 # Mark this peer as unreachable so that we skip it in subsequent election rounds.
@@ -421,6 +910,9 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         quorum_threshold = (effective_total // 2) + 1
         logger.info(f"Election: votes_received={votes_received}, quorum_threshold={quorum_threshold}, reachable_peers={reachable_peers}")
 
+        if self.state != NodeState.CANDIDATE:
+            # Another leader was accepted while votes were being collected
+            return
         if votes_received >= quorum_threshold:
             self._become_leader()
         else:
@@ -429,114 +921,362 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         
     def _become_leader(self):
         """Transition to leader state."""
-        self.state = NodeState.LEADER
-        self.leader_id = self.node_id
-        
-        # Initialize leader state
-        self.next_index = {node_id: len(self.log) for node_id in self.cluster_config if node_id != self.node_id}
-        self.match_index = {node_id: -1 for node_id in self.cluster_config if node_id != self.node_id}
+        with self.lock:
+            self.state = NodeState.LEADER
+            self.leader_id = self.node_id
+            term = self.current_term
+            
+            # Initialize leader state
+            self.next_index = {node_id: self._last_log_index() + 1 for node_id in self.cluster_config if node_id != self.node_id}
+            self.match_index = {node_id: -1 for node_id in self.cluster_config if node_id != self.node_id}
+            self.inflight_appends = {node_id: 0 for node_id in self.cluster_config if node_id != self.node_id}
+            self.sent_round = {node_id: 0 for node_id in self.cluster_config if node_id != self.node_id}
+            self.acked_round = {node_id: 0 for node_id in self.cluster_config if node_id != self.node_id}
+            self.acked_sent_at = {node_id: 0.0 for node_id in self.cluster_config if node_id != self.node_id}
         
         logger.info(f"Node {self.node_id} became leader for term {self.current_term}")
         
         # Send immediate heartbeats
         self._send_heartbeats()
+        
+        # Commit an entry of our own term right away; until one commits, our
+        # commit_index may trail entries committed by earlier leaders, so reads wait for it
+        self._append_to_log({"type": "NOOP"}, term)
+    
+    def _start_replicators(self):
+        """Start one replicator thread per peer so no peer waits on another."""
+        self.replicate_events = {}
+        self.replicator_threads = {}
+        for peer_id in self.cluster_config:
+            if peer_id == self.node_id:
+                continue
+            event = threading.Event()
+            thread = threading.Thread(target=self._run_replicator, args=(peer_id, event))
+            thread.daemon = True
+            self.replicate_events[peer_id] = event
+            self.replicator_threads[peer_id] = thread
+            thread.start()
+    
+    def _run_replicator(self, peer_id: str, event: threading.Event):
+        """Replicator loop for one peer: send AppendEntries when woken or once per heartbeat interval."""
+        while self.running:
+            event.wait(timeout=self.heartbeat_interval)
+            event.clear()
+            if self.state != NodeState.LEADER:
+                continue
+            self._replicate_to_peer(peer_id)
     
     def _send_heartbeats(self):
-        """Send AppendEntries RPCs to all peers (as heartbeats or to replicate logs)."""
-        # self._init_peer_connections()
-        for peer_id, stub in self.peers.items():
-            try:
-                next_idx = self.next_index.get(peer_id, 0)
-                prev_log_index = next_idx - 1
-                prev_log_term = self.log[prev_log_index][0] if prev_log_index >= 0 and self.log else 0
+        """Wake every peer's replicator so AppendEntries go out to all peers concurrently."""
+        for event in self.replicate_events.values():
+            event.set()
+    
+    def _step_down(self, term: int):
+        """Adopt a higher term discovered from a peer and revert to follower."""
+        with self.lock:
+            self.current_term = term
+            self.state = NodeState.FOLLOWER
+            self.voted_for = None
+            self.leader_id = None
+            self._persist_raft_state()
+            self.leader_progress.notify_all()
+        logger.info(f"Node {self.node_id} reverted to follower (higher term {term})")
+    
+    def _replicate_to_peer(self, peer_id: str):
+        """
+        Pipeline AppendEntries RPCs to a single peer.
+        
+        Keeps up to max_inflight_appends batches outstanding, each bounded by
+        max_append_entries and max_append_bytes, so a follower that is far behind
+        catches up without waiting a round trip per batch. When the peer is caught
+        up and nothing is outstanding, one empty AppendEntries goes out as the heartbeat.
+        """
+        stub = self.peers.get(peer_id)
+        if stub is None:
+            return
+        
+        while self.running:
+            with self.lock:
+                if self.state != NodeState.LEADER:
+                    return
+                inflight = self.inflight_appends.get(peer_id, 0)
+                if inflight >= self.max_inflight_appends:
+                    return
+                next_idx = self.next_index.get(peer_id, self._last_log_index() + 1)
+                if (next_idx > self._last_log_index() and inflight > 0
+                        and self.sent_round.get(peer_id, 0) >= self.heartbeat_round):
+                    return  # Nothing new to send; the outstanding RPCs double as heartbeats
+                if next_idx <= self.snapshot_index:
+                    # The entries this peer needs were compacted; ship the state instead
+                    self._start_snapshot_sender(peer_id)
+                    return
                 
-                # Get entries to send
-                entries = self.log[next_idx:] if next_idx < len(self.log) else []
+                term = self.current_term
+                request = self._build_append_request(next_idx)
+                num_entries = len(request.entries)
                 
-                # Convert entries to protobuf format
-                pb_entries = []
-                for term, command in entries:
-                    log_entry = exp_pb2.LogEntry(
-                        term=term,
-                        command=json.dumps(command)
-                    )
-                    pb_entries.append(log_entry)
+                # Optimistically advance nextIndex so the next batch can go out before this one is acknowledged
+                self.next_index[peer_id] = next_idx + num_entries
+                self.inflight_appends[peer_id] = inflight + 1
+                sent_round = self.heartbeat_round
+                self.sent_round[peer_id] = sent_round
+            
+            # Taken before sending, so a lease based on the reply never outlasts the follower's timer
+            sent_at = time.monotonic()
+            call = stub.AppendEntries.future(request, timeout=self.append_timeout)
+            call.add_done_callback(functools.partial(
+                self._handle_append_response, peer_id, term, request.prev_log_index, num_entries, sent_round,
+                sent_at))
+            
+            if num_entries == 0:
+                return
+    
+    def _start_snapshot_sender(self, peer_id: str):
+        """Start streaming a snapshot to peer_id unless one is already in progress; called with self.lock held."""
+        sender = self.snapshot_senders.get(peer_id)
+        if sender is not None and sender.is_alive():
+            return
+        sender = threading.Thread(target=self._send_snapshot, args=(peer_id, self.current_term))
+        sender.daemon = True
+        self.snapshot_senders[peer_id] = sender
+        sender.start()
+    
+    def _get_snapshot_file(self):
+        """
+        Open a snapshot file covering at least the compacted prefix.
+        
+        Exports a new one only when the last export is older than snapshot_index,
+        so followers catching up at the same time share one export.
+        
+        Returns:
+            Tuple: (open file, last included index, last included term)
+        """
+        with self.snapshot_export_lock:
+            if self.snapshot_export is None or self.snapshot_export[1] < self.snapshot_index:
+                previous = self.snapshot_export
+                path = os.path.join(self.data_dir, f"snapshot_{self.node_id}_{time.time_ns()}.db")
+                last_index, last_term = self.storage.export_snapshot(path)
+                self.snapshot_export = (path, last_index, last_term)
+                logger.info(f"Exported snapshot through index {last_index} (term {last_term}) to {path}")
                 
-                request = exp_pb2.AppendEntriesRequest(
-                    term=self.current_term,
+                # Senders still streaming the old file keep their open handle
+                if previous is not None:
+                    os.remove(previous[0])
+            
+            path, last_index, last_term = self.snapshot_export
+            return open(path, "rb"), last_index, last_term
+    
+    def _snapshot_chunks(self, snapshot_file, term: int, last_index: int, last_term: int):
+        """Yield InstallSnapshot chunks read from snapshot_file, holding one chunk in memory at a time."""
+        offset = 0
+        with snapshot_file:
+            data = snapshot_file.read(self.snapshot_chunk_bytes)
+            while True:
+                next_data = snapshot_file.read(self.snapshot_chunk_bytes)
+                yield exp_pb2.InstallSnapshotRequest(
+                    group_id=self.group_id,
+                    term=term,
                     leader_id=self.node_id,
-                    prev_log_index=prev_log_index,
-                    prev_log_term=prev_log_term,
-                    entries=pb_entries,
-                    leader_commit=self.commit_index
+                    last_included_index=last_index,
+                    last_included_term=last_term,
+                    offset=offset,
+                    data=data,
+                    done=not next_data
                 )
-                
-                response = stub.AppendEntries(request, timeout=1)
-                
-                if response.success:
-                    # Update nextIndex and matchIndex for this follower
-                    if pb_entries:
-                        self.next_index[peer_id] = next_idx + len(pb_entries)
-                        self.match_index[peer_id] = self.next_index[peer_id] - 1
-                else:
-                    # If AppendEntries fails because of log inconsistency
-                    if self.next_index[peer_id] > 0:
-                        self.next_index[peer_id] -= 1
-                
-                # If we discover a higher term, revert to follower
-                if response.term > self.current_term:
-                    self.current_term = response.term
-                    self.state = NodeState.FOLLOWER
-                    self.voted_for = None
-                    self.leader_id = None
-                    self._persist_raft_state()
-                    logger.info(f"Node {self.node_id} reverted to follower (higher term)")
+                if not next_data:
                     return
-                
-            except Exception as e:
-                logger.warning(f"Failed to send AppendEntries to {peer_id}: {str(e)}")
-        
-        # Update commit index based on matchIndex values
-        self._update_commit_index()
+                offset += len(data)
+                data = next_data
+    
+    def _send_snapshot(self, peer_id: str, term: int):
+        """Stream the current snapshot to one peer and resume log replication after it."""
+        stub = self.peers.get(peer_id)
+        if stub is None:
+            return
         
-        # Reset heartbeat timer
-        self.last_heartbeat = time.time()
-
-
-
-    def _update_commit_index(self):
-        if self.state != NodeState.LEADER:
+        try:
+            snapshot_file, last_index, last_term = self._get_snapshot_file()
+            logger.info(f"Sending snapshot through index {last_index} to {peer_id}")
+            response = stub.InstallSnapshot(self._snapshot_chunks(snapshot_file, term, last_index, last_term),
+                                            timeout=300)
+        except Exception as e:
+            logger.warning(f"Failed to send InstallSnapshot to {peer_id}: {str(e)}")
             return
-
-        # healthy_count = 1 + sum(1 for peer in self.peers if self.match_index.get(peer, -1) != -1)
-        # if healthy_count < (len(self.cluster_config) // 2) + 1:
-            # logger.warning("Not enough healthy nodes to reach quorum; commit index not updated.")
-            # return
         
-        # Leader's own log is always replicated locally.
-        leader_index = len(self.log) - 1
-
-        # Select healthy peers (those that have a valid match index, not -1)
-        healthy_match_indices = [self.match_index[peer_id] for peer_id in self.peers 
-                                 if self.match_index.get(peer_id, -1) != -1]
-
-        # Include the leader's own index.
-        effective_indices = [leader_index] + healthy_match_indices
-        effective_indices_sorted = sorted(effective_indices, reverse=True)
-        logger.info(f"Effective match indices: {effective_indices_sorted}")
-
-        # Determine quorum based on the effective number of nodes.
-        quorum_count = (len(effective_indices) // 2) + 1
-        quorum_index = effective_indices_sorted[quorum_count - 1]
-        logger.info(f"Calculated quorum index: {quorum_index}")
-
-        # Update commit index for log entries from the current term, up to the quorum index.
-        for i in range(self.commit_index + 1, quorum_index + 1):
-            if i < len(self.log) and self.log[i][0] == self.current_term:
-                self.commit_index = i
-                self._persist_raft_state()
-                logger.info(f"Commit index updated to {i}")
+        with self.lock:
+            # If we discover a higher term, revert to follower
+            if response.term > self.current_term:
+                self._step_down(response.term)
+                return
+            
+            if self.state != NodeState.LEADER or self.current_term != term or not response.success:
+                return
+            
+            self.match_index[peer_id] = max(self.match_index.get(peer_id, -1), last_index)
+            self.next_index[peer_id] = max(self.next_index.get(peer_id, 0), last_index + 1)
+            self._update_commit_index()
+        
+        logger.info(f"Peer {peer_id} installed snapshot through index {last_index}")
+        self.replicate_events[peer_id].set()
+    
+    def _build_append_request(self, next_idx: int) -> exp_pb2.AppendEntriesRequest:
+        """Build an AppendEntries starting at next_idx within the batch limits; called with self.lock held."""
+        prev_log_index = next_idx - 1
+        prev_log_term = self._term_at(prev_log_index)
+        
+        # Always send at least one entry, even if it alone exceeds max_append_bytes
+        entries = []
+        batch_bytes = 0
+        offset = self.snapshot_index + 1
+        for i in range(next_idx - offset, min(len(self.log), next_idx - offset + self.max_append_entries)):
+            encoded = self.log_encoded[i]
+            if entries and batch_bytes + len(encoded) > self.max_append_bytes:
                 break
+            entries.append(exp_pb2.LogEntry(term=self.log[i][0], command=encoded))
+            batch_bytes += len(encoded)
+        
+        return exp_pb2.AppendEntriesRequest(
+            group_id=self.group_id,
+            term=self.current_term,
+            leader_id=self.node_id,
+            prev_log_index=prev_log_index,
+            prev_log_term=prev_log_term,
+            entries=entries,
+            leader_commit=self.commit_index
+        )
+    
+    def _handle_append_response(self, peer_id: str, term: int, prev_log_index: int, num_entries: int,
+                                sent_round: int, sent_at: float, call):
+        """Done-callback for a pipelined AppendEntries RPC; runs on a gRPC thread."""
+        try:
+            response = call.result()
+        except Exception as e:
+            logger.warning(f"Failed to send AppendEntries to {peer_id}: {str(e)}")
+            response = None
+        
+        with self.lock:
+            # If we discover a higher term, revert to follower
+            if response is not None and response.term > self.current_term:
+                self._step_down(response.term)
+                return
+            
+            # Ignore replies that arrive after we stopped leading this term
+            if self.state != NodeState.LEADER or self.current_term != term:
+                return
+            
+            self.inflight_appends[peer_id] = max(0, self.inflight_appends.get(peer_id, 0) - 1)
+            match = self.match_index.get(peer_id, -1)
+            
+            if response is None:
+                # Resend everything past the last acknowledged entry on the next heartbeat
+                self.next_index[peer_id] = min(self.next_index.get(peer_id, 0), match + 1)
+                return
+            
+            # Any reply in our term shows the peer still follows us, which confirms reads waiting on this round
+            if sent_round > self.acked_round.get(peer_id, 0):
+                self.acked_round[peer_id] = sent_round
+                self.leader_progress.notify_all()
+            self.acked_sent_at[peer_id] = max(self.acked_sent_at.get(peer_id, 0.0), sent_at)
+            
+            if response.success:
+                # Update nextIndex and matchIndex for this follower
+                match = max(match, prev_log_index + num_entries)
+                self.match_index[peer_id] = match
+                self.next_index[peer_id] = max(self.next_index.get(peer_id, 0), match + 1)
+                
+                # Commit as soon as this ack completes a majority
+                self._update_commit_index()
+            else:
+                # Log inconsistency: back up to the follower's hint, but never below what the peer has acknowledged
+                retry_index = self._next_index_after_conflict(response.conflict_term, response.conflict_index)
+                self.next_index[peer_id] = max(match + 1, min(self.next_index.get(peer_id, 0), retry_index))
+            
+            more_to_send = self.next_index[peer_id] <= self._last_log_index()
+        
+        # Keep the pipeline full while the peer is behind
+        if more_to_send:
+            self.replicate_events[peer_id].set()
+
+    def _next_index_after_conflict(self, conflict_term: int, conflict_index: int) -> int:
+        """
+        Pick where to resume replication after a follower rejected AppendEntries.
+        
+        If we also have entries from conflict_term, resume just after our last one;
+        otherwise skip the follower's whole conflicting term. Called with self.lock held.
+        """
+        if conflict_term == 0:
+            return conflict_index  # Follower's log is too short
+        last_index = self._last_index_of_term(conflict_term)
+        if last_index >= 0:
+            return last_index + 1
+        return conflict_index
+    
+    def _first_index_of_term(self, term: int, upper: int) -> int:
+        """First uncompacted log index <= upper holding an entry of the given term (log terms never decrease)."""
+        offset = self.snapshot_index + 1
+        lo, hi = 0, upper - offset
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.log[mid][0] < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo + offset
+    
+    def _last_index_of_term(self, term: int) -> int:
+        """Last log index holding an entry of the given term, or -1 if there is none."""
+        lo, hi = 0, len(self.log)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.log[mid][0] <= term:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo > 0 and self.log[lo - 1][0] == term:
+            return lo - 1 + self.snapshot_index + 1
+        if lo == 0 and self.snapshot_index >= 0 and self.snapshot_term == term:
+            return self.snapshot_index
+        return -1
+    
+    def _last_log_index(self) -> int:
+        """Index of the last entry in the log, counting compacted entries."""
+        return self.snapshot_index + len(self.log)
+    
+    def _term_at(self, index: int) -> int:
+        """Term of the entry at index; 0 before the start of the log or inside the compacted prefix."""
+        if index == self.snapshot_index:
+            return self.snapshot_term
+        if index < self.snapshot_index:
+            return 0
+        return self.log[index - self.snapshot_index - 1][0]
+    
+    def _update_commit_index(self):
+        """Advance commit_index to the highest current-term entry stored on a majority of the cluster."""
+        with self.lock:
+            if self.state != NodeState.LEADER:
+                return
+            
+            # Leader's own log counts once it is durable locally.
+            leader_index = min(self.durable_index, self._last_log_index())
+            
+            match_indices = [leader_index] + [self.match_index.get(peer_id, -1) for peer_id in self.cluster_config
+                                              if peer_id != self.node_id]
+            match_indices.sort(reverse=True)
+            
+            # The entry at position n // 2 is stored on at least a majority of the n nodes
+            quorum_index = match_indices[len(self.cluster_config) // 2]
+            logger.debug(f"Match indices: {match_indices}, quorum index: {quorum_index}")
+            
+            # Only entries from the current term are committed by counting replicas;
+            # committing one also commits everything before it.
+            for i in range(quorum_index, self.commit_index, -1):
+                if self._term_at(i) == self.current_term:
+                    self.commit_index = i
+                    self._persist_raft_state()
+                    self.apply_event.set()
+                    self.leader_progress.notify_all()
+                    logger.info(f"Commit index updated to {i}")
+                    break
 
 
     """
@@ -588,19 +1328,122 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
                 break
     """
     
+    def _run_apply_loop(self):
+        """Apply committed entries as soon as commit_index advances, compacting the log as it grows."""
+        while self.running:
+            self.apply_event.wait(timeout=0.05)
+            self.apply_event.clear()
+            self._apply_committed_entries()
+            if self.last_applied - self.snapshot_trailing - self.snapshot_index >= self.snapshot_threshold:
+                self._compact_log()
+    
     def _apply_committed_entries(self):
-        """Apply committed log entries to the state machine."""
+        """Apply committed log entries to the state machine and wake their waiters."""
+        if self.last_applied < self.commit_index:
+            self._apply_entries_through_commit()
+            self._notify_applied()
+    
+    def _apply_entries_through_commit(self):
+        """Apply entries until last_applied reaches commit_index, a run of up to max_apply_entries at a time."""
         while self.last_applied < self.commit_index:
-            self.last_applied += 1
-            
-            if self.last_applied < len(self.log):
-                entry = self.log[self.last_applied]
-                self._apply_command(entry[1])
+            first = self.last_applied + 1
+            with self.lock:
+                commit_index = self.commit_index
+                last = min(commit_index, first + self.max_apply_entries - 1)
+                entries = [self.log[index - self.snapshot_index - 1] if index <= self._last_log_index() else None
+                           for index in range(first, last + 1)]
+            
+            # The run's state changes, last_applied and commit_index land in one
+            # transaction, so after a restart the state tables match last_applied
+            # exactly; rows are staged as the commands apply and written at the end
+            # with one executemany per statement
+            with self.apply_lock:
+                if first != self.last_applied + 1:
+                    continue  # A snapshot was installed meanwhile
+                run_events = []
+                with self.storage.transaction() as c:
+                    self.state_writes = StateWriteBatch()
+                    try:
+                        for index, entry in enumerate(entries, first):
+                            events = []
+                            if entry is not None:
+                                self._apply_command(entry[1], events, index)
+                            run_events.append((index, events))
+                        num_rows = self.state_writes.flush(c)
+                    finally:
+                        self.state_writes = None
+                    c.executemany(UPSERT_RAFT_STATE, [
+                        ("last_applied", str(last)),
+                        ("commit_index", str(commit_index)),
+                    ])
+                self.last_applied = last
+                logger.debug(f"Applied entries {first}-{last} ({num_rows} state rows)")
                 
-                logger.debug(f"Applied command at index {self.last_applied}")
+                # Subscribers only hear about changes once they are committed to disk
+                for index, events in run_events:
+                    for user_id, event in events:
+                        if user_id != ACCOUNT_EVENTS:
+                            event.offset = index
+                    self.user_events.publish(index, events)
+            
+            # Wake the client requests that proposed these entries, if any
+            with self.lock:
+                waiters = [self.apply_waiters.pop(index, None) for index in range(first, last + 1)]
+            for waiter, entry in zip(waiters, entries):
+                if waiter is not None:
+                    waiter_term, applied = waiter
+                    applied.set_result(waiter_term == (entry[0] if entry is not None else None))
+    
+    def _compact_log(self):
+        """
+        Discard the applied log prefix.
+        
+        The state tables already hold the effect of every applied entry, so they
+        act as the snapshot; only its index and term need recording. The last
+        snapshot_trailing applied entries are kept so slightly lagging followers
+        can still catch up from the log.
+        """
+        with self.lock:
+            compact_index = self.last_applied - self.snapshot_trailing
+            if compact_index <= self.snapshot_index:
+                return
+            compact_term = self._term_at(compact_index)
+            
+            with self.storage.transaction() as c:
+                c.executemany(UPSERT_RAFT_STATE, [
+                    ("snapshot_index", str(compact_index)),
+                    ("snapshot_term", str(compact_term)),
+                ])
+                c.execute(DELETE_LOG_PREFIX, (compact_index,))
+            
+            dropped = compact_index - self.snapshot_index
+            del self.log[:dropped]
+            del self.log_encoded[:dropped]
+            self.snapshot_index = compact_index
+            self.snapshot_term = compact_term
+        
+        logger.info(f"Compacted {dropped} log entries through index {compact_index} (term {compact_term})")
+    
+    def _user_event(self, events: Optional[List], user_id: int, event_type: int, **fields):
+        """Queue a Subscribe event for user_id, carrying the user's current unread count."""
+        if events is None or user_id not in self.user_base.users:
+            return
+        unread_count = len(self.user_base.users[user_id].unread_messages)
+        events.append((user_id, exp_pb2.UserEvent(type=event_type, unread_count=unread_count, **fields)))
+    
+    def _account_event(self, events: Optional[List], event_type: int, user: User):
+        """Queue a Subscribe event about an account, for every subscriber watching this group's accounts."""
+        if events is not None:
+            events.append((ACCOUNT_EVENTS, exp_pb2.UserEvent(type=event_type, account_id=user.userID,
+                                                             username=user.username)))
     
-    def _apply_command(self, command: Dict):
-        """Apply a command to the state machine."""
+    def _apply_command(self, command: Dict, events: Optional[List] = None, index: int = -1):
+        """
+        Apply the command at log index `index` to the state machine.
+        
+        (user_id, UserEvent) pairs for the users it affects are appended to
+        events, if given.
+        """
         cmd_type = command.get("type")
         
         if cmd_type == "CREATE_ACCOUNT":
@@ -613,12 +1456,24 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
             user = User(user_id, username, password_hash)
             self.user_base.users[user_id] = user
             self.user_trie.add(username, user)
+            # Keep IDs unique across leader changes
+            if user_id >= self.user_base._next_user_id:
+                self.user_base._next_user_id = next_user_id(user_id, self.group_id, self.num_groups)
 
             self.session_tokens.tokens[user_id] = session_token
-            self._persist_session_token(user_id, session_token)
+            self._stage_session_token(user_id, session_token)
     
             # Persist user
-            self._persist_user(user)
+            self._stage_user(user)
+            
+            self._account_event(events, exp_pb2.ACCOUNT_CREATED, user)
+            
+        elif cmd_type == "CREATE_SESSION":
+            user_id = command["user_id"]
+            
+            if user_id in self.user_base.users:
+                self.session_tokens.tokens[user_id] = command["session_token"]
+                self._stage_session_token(user_id, command["session_token"])
             
         elif cmd_type == "DELETE_ACCOUNT":
             user_id = command["user_id"]
@@ -627,12 +1482,8 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
                 user = self.user_base.users[user_id]
                 
                 # Delete from database
-                conn = sqlite3.connect(self.db_path)
-                c = conn.cursor()
-                c.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
-                c.execute("DELETE FROM session_tokens WHERE user_id = ?", (user_id,))
-                conn.commit()
-                conn.close()
+                self.state_writes.delete("users", user_id)
+                self.state_writes.delete("session_tokens", user_id)
                 
                 # Delete from memory
                 self.user_trie.delete(user.username)
@@ -640,12 +1491,24 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
                 if user_id in self.session_tokens.tokens:
                     del self.session_tokens.tokens[user_id]
                 
+                self._account_event(events, exp_pb2.ACCOUNT_DELETED, user)
+                
                 # Handle deletion of associated data (messages, etc.)
                 # In a real implementation, you might want to cascade delete messages
                 
         elif cmd_type == "SEND_MESSAGE":
             
-            message_id = command["message_id"]
+            # A message's ID comes from the log index of the entry that sent it, so
+            # IDs increase in commit order; a copy delivered from the conversation's
+            # home group (or an entry from before IDs were derived) carries its ID
+            message_id = command.get("message_id")
+            if message_id is None:
+                message_id = message_id_for_index(index, self.group_id, self.num_groups)
+            elif message_id in self.message_base.messages or self._is_tombstoned(message_id):
+                # A delivery retried after an attempt that did commit, or one that
+                # lands after the message was deleted here; it has nothing to add
+                logger.info(f"(raft_node.py): _apply_command => SEND_MESSAGE {message_id} already applied, skipping")
+                return
             sender_id = command["sender_id"]
             receiver_id = command["receiver_id"]
             content = command["content"]
@@ -668,31 +1531,35 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
             self.message_base.messages[message_id] = message
 
             # TODO: dump content of self.conversations before and after
-            logger.info(f"(raft_node.py) Before append, keys={list(self.conversations.conversations.keys())}")
-            # Update conversation
+            logger.info(f"(raft_node.py) Before append, keys={self.conversations.keys()}")
+            # Update conversation (one that isn't in memory picks the message up from SQLite when loaded)
             conversation_key = tuple(sorted([sender_id, receiver_id]))
-            self.conversations.conversations[conversation_key].append(message)
+            self.conversations.add_message(conversation_key, message)
             
             logger.info(
-                f"(raft_node.py) After append, keys={list(self.conversations.conversations.keys())}. "
+                f"(raft_node.py) After append, keys={self.conversations.keys()}. "
                 f"Added conversation_key={conversation_key} message_id={message_id}"
             )
             
-            # Update unread messages for receiver
+            # Update unread messages for receiver, and recent conversants for both
+            # parties; in a sharded cluster either may belong to another group, which
+            # records its side when the copy is delivered there
             if receiver_id in self.user_base.users:
                 self.user_base.users[receiver_id].add_unread_message(message_id)
+                self.user_base.users[receiver_id].update_recent_conversant(sender_id)
                 
-                # Update recent conversants
-                if sender_id in self.user_base.users:
-                    self.user_base.users[sender_id].update_recent_conversant(receiver_id)
-                    self.user_base.users[receiver_id].update_recent_conversant(sender_id)
-                    
-                    # Persist updated users
-                    self._persist_user(self.user_base.users[sender_id])
-                    self._persist_user(self.user_base.users[receiver_id])
+                # Persist updated receiver (the state tables must capture every applied change)
+                self._stage_user(self.user_base.users[receiver_id])
+            if sender_id in self.user_base.users and sender_id != receiver_id:
+                self.user_base.users[sender_id].update_recent_conversant(receiver_id)
+                self._stage_user(self.user_base.users[sender_id])
             
             # Persist message
-            self._persist_message(message)
+            self._stage_message(message)
+            
+            for user_id in {sender_id, receiver_id}:
+                self._user_event(events, user_id, exp_pb2.NEW_MESSAGE, message_ids=[message_id],
+                                 sender_id=sender_id, receiver_id=receiver_id, content=content)
             
         elif cmd_type == "MARK_READ":
             user_id = command["user_id"]
@@ -705,10 +1572,12 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
                 # Update user's unread messages
                 if user_id in self.user_base.users:
                     self.user_base.users[user_id].mark_message_read(message_id)
-                    self._persist_user(self.user_base.users[user_id])
+                    self._stage_user(self.user_base.users[user_id])
                 
                 # Persist updated message
-                self._persist_message(message)
+                self._stage_message(message)
+                
+                self._user_event(events, user_id, exp_pb2.MESSAGES_READ, message_ids=[message_id])
         
         elif cmd_type == "READ_MESSAGES":
             user_id = command["user_id"]
@@ -716,61 +1585,68 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
             
             if user_id in self.user_base.users:
                 user = self.user_base.users[user_id]
-                marked_count = 0
+                marked_ids = []
                 
                 # Mark up to 'count' messages as read
                 for _ in range(count):
                     if not user.unread_messages:
                         break
                     
-                    message_id = user.unread_messages.popleft()
+                    message_id, _ = user.unread_messages.popitem(last=False)
                     if message_id in self.message_base.messages:
                         self.message_base.messages[message_id].has_been_read = True
-                        self._persist_message(self.message_base.messages[message_id])
-                        marked_count += 1
+                        self._stage_message(self.message_base.messages[message_id])
+                        marked_ids.append(message_id)
                 
                 # Persist the updated user
-                self._persist_user(user)
+                self._stage_user(user)
                 
-                logger.info(f"Marked {marked_count} messages as read for user {user_id}")
+                logger.info(f"Marked {len(marked_ids)} messages as read for user {user_id}")
+                self._user_event(events, user_id, exp_pb2.MESSAGES_READ, message_ids=marked_ids)
         
         elif cmd_type == "DELETE_MESSAGE":
             message_id = command["message_id"]
             
+            # Remember a deleted copy from another group, so a delivery of it that
+            # is retried or overtaken by this delete doesn't bring it back
+            if group_for_message(message_id, self.num_groups) != self.group_id:
+                self.state_writes.upsert("message_tombstones", message_id, (message_id,))
+            
             if message_id in self.message_base.messages:
                 message = self.message_base.messages[message_id]
                 
                 # Remove from conversations
                 conversation_key = tuple(sorted([message.sender_id, message.receiver_id]))
-                if conversation_key in self.conversations.conversations:
-                    self.conversations.conversations[conversation_key] = [
-                        msg for msg in self.conversations.conversations[conversation_key]
-                        if msg.uid != message_id
-                    ]
+                self.conversations.remove_message(conversation_key, message_id)
                 
                 # Remove from user's unread messages if applicable
                 if message.receiver_id in self.user_base.users:
                     user = self.user_base.users[message.receiver_id]
                     if message_id in user.unread_messages:
                         user.mark_message_read(message_id)
-                        self._persist_user(user)
+                        self._stage_user(user)
                 
                 # Delete from database
-                conn = sqlite3.connect(self.db_path)
-                c = conn.cursor()
-                c.execute("DELETE FROM messages WHERE message_id = ?", (message_id,))
-                conn.commit()
-                conn.close()
+                self.state_writes.delete("messages", message_id)
                 
                 # Remove from message base
                 del self.message_base.messages[message_id]
                 
+                for user_id in {message.sender_id, message.receiver_id}:
+                    self._user_event(events, user_id, exp_pb2.MESSAGE_DELETED, message_ids=[message_id],
+                                     sender_id=message.sender_id, receiver_id=message.receiver_id)
+                
                 logger.info(f"Deleted message {message_id}")
     
     # RPC handlers
     
     def AppendEntries(self, request, context):
         """Handle AppendEntries RPC."""
+        with self.lock:
+            return self._handle_append_entries(request)
+    
+    def _handle_append_entries(self, request):
+        """AppendEntries body; called with self.lock held."""
         # Reset heartbeat timer since we heard from the leader
         self.last_heartbeat = time.time()
         
@@ -787,37 +1663,171 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         
         # Always accept current leader
         self.leader_id = request.leader_id
+        self.last_leader_contact = time.monotonic()
         
         # Log consistency check
-        log_ok = (request.prev_log_index == -1 or 
-                  (request.prev_log_index < len(self.log) and 
-                   (request.prev_log_index == -1 or self.log[request.prev_log_index][0] == request.prev_log_term)))
+        # (entries in our compacted prefix are committed, so they match the leader's)
+        log_ok = (request.prev_log_index <= self.snapshot_index or 
+                  (request.prev_log_index <= self._last_log_index() and 
+                   self._term_at(request.prev_log_index) == request.prev_log_term))
         
         if not log_ok:
-            return exp_pb2.AppendEntriesResponse(term=self.current_term, success=False)
+            # Tell the leader where our log diverges so it can skip a whole term per round trip
+            if request.prev_log_index > self._last_log_index():
+                conflict_term, conflict_index = 0, self._last_log_index() + 1
+            else:
+                conflict_term = self._term_at(request.prev_log_index)
+                conflict_index = self._first_index_of_term(conflict_term, request.prev_log_index)
+            return exp_pb2.AppendEntriesResponse(term=self.current_term, success=False,
+                                                 conflict_term=conflict_term, conflict_index=conflict_index)
         
         # Process entries
-        if request.entries:
-            # If existing entries conflict with new ones, delete them
-            if request.prev_log_index + 1 < len(self.log):
-                self.log = self.log[:request.prev_log_index + 1]
-            
-            # Append new entries
-            for entry in request.entries:
-                self.log.append((entry.term, json.loads(entry.command)))
-                self._persist_log_entry(len(self.log) - 1, entry.term, json.loads(entry.command))
-        
-        # Update commit index
-        if request.leader_commit > self.commit_index:
-            self.commit_index = min(request.leader_commit, len(self.log) - 1)
+        entries = request.entries
+        index = request.prev_log_index + 1
+        
+        # Skip entries we already have (retried or reordered RPCs); only an entry
+        # whose term conflicts with ours truncates the log from that point.
+        skip = max(0, self.snapshot_index + 1 - index)
+        while skip < len(entries) and index + skip <= self._last_log_index():
+            if self._term_at(index + skip) != entries[skip].term:
+                self._truncate_log(index + skip)
+                break
+            skip += 1
+        
+        # Append new entries, keeping the leader's encoding for persistence
+        if skip < len(entries):
+            new_entries = entries[skip:]
+            start_index = self._last_log_index() + 1
+            self.log.extend((entry.term, decode_command(entry.command)) for entry in new_entries)
+            self.log_encoded.extend(entry.command for entry in new_entries)
+            self._persist_log_entries(start_index, [(entry.term, entry.command) for entry in new_entries])
+        
+        # Update commit index, up to the last entry this RPC vouched for
+        new_commit_index = min(request.leader_commit, request.prev_log_index + len(entries))
+        if new_commit_index > self.commit_index:
+            self.commit_index = new_commit_index
             self._persist_raft_state()
+            self.apply_event.set()
         
         return exp_pb2.AppendEntriesResponse(term=self.current_term, success=True)
     
+    def ReadIndex(self, request, context):
+        """Handle ReadIndex RPC: confirm leadership and hand a follower the commit index to read at."""
+        read_index = self._confirm_leadership(self.read_timeout)
+        return exp_pb2.ReadIndexResponse(term=self.current_term, success=read_index >= 0, read_index=read_index)
+    
+    def Propose(self, request, context):
+        """Handle Propose RPC: append commands forwarded by another node and wait for them to apply."""
+        return run_steps(self._propose_steps(request))
+    
+    async def ProposeAsync(self, request, context):
+        """Awaitable Propose handler, for the asyncio server."""
+        return await run_steps_async(self._propose_steps(request))
+    
+    def _propose_steps(self, request) -> Steps:
+        if self.state != NodeState.LEADER:
+            return exp_pb2.ProposeResponse(success=False)
+        commands = [decode_command(command) for command in [request.command, *request.commands]]
+        indexes = yield Wait(self, "_submit_many", commands)
+        return exp_pb2.ProposeResponse(success=indexes is not None, index=indexes[0] if indexes else -1)
+    
+    def InstallSnapshot(self, request_iterator, context):
+        """Handle an InstallSnapshot stream: spool the chunks to disk, then swap the state in."""
+        path = os.path.join(self.data_dir, f"snapshot_{self.node_id}_incoming.db")
+        header = None
+        expected_offset = 0
+        
+        with open(path, "wb") as snapshot_file:
+            for chunk in request_iterator:
+                with self.lock:
+                    # Reject stale leaders; otherwise this stream counts as a heartbeat
+                    if chunk.term < self.current_term:
+                        return exp_pb2.InstallSnapshotResponse(term=self.current_term, success=False)
+                    if chunk.term > self.current_term:
+                        self.current_term = chunk.term
+                        self.voted_for = None
+                        self._persist_raft_state()
+                    self.state = NodeState.FOLLOWER
+                    self.leader_id = chunk.leader_id
+                    self.last_heartbeat = time.time()
+                    self.last_leader_contact = time.monotonic()
+                
+                if chunk.offset != expected_offset:
+                    logger.warning(f"InstallSnapshot chunk at offset {chunk.offset}, expected {expected_offset}")
+                    return exp_pb2.InstallSnapshotResponse(term=self.current_term, success=False)
+                snapshot_file.write(chunk.data)
+                expected_offset += len(chunk.data)
+                header = chunk
+                if chunk.done:
+                    break
+        
+        if header is None or not header.done:
+            return exp_pb2.InstallSnapshotResponse(term=self.current_term, success=False)
+        
+        try:
+            self._install_snapshot(path, header.last_included_index, header.last_included_term)
+        finally:
+            os.remove(path)
+        return exp_pb2.InstallSnapshotResponse(term=self.current_term, success=True)
+    
+    def _install_snapshot(self, path: str, last_index: int, last_term: int):
+        """Replace the state machine and compacted prefix with a received snapshot."""
+        with self.apply_lock, self.lock:
+            if last_index <= self.last_applied:
+                logger.info(f"Ignoring snapshot through index {last_index}; already applied {self.last_applied}")
+                return
+            
+            # Keep any log entries that follow the snapshot if our log agrees with it there
+            retain_log = (self.snapshot_index < last_index <= self._last_log_index() and
+                          self._term_at(last_index) == last_term)
+            self.storage.install_snapshot(path, last_index, last_term, retain_log)
+            
+            if retain_log:
+                dropped = last_index - self.snapshot_index
+                del self.log[:dropped]
+                del self.log_encoded[:dropped]
+            else:
+                self.log = []
+                self.log_encoded = []
+            self.snapshot_index = last_index
+            self.snapshot_term = last_term
+            self.last_applied = last_index
+            self.commit_index = max(self.commit_index, last_index)
+            self.durable_index = self._last_log_index()
+            self._persist_raft_state()
+            
+            # Proposals this node made as leader can no longer be matched to their entries
+            self._fail_apply_waiters(0)
+            
+            # Rebuild the in-memory state from the installed tables
+            self._init_state_machine()
+            self._load_state_machine()
+            self.last_heartbeat = time.time()
+            
+            # Events covered by the snapshot were never seen here; subscribers resynchronise
+            self.user_events.reset(last_index)
+        
+        self._notify_applied()
+        
+        logger.info(f"Installed snapshot through index {last_index} (term {last_term})")
+    
     def RequestVote(self, request, context):
         """Handle RequestVote RPC."""
+        with self.lock:
+            return self._handle_request_vote(request)
+    
+    def _handle_request_vote(self, request):
+        """RequestVote body; called with self.lock held."""
         logger.info(f"Received RequestVote from candidate {request.candidate_id} for term {request.term}")
         logger.info(f"My current term: {self.current_term}, voted_for: {self.voted_for}")
+        
+        # With leases, disregard candidates while a leader is known to be alive, without
+        # adopting their term; leader leases rely on no election succeeding in that window
+        if self.lease_reads and (self.state == NodeState.LEADER or
+                                 time.monotonic() - self.last_leader_contact < self.min_election_timeout):
+            logger.info("Heard from a current leader within the minimum election timeout. Rejecting vote.")
+            return exp_pb2.RequestVoteResponse(term=self.current_term, vote_granted=False)
+        
         # If term < currentTerm, reject
         if request.term < self.current_term:
             logger.info("Candidate's term is lower than my term. Rejecting vote.")
@@ -832,8 +1842,8 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
             self._persist_raft_state()
         
         # Determine if candidate's log is at least as up-to-date as ours
-        last_log_index = len(self.log) - 1
-        last_log_term = self.log[last_log_index][0] if self.log else 0
+        last_log_index = self._last_log_index()
+        last_log_term = self._term_at(last_log_index)
         
         logger.info(f"My last log index: {last_log_index}, last log term: {last_log_term}")
         logger.info(f"Candidate's last log index: {request.last_log_index}, term: {request.last_log_term}")
@@ -859,8 +1869,15 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
     # Client-facing methods
     
     def create_account(self, username: str, password_hash: str) -> Tuple[bool, str]:
-        logger.info("(raft_node.py): Attempting to create account for %s", username)
         """Create a new user account."""
+        return run_steps(self._create_account_steps(username, password_hash))
+    
+    async def create_account_async(self, username: str, password_hash: str) -> Tuple[bool, str]:
+        """Awaitable create_account, for the asyncio server."""
+        return await run_steps_async(self._create_account_steps(username, password_hash))
+    
+    def _create_account_steps(self, username: str, password_hash: str) -> Steps:
+        logger.info("(raft_node.py): Attempting to create account for %s", username)
         # Check if this node is the leader
         if self.state != NodeState.LEADER:
             if self.leader_id and self.leader_id in self.peers:
@@ -880,65 +1897,61 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         
         # Leader processing
         try:
-            # Check if username exists
-            logger.info(f"(raft_node.py): Checking if username {username} already exists: {self.user_trie.get(username)}")
-            if self.user_trie.get(username):
-                logger.info(f"(raft_node.py): Username {username} already exists")
+            command = self._create_account_command(username, password_hash)
+            if command is None:
                 return False, "Username already exists"
 
-            user_id = -1
-            
-            # Generate user ID
-            if self.user_base._deleted_user_ids:
-                user_id = self.user_base._deleted_user_ids.pop()
-            else:
-                user_id = self.user_base._next_user_id
-                self.user_base._next_user_id += 1
-
-            logger.info(f"(raft_node.py): Assigned user ID {user_id} for new account {username}")
-                
-            # Generate session token
-            token = hashlib.sha256(f"{user_id}_{hash(time.time())}".encode()).hexdigest()
-
-            # (COMMENTING OUT the following 2 lines)
-            # self.session_tokens.tokens[user_id] = token
-            
-            # Persist session token
-            # self._persist_session_token(user_id, token)
-            
-            # Create log entry
-            command = {
-                "type": "CREATE_ACCOUNT",
-                "username": username,
-                "password_hash": password_hash,
-                "user_id": user_id,
-                "session_token": token,
-                "timestamp": int(time.time())
-            }
-
             logger.info("(raft_node.py): Appending CREATE_ACCOUNT log entry for user %s", username)
-            # Append to log
-            appended_index = len(self.log)
-            self.log.append((self.current_term, command))
-            self._persist_log_entry(len(self.log) - 1, self.current_term, command)
-
-            start_time = time.time()
-            while True:
-                if self.commit_index >= appended_index and self.last_applied >= appended_index:
-                    break
-                if time.time() - start_time > 5.0:
-                    logger.warning("Timed out waiting for CREATE_ACCOUNT entry to commit/apply.")
-                    return (False, "Timeout waiting for commit/apply.")
-                time.sleep(0.01)
+            # Append to log, and wait until the command has been committed and applied
+            if (yield Wait(self, "_submit", command)) < 0:
+                return (False, "Timeout waiting for commit/apply.")
             
             logger.info("(raft_node.py): Successfully created account. Returning to client.")
             # Return success and session token
-            return True, token
+            return True, command["session_token"]
             
         except Exception as e:
             logger.error(f"Error in create_account: {str(e)}")
             return False, ""
     
+    def _create_account_command(self, username: str, password_hash: str) -> Optional[Dict]:
+        """Build the CREATE_ACCOUNT command for a new user, or None if the username is taken."""
+        # Check if username exists
+        logger.info(f"(raft_node.py): Checking if username {username} already exists: {self.user_trie.get(username)}")
+        if self.user_trie.get(username):
+            logger.info(f"(raft_node.py): Username {username} already exists")
+            return None
+
+        user_id = -1
+        
+        # Generate user ID
+        if self.user_base._deleted_user_ids:
+            user_id = self.user_base._deleted_user_ids.pop()
+        else:
+            user_id = self.user_base._next_user_id
+            self.user_base._next_user_id = next_user_id(user_id, self.group_id, self.num_groups)
+
+        logger.info(f"(raft_node.py): Assigned user ID {user_id} for new account {username}")
+            
+        # Generate session token
+        token = hashlib.sha256(f"{user_id}_{hash(time.time())}".encode()).hexdigest()
+
+        # (COMMENTING OUT the following 2 lines)
+        # self.session_tokens.tokens[user_id] = token
+        
+        # Persist session token
+        # self._persist_session_token(user_id, token)
+        
+        # Create log entry
+        return {
+            "type": "CREATE_ACCOUNT",
+            "username": username,
+            "password_hash": password_hash,
+            "user_id": user_id,
+            "session_token": token,
+            "timestamp": int(time.time())
+        }
+    
     def login(self, username: str, password_hash: str) -> Tuple[bool, int, str, int]:
         """
         Log into an existing account.
@@ -950,23 +1963,32 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         Returns:
             Tuple[bool, int, str, int]: (success, user_id, session_token, unread_count)
         """
+        return run_steps(self._login_steps(username, password_hash))
+    
+    async def login_async(self, username: str, password_hash: str) -> Tuple[bool, int, str, int]:
+        """Awaitable login, for the asyncio server."""
+        return await run_steps_async(self._login_steps(username, password_hash))
+    
+    def _login_steps(self, username: str, password_hash: str) -> Steps:
         # This can work on any node, doesn't need to be the leader
         try:
-            # Find the user
-            user = self.user_trie.get(username)
+            user = self._authenticate(username, password_hash)
             if not user:
                 return (False, 0, "", 0)
                 
-            # Check password
-            if user.passwordHash != password_hash:
-                return (False, 0, "", 0)
-                
             # Generate session token
             token = hashlib.sha256(f"{user.userID}_{hash(time.time())}".encode()).hexdigest()
-            self.session_tokens.tokens[user.userID] = token
             
-            # Persist session token
-            self._persist_session_token(user.userID, token)
+            if self.state == NodeState.LEADER:
+                # Replicate the session so every node accepts it: Subscribe streams
+                # may be served by followers and must survive a leader change
+                if (yield Wait(self, "_submit", self._create_session_command(user.userID, token))) < 0:
+                    return (False, 0, "", 0)
+            else:
+                self.session_tokens.tokens[user.userID] = token
+                
+                # Persist session token
+                self._persist_session_token(user.userID, token)
             
             # Return success info
             return (True, user.userID, token, len(user.unread_messages))
@@ -975,6 +1997,151 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
             logger.error(f"Error in login: {str(e)}")
             return (False, 0, "", 0)
     
+    def _authenticate(self, username: str, password_hash: str) -> Optional[User]:
+        """Return the user if the username exists and the password matches, else None."""
+        # Find the user
+        user = self.user_trie.get(username)
+        if not user:
+            return None
+            
+        # Check password
+        if user.passwordHash != password_hash:
+            return None
+        return user
+    
+    def _create_session_command(self, user_id: int, token: str) -> Dict:
+        return {
+            "type": "CREATE_SESSION",
+            "user_id": user_id,
+            "session_token": token
+        }
+    
+    def wait_for_linearizable_read(self) -> bool:
+        """
+        Wait until this node's state reflects every write committed before the call.
+        
+        The leader confirms its leadership with one heartbeat round, or with no
+        round trip at all while it holds a lease (lease_reads); a follower asks the
+        leader for its read index over one ReadIndex RPC. Either way the read is
+        then served locally once last_applied reaches that index, so linearizable
+        reads spread across the cluster instead of all hitting the leader.
+        
+        Returns:
+            bool: True once the read may be served, False if no leader could
+            confirm a read index within read_timeout
+        """
+        deadline = time.time() + self.read_timeout
+        lease_index = self._lease_read_index() if self.lease_reads else -1
+        if lease_index >= 0:
+            read_index = lease_index
+        elif self.state == NodeState.LEADER:
+            read_index = self._confirm_leadership(self.read_timeout)
+        else:
+            leader_id = self.leader_id
+            stub = self.peers.get(leader_id) if leader_id else None
+            if stub is None:
+                return False
+            try:
+                response = stub.ReadIndex(exp_pb2.ReadIndexRequest(term=self.current_term, group_id=self.group_id),
+                                          timeout=self.read_timeout)
+            except grpc.RpcError as e:
+                logger.warning(f"ReadIndex to leader {leader_id} failed: {str(e)}")
+                return False
+            read_index = response.read_index if response.success else -1
+        
+        if read_index < 0:
+            return False
+        return self._wait_for_applied(read_index, max(0.0, deadline - time.time()))
+    
+    async def wait_for_linearizable_read_async(self) -> bool:
+        """
+        Awaitable wait_for_linearizable_read, for the asyncio server.
+        
+        The follower's ReadIndex RPC and the wait for last_applied are awaited.
+        Confirming leadership waits on the leader's condition variable, so it runs
+        on the event loop's default executor; that wait lasts one heartbeat round.
+        """
+        deadline = time.time() + self.read_timeout
+        lease_index = self._lease_read_index() if self.lease_reads else -1
+        if lease_index >= 0:
+            read_index = lease_index
+        elif self.state == NodeState.LEADER:
+            loop = asyncio.get_running_loop()
+            read_index = await loop.run_in_executor(None, self._confirm_leadership, self.read_timeout)
+        else:
+            leader_id = self.leader_id
+            stub = self.peers.get(leader_id) if leader_id else None
+            if stub is None:
+                return False
+            try:
+                response = await _await_rpc(stub.ReadIndex.future(
+                    exp_pb2.ReadIndexRequest(term=self.current_term, group_id=self.group_id),
+                    timeout=self.read_timeout))
+            except grpc.RpcError as e:
+                logger.warning(f"ReadIndex to leader {leader_id} failed: {str(e)}")
+                return False
+            read_index = response.read_index if response.success else -1
+        
+        if read_index < 0:
+            return False
+        return await self._wait_for_applied_async(read_index, max(0.0, deadline - time.time()))
+    
+    def propose(self, command: Dict, timeout: float = 5.0) -> bool:
+        """
+        Commit a command to this node's group, forwarding it to the group's leader
+        over a Propose RPC if this node isn't the leader.
+        
+        Returns:
+            bool: True once the command has been committed and applied
+        """
+        return self.propose_many([command], timeout)
+    
+    async def propose_async(self, command: Dict, timeout: float = 5.0) -> bool:
+        """Awaitable propose, for the asyncio server."""
+        return await self.propose_many_async([command], timeout)
+    
+    def _propose_request(self, commands: List[Dict]):
+        encoded = [encode_command(command) for command in commands]
+        return exp_pb2.ProposeRequest(group_id=self.group_id, command=encoded[0], commands=encoded[1:])
+    
+    def propose_many(self, commands: List[Dict], timeout: float = 5.0) -> bool:
+        """
+        Commit commands to this node's group as consecutive entries, in one
+        Propose RPC to the group's leader if this node isn't the leader.
+        
+        Returns:
+            bool: True once every command has been committed and applied
+        """
+        if self.state == NodeState.LEADER:
+            return self._submit_many(commands, timeout) is not None
+        
+        leader_id = self.leader_id
+        stub = self.peers.get(leader_id) if leader_id else None
+        if stub is None:
+            return False
+        try:
+            response = stub.Propose(self._propose_request(commands), timeout=timeout)
+        except grpc.RpcError as e:
+            logger.warning(f"Propose to leader {leader_id} failed: {str(e)}")
+            return False
+        return response.success
+    
+    async def propose_many_async(self, commands: List[Dict], timeout: float = 5.0) -> bool:
+        """Awaitable propose_many, for the asyncio server."""
+        if self.state == NodeState.LEADER:
+            return await self._submit_many_async(commands, timeout) is not None
+        
+        leader_id = self.leader_id
+        stub = self.peers.get(leader_id) if leader_id else None
+        if stub is None:
+            return False
+        try:
+            response = await _await_rpc(stub.Propose.future(self._propose_request(commands), timeout=timeout))
+        except grpc.RpcError as e:
+            logger.warning(f"Propose to leader {leader_id} failed: {str(e)}")
+            return False
+        return response.success
+    
     def validate_session(self, user_id: int, session_token: str) -> bool:
         """
         Validate that a session token is valid for a user.
@@ -1002,110 +2169,153 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         logger.info(f"(raft_node.py) stored_token={stored[:10]}..., provided={session_token[:10]}...")
         return self.session_tokens.tokens[user_id] == session_token
     
-    def list_accounts(self, wildcard: str) -> List[str]:
+    def list_accounts(self, wildcard: str, limit: Optional[int] = None, after: Optional[str] = None) -> List[User]:
         """
         List accounts matching a wildcard pattern.
         
         Args:
             wildcard: Wildcard pattern to match usernames against
+            limit: Most usernames to return, or None for all
+            after: Return only usernames after this one
             
         Returns:
-            List of matching usernames
+            List of matching users, sorted by username
         """
         # This can work on any node, doesn't need to be the leader
         try:
-            matching_users = self.user_trie.regex_search(wildcard, return_values=False)
-            return sorted(matching_users)
+            return self.user_trie.regex_search(wildcard, return_values=True, limit=limit, after=after)
         except Exception as e:
             logger.error(f"Error in list_accounts: {str(e)}")
             return []
     
-    def display_conversation(self, user_id: int, conversant_id: int) -> List[Message]:
+    def display_conversation(self, user_id: int, conversant_id: int, before_id: Optional[int] = None,
+                             after_id: Optional[int] = None, limit: Optional[int] = None) -> List[Message]:
         """
-        Retrieve the conversation between two users.
+        Retrieve the conversation between two users, or one page of it.
         
         Args:
             user_id: First user ID
             conversant_id: Second user ID
+            before_id: Only return messages older than this message ID
+            after_id: Only return messages newer than this message ID
+            limit: Most messages to return; the newest ones unless after_id is given
             
         Returns:
-            List of Message objects containing the conversation
+            List of Message objects, oldest first
         """
         # This can work on any node, doesn't need to be the leader
         logger.info(f"(raft_node.py): display_conversation called on node {self.node_id} between {user_id} and {conversant_id}")
         try:
             conversation_key = tuple(sorted([user_id, conversant_id]))
-            if conversation_key in self.conversations.conversations:
-                convo = self.conversations.conversations[conversation_key]
-                logger.info(f"(raft_node.py): Found {len(convo)} messages in conversation {conversation_key}")
-                return self.conversations.conversations[conversation_key]
-            return []
-        except Exception as e:
+            convo = self.conversations.page(conversation_key, before_id, after_id, limit)
+            logger.info(f"(raft_node.py): Found {len(convo)} messages in conversation {conversation_key}")
+            return convo
+        except Exception:
             logger.info(f"(raft_node.py): No conversation found for {conversation_key}")
             return []
     
-    def send_message(self, sender_id: int, recipient_id: int, content: str) -> bool:
+    def owns_user(self, user_id: int) -> bool:
+        """Return True if the user belongs to this node's Raft group."""
+        return group_for_user(user_id, self.num_groups) == self.group_id
+    
+    def send_message(self, sender_id: int, recipient_id: int, content: str) -> Optional[int]:
         """
         Send a message from one user to another.
         
+        In a sharded cluster this is called on the conversation's home group;
+        a party that belongs to another group is not checked here.
+        
         Args:
             sender_id: ID of the sender
             recipient_id: ID of the recipient
             content: Message content
             
         Returns:
-            bool: True if successful, False otherwise
+            Optional[int]: ID of the message once applied, None on failure
         """
+        return run_steps(self._send_message_steps(sender_id, recipient_id, content))
+    
+    async def send_message_async(self, sender_id: int, recipient_id: int, content: str) -> Optional[int]:
+        """Awaitable send_message, for the asyncio server."""
+        return await run_steps_async(self._send_message_steps(sender_id, recipient_id, content))
+    
+    def _send_message_steps(self, sender_id: int, recipient_id: int, content: str) -> Steps:
         # Check if this node is the leader
         if self.state != NodeState.LEADER:
-            return False  # Only leader can process this
+            return None  # Only leader can process this
         
         try:
-            # Check if sender and recipient exist
-            if sender_id not in self.user_base.users or recipient_id not in self.user_base.users:
-                return False
+            command = self._send_message_command(sender_id, recipient_id, content)
+            if command is None:
+                return None
             
-            # Generate message ID
-            if self.message_base._deleted_message_ids:
-                message_id = self.message_base._deleted_message_ids.pop()
-            else:
-                message_id = self.message_base._next_message_id
-                self.message_base._next_message_id += 1
+            # Append to log; resolved by the apply thread once the entry is committed and applied
+            appended_index = yield Wait(self, "_submit", command)
+            if appended_index < 0:
+                return None
+            return message_id_for_index(appended_index, self.group_id, self.num_groups)
             
-            # Create log entry
-            command = {
-                "type": "SEND_MESSAGE",
-                "message_id": message_id,
-                "sender_id": sender_id,
-                "receiver_id": recipient_id,
-                "content": content,
-                "timestamp": int(time.time())
-            }
+        except Exception as e:
+            logger.error(f"Error in send_message: {str(e)}")
+            return None
+    
+    def send_messages(self, sender_id: int, messages: List[Tuple[int, str]]) -> Optional[List[int]]:
+        """
+        Send several messages from one user, as consecutive log entries that
+        share one disk write, replication round and commit wait.
+        
+        Args:
+            sender_id: ID of the sender
+            messages: (recipient_id, content) pairs; every conversation must have
+                this node's group as its home group
             
-            # Append to log
-            appended_index = len(self.log)
-            self.log.append((self.current_term, command))
-            self._persist_log_entry(len(self.log) - 1, self.current_term, command)
-
-            start_time = time.time()
-            while True:
-                # 1) 'commit_index' means the leader has determined it's safe to apply
-                # 2) 'last_applied' means we *actually* ran _apply_command on it
-                if self.commit_index >= appended_index and self.last_applied >= appended_index:
-                    break
-
-                # If we wait too long, we might want to time out
-                if time.time() - start_time > 5.0:  # 5 second timeout, for example
-                    logger.warning("Timed out waiting for SEND_MESSAGE entry to commit/apply.")
-                    return False
-
-                time.sleep(0.01)  # Sleep briefly to avoid busy loop
-
-            return True
+        Returns:
+            Optional[List[int]]: The message IDs, in order, or None if a party
+            doesn't exist or the messages weren't committed
+        """
+        return run_steps(self._send_messages_steps(sender_id, messages))
+    
+    async def send_messages_async(self, sender_id: int, messages: List[Tuple[int, str]]) -> Optional[List[int]]:
+        """Awaitable send_messages, for the asyncio server."""
+        return await run_steps_async(self._send_messages_steps(sender_id, messages))
+    
+    def _send_messages_steps(self, sender_id: int, messages: List[Tuple[int, str]]) -> Steps:
+        if self.state != NodeState.LEADER:
+            return None
+        
+        try:
+            commands = self._send_messages_commands(sender_id, messages)
+            if commands is None:
+                return None
+            indexes = yield Wait(self, "_submit_many", commands)
+            if indexes is None:
+                return None
+            return [message_id_for_index(index, self.group_id, self.num_groups) for index in indexes]
             
         except Exception as e:
-            logger.error(f"Error in send_message: {str(e)}")
-            return False
+            logger.error(f"Error in send_messages: {str(e)}")
+            return None
+    
+    def _send_messages_commands(self, sender_id: int, messages: List[Tuple[int, str]]) -> Optional[List[Dict]]:
+        commands = [self._send_message_command(sender_id, recipient_id, content)
+                    for recipient_id, content in messages]
+        return None if not commands or None in commands else commands
+    
+    def _send_message_command(self, sender_id: int, recipient_id: int, content: str) -> Optional[Dict]:
+        """Build the SEND_MESSAGE command, or None if a party of this group doesn't exist."""
+        # Check if sender and recipient exist
+        for user_id in (sender_id, recipient_id):
+            if self.owns_user(user_id) and user_id not in self.user_base.users:
+                return None
+        
+        # The message ID is derived from the entry's log index
+        return {
+            "type": "SEND_MESSAGE",
+            "sender_id": sender_id,
+            "receiver_id": recipient_id,
+            "content": content,
+            "timestamp": int(time.time())
+        }
     
     def read_messages(self, user_id: int, count: int) -> bool:
         """
@@ -1118,26 +2328,24 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         Returns:
             bool: True if successful, False otherwise
         """
+        return run_steps(self._read_messages_steps(user_id, count))
+    
+    async def read_messages_async(self, user_id: int, count: int) -> bool:
+        """Awaitable read_messages, for the asyncio server."""
+        return await run_steps_async(self._read_messages_steps(user_id, count))
+    
+    def _read_messages_steps(self, user_id: int, count: int) -> Steps:
         # Check if this node is the leader
         if self.state != NodeState.LEADER:
             return False  # Only leader can process this
         
         try:
-            # Check if user exists
-            if user_id not in self.user_base.users:
+            command = self._read_messages_command(user_id, count)
+            if command is None:
                 return False
             
-            # Create log entry
-            command = {
-                "type": "READ_MESSAGES",
-                "user_id": user_id,
-                "count": count,
-                "timestamp": int(time.time())
-            }
-            
             # Append to log
-            self.log.append((self.current_term, command))
-            self._persist_log_entry(len(self.log) - 1, self.current_term, command)
+            yield Wait(self, "_submit", command, wait_for_apply=False)
             
             return True
             
@@ -1145,6 +2353,19 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
             logger.error(f"Error in read_messages: {str(e)}")
             return False
     
+    def _read_messages_command(self, user_id: int, count: int) -> Optional[Dict]:
+        """Build the READ_MESSAGES command, or None if the user doesn't exist."""
+        # Check if user exists
+        if user_id not in self.user_base.users:
+            return None
+        
+        return {
+            "type": "READ_MESSAGES",
+            "user_id": user_id,
+            "count": count,
+            "timestamp": int(time.time())
+        }
+    
     def mark_message_as_read(self, user_id: int, message_id: int) -> bool:
         """
         Mark a specific message as read.
@@ -1156,26 +2377,24 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         Returns:
             bool: True if successful, False otherwise
         """
+        return run_steps(self._mark_message_as_read_steps(user_id, message_id))
+    
+    async def mark_message_as_read_async(self, user_id: int, message_id: int) -> bool:
+        """Awaitable mark_message_as_read, for the asyncio server."""
+        return await run_steps_async(self._mark_message_as_read_steps(user_id, message_id))
+    
+    def _mark_message_as_read_steps(self, user_id: int, message_id: int) -> Steps:
         # Check if this node is the leader
         if self.state != NodeState.LEADER:
             return False  # Only leader can process this
         
         try:
-            # Check if user and message exist
-            if user_id not in self.user_base.users or message_id not in self.message_base.messages:
+            command = self._mark_read_command(user_id, message_id)
+            if command is None:
                 return False
             
-            # Create log entry
-            command = {
-                "type": "MARK_READ",
-                "user_id": user_id,
-                "message_id": message_id,
-                "timestamp": int(time.time())
-            }
-            
             # Append to log
-            self.log.append((self.current_term, command))
-            self._persist_log_entry(len(self.log) - 1, self.current_term, command)
+            yield Wait(self, "_submit", command, wait_for_apply=False)
             
             return True
             
@@ -1183,6 +2402,19 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
             logger.error(f"Error in mark_message_as_read: {str(e)}")
             return False
     
+    def _mark_read_command(self, user_id: int, message_id: int) -> Optional[Dict]:
+        """Build the MARK_READ command, or None if the user or message doesn't exist."""
+        # Check if user and message exist
+        if user_id not in self.user_base.users or message_id not in self.message_base.messages:
+            return None
+        
+        return {
+            "type": "MARK_READ",
+            "user_id": user_id,
+            "message_id": message_id,
+            "timestamp": int(time.time())
+        }
+    
     def delete_message(self, message_id: int) -> bool:
         """
         Delete a message.
@@ -1193,6 +2425,13 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         Returns:
             bool: True if successful, False otherwise
         """
+        return run_steps(self._delete_message_steps(message_id))
+    
+    async def delete_message_async(self, message_id: int) -> bool:
+        """Awaitable delete_message, for the asyncio server."""
+        return await run_steps_async(self._delete_message_steps(message_id))
+    
+    def _delete_message_steps(self, message_id: int) -> Steps:
         if self.state != NodeState.LEADER:
             return False  # Only leader can process this
     
@@ -1200,26 +2439,8 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
             if message_id not in self.message_base.messages:
                 return False
 
-            command = {
-                "type": "DELETE_MESSAGE",
-                "message_id": message_id,
-                "timestamp": int(time.time())
-            }
-            appended_index = len(self.log)
-            self.log.append((self.current_term, command))
-            self._persist_log_entry(appended_index, self.current_term, command)
-
             # Wait until the command has been committed and applied
-            start_time = time.time()
-            while True:
-                if self.commit_index >= appended_index and self.last_applied >= appended_index:
-                    break
-                if time.time() - start_time > 5.0:
-                    logger.warning("Timed out waiting for DELETE_MESSAGE entry to commit/apply.")
-                    return False
-                time.sleep(0.01)
-
-            return True
+            return (yield Wait(self, "_submit", self._delete_message_command(message_id))) >= 0
 
         except Exception as e:
             logger.error(f"Error in delete_message: {str(e)}")
@@ -1254,6 +2475,13 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
             return False
         """
         
+    def _delete_message_command(self, message_id: int) -> Dict:
+        return {
+            "type": "DELETE_MESSAGE",
+            "message_id": message_id,
+            "timestamp": int(time.time())
+        }
+    
     def delete_account(self, user_id: int) -> bool:
         """
         Delete a user account.
@@ -1264,33 +2492,22 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         Returns:
             bool: True if successful, False otherwise
         """
+        return run_steps(self._delete_account_steps(user_id))
+    
+    async def delete_account_async(self, user_id: int) -> bool:
+        """Awaitable delete_account, for the asyncio server."""
+        return await run_steps_async(self._delete_account_steps(user_id))
+    
+    def _delete_account_steps(self, user_id: int) -> Steps:
         if self.state != NodeState.LEADER:
-        return False  # Only leader can process this
+            return False  # Only leader can process this
 
         try:
             if user_id not in self.user_base.users:
                 return False
 
-            command = {
-                "type": "DELETE_ACCOUNT",
-                "user_id": user_id,
-                "timestamp": int(time.time())
-            }
-            appended_index = len(self.log)
-            self.log.append((self.current_term, command))
-            self._persist_log_entry(appended_index, self.current_term, command)
-
             # Wait until the command has been committed and applied
-            start_time = time.time()
-            while True:
-                if self.commit_index >= appended_index and self.last_applied >= appended_index:
-                    break
-                if time.time() - start_time > 5.0:
-                    logger.warning("Timed out waiting for DELETE_ACCOUNT entry to commit/apply.")
-                    return False
-                time.sleep(0.01)
-
-            return True
+            return (yield Wait(self, "_submit", self._delete_account_command(user_id))) >= 0
 
         except Exception as e:
             logger.error(f"Error in delete_account: {str(e)}")
@@ -1324,6 +2541,13 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
             return False
         """
         
+    def _delete_account_command(self, user_id: int) -> Dict:
+        return {
+            "type": "DELETE_ACCOUNT",
+            "user_id": user_id,
+            "timestamp": int(time.time())
+        }
+    
     def get_unread_messages(self, user_id: int) -> List[Tuple[int, int, int]]:
         """
         Get list of unread messages for a user.
@@ -1342,7 +2566,8 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
             user = self.user_base.users[user_id]
             result = []
             
-            for msg_id in user.unread_messages:
+            # A copy, as entries applied meanwhile change the unread set
+            for msg_id in list(user.unread_messages):
                 if msg_id in self.message_base.messages:
                     msg = self.message_base.messages[msg_id]
                     result.append((msg.uid, msg.sender_id, msg.receiver_id))
@@ -1429,1386 +2654,9 @@ class RaftNode(exp_pb2_grpc.RaftServiceServicer):
         self.running = False
         if self.raft_thread.is_alive():
             self.raft_thread.join(timeout=1)
+        if self.apply_thread.is_alive():
+            self.apply_thread.join(timeout=1)
+        self.log_writer.close()
+        self.storage.close()
         
         logger.info(f"Stopping Raft node {self.node_id}")
-=======
-# raft_node.py
-import os
-import sys
-import time
-import json
-import random
-import threading
-import sqlite3
-import grpc
-import hashlib
-from concurrent import futures
-from typing import Dict, List, Optional, Tuple, Set, Any
-from collections import deque
-import logging
-
-# Existing imports
-import exp_pb2
-import exp_pb2_grpc
-from core_entities import User, Message
-from core_structures import GlobalUserBase, GlobalUserTrie, GlobalSessionTokens, GlobalMessageBase, GlobalConversations
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.FileHandler("raft_server.log"),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
-
-# Define Raft node states
-class NodeState:
-    FOLLOWER = "FOLLOWER"
-    CANDIDATE = "CANDIDATE"
-    LEADER = "LEADER"
-
-class RaftNode(exp_pb2_grpc.RaftServiceServicer):
-    """Implementation of a Raft consensus node for the chat system."""
-    
-    def __init__(self, node_id: str, cluster_config: Dict[str, str], data_dir: str):
-        """
-        Initialize a Raft node.
-        
-        Args:
-            node_id: Unique identifier for this node
-            cluster_config: Dict mapping node_ids to "host:port" addresses
-            data_dir: Directory to store persistent data
-        """
-        self.node_id = node_id
-        self.cluster_config = cluster_config
-        self.address = cluster_config[node_id]
-        self.data_dir = data_dir
-        
-        # Ensure data directory exists
-        os.makedirs(data_dir, exist_ok=True)
-        
-        # Initialize Raft state
-        self.state = NodeState.FOLLOWER
-        self.current_term = 0
-        self.voted_for = None
-        self.leader_id = None
-        
-        # Log entries and commit index
-        self.log = []  # List of (term, command) entries
-        self.commit_index = -1
-        self.last_applied = -1
-        
-        # Leader state (initialized when becoming leader)
-        self.next_index = {}  # Dict mapping node_id to next log index
-        self.match_index = {}  # Dict mapping node_id to highest log index known to be replicated
-        
-        # Timing variables
-        self.election_timeout = self._generate_election_timeout()
-        self.last_heartbeat = time.time()
-        
-        # Initialize database connection
-        self.db_path = os.path.join(data_dir, f"node_{node_id}.db")
-        self._init_database()
-        
-        # Initialize in-memory state (loaded from persistent storage)
-        self.user_base = GlobalUserBase()
-        self.user_trie = GlobalUserTrie()
-        self.session_tokens = GlobalSessionTokens()
-        self.message_base = GlobalMessageBase()
-        self.conversations = GlobalConversations()
-        
-        # Load state from database
-        self._load_state_from_db()
-        
-        # Initialize peers (gRPC connections to other nodes)
-        self.peers = {}
-        self.unreachable_peers = set()
-        self._init_peer_connections()
-        
-        # Start background threads
-        self.running = True
-        self.raft_thread = threading.Thread(target=self._run_raft_loop)
-        self.raft_thread.daemon = True
-        self.raft_thread.start()
-        
-        logger.info(f"Initialized Raft node {self.node_id} at {self.address}")
-    
-    def _init_database(self):
-        """Initialize the SQLite database for persistent storage."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        # Create tables if they don't exist
-        
-        # Raft state table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS raft_state (
-            key TEXT PRIMARY KEY,
-            value TEXT
-        )
-        ''')
-        
-        # Log entries table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS log_entries (
-        log_index INTEGER PRIMARY KEY,
-        term INTEGER,
-        command TEXT
-        )
-        ''')
-        
-        # Users table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY,
-            username TEXT UNIQUE,
-            password_hash TEXT,
-            data TEXT
-        )
-        ''')
-        
-        # Messages table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS messages (
-            message_id INTEGER PRIMARY KEY,
-            sender_id INTEGER,
-            receiver_id INTEGER,
-            content TEXT,
-            has_been_read INTEGER,
-            timestamp INTEGER
-        )
-        ''')
-        
-        # Session tokens table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS session_tokens (
-            user_id INTEGER PRIMARY KEY,
-            token TEXT,
-            expiry INTEGER
-        )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        
-        logger.info(f"Database initialized at {self.db_path}")
-    
-    def _load_state_from_db(self):
-        """Load the node's state from the database."""
-        
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        # Load Raft state
-        c.execute("SELECT key, value FROM raft_state")
-        raft_state = dict(c.fetchall())
-        
-        if "current_term" in raft_state:
-            self.current_term = int(raft_state["current_term"])
-        if "voted_for" in raft_state:
-            self.voted_for = raft_state["voted_for"] if raft_state["voted_for"] != "None" else None
-        if "commit_index" in raft_state:
-            self.commit_index = int(raft_state["commit_index"])
-        
-        # Load log entries
-        c.execute("SELECT term, command FROM log_entries ORDER BY log_index ASC")
-        self.log = [(term, json.loads(command)) for term, command in c.fetchall()]
-        
-        
-        # Load users
-        c.execute("SELECT user_id, username, password_hash, data FROM users")
-        for user_id, username, password_hash, data in c.fetchall():
-            logger.info(f"(raft_node.py) _load_state_from_db: Loading user from DB: {user_id}, {username}, data: {data}")
-
-            user_data = json.loads(data)
-            user = User(user_id, username, password_hash)
-            user.unread_messages = deque(user_data.get("unread_messages", []))
-            user.recent_conversants = user_data.get("recent_conversants", [])
-            
-            self.user_base.users[user_id] = user
-            self.user_trie.add(username, user)
-
-        # Load messages
-        c.execute("SELECT message_id, sender_id, receiver_id, content, has_been_read, timestamp FROM messages")
-        for msg_id, sender_id, receiver_id, content, has_been_read, timestamp in c.fetchall():
-            message = Message(
-                msg_id, 
-                content, 
-                sender_id, 
-                receiver_id,
-                bool(has_been_read),
-                timestamp
-            )
-            self.message_base.messages[msg_id] = message
-            
-            # Update conversation
-            conversation_key = tuple(sorted([sender_id, receiver_id]))
-            self.conversations.conversations[conversation_key].append(message)
-        
-        # Clean up expired tokens
-        self._cleanup_expired_tokens()
-                
-        # Load session tokens
-        c.execute("SELECT user_id, token, expiry FROM session_tokens WHERE expiry > ?", (int(time.time()),))
-        for user_id, token, expiry in c.fetchall():
-            self.session_tokens.tokens[user_id] = token
-
-        logger.info(f"(raft_node.py) _load_state_from_db: Loaded {len(self.user_base.users)} users and {len(self.message_base.messages)} messages from DB")
-        logger.info(f"(raft_node.py) _load_state_from_db: loaded {len(self.session_tokens.tokens)} session tokens.")
-
-        conn.close()
-
-        self.state = NodeState.FOLLOWER
-        self.leader_id = None
-        self.voted_for = None
-        # self.last_heartbeat = 0
-        self.last_heartbeat = time.time()
-
-        # Update next_user_id and next_message_id based on existing data
-        if self.user_base.users:
-            self.user_base._next_user_id = max(self.user_base.users.keys()) + 1
-        if self.message_base.messages:
-            self.message_base._next_message_id = max(self.message_base.messages.keys()) + 1
-        
-        # logger.info(f"Loaded state from database: {len(self.user_base.users)} users, {len(self.message_base.messages)} messages")
-    
-    def _persist_raft_state(self):
-        """Persist Raft state to the database."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute("DELETE FROM raft_state")
-        c.execute("INSERT INTO raft_state VALUES (?, ?)", ("current_term", str(self.current_term)))
-        c.execute("INSERT INTO raft_state VALUES (?, ?)", ("voted_for", str(self.voted_for)))
-        c.execute("INSERT INTO raft_state VALUES (?, ?)", ("commit_index", str(self.commit_index)))
-        
-        conn.commit()
-        conn.close()
-    
-    def _persist_log_entry(self, index: int, term: int, command: Dict):
-        """Persist a log entry to the database."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute("INSERT OR REPLACE INTO log_entries VALUES (?, ?, ?)",
-                 (index, term, json.dumps(command)))
-        
-        conn.commit()
-        conn.close()
-    
-    def _persist_user(self, user: User):
-        """Persist a user to the database."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        # Serialize user data
-        user_data = {
-            "unread_messages": list(user.unread_messages),
-            "recent_conversants": user.recent_conversants
-        }
-        print(f"Persisting user: {user.userID}, {user.username}, {user_data}")
-        
-        c.execute("INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?)",
-                 (user.userID, user.username, user.passwordHash, json.dumps(user_data)))
-        
-        conn.commit()
-        conn.close()
-    
-    def _persist_message(self, message: Message):
-        """Persist a message to the database."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?)",
-                 (message.uid, message.sender_id, message.receiver_id, 
-                  message.contents, int(message.has_been_read), message.timestamp))
-        
-        conn.commit()
-        conn.close()
-    
-    def _persist_session_token(self, user_id: int, token: str, expiry: int = None):
-        """Persist a session token to the database."""
-        if expiry is None:
-            # Default expiry: 1 day
-            expiry = int(time.time()) + 24 * 60 * 60
-            
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
-        c.execute("INSERT OR REPLACE INTO session_tokens VALUES (?, ?, ?)",
-                 (user_id, token, expiry))
-        
-        conn.commit()
-        conn.close()
-    
-    def _cleanup_expired_tokens(self):
-        current_time = int(time.time())
-
-        # Clean up from database
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("DELETE FROM session_tokens WHERE expiry < ?", (current_time,))
-        expired_users = [row[0] for row in c.execute("SELECT user_id FROM session_tokens WHERE expiry < ?", (current_time,))]
-        conn.commit()
-        conn.close()
-        
-        # Clean up from memory
-        for user_id in expired_users:
-            if user_id in self.session_tokens.tokens:
-                del self.session_tokens.tokens[user_id]
-
-    def _generate_election_timeout(self):
-        """Generate a random election timeout between 150-300ms."""
-        # return random.uniform(0.3, 0.6)  # in seconds for easier testing
-        # return random.uniform(10.0, 13.0)
-        return random.uniform(5.0, 7.0)
-    
-    def _init_peer_connections(self):
-        """Initialize gRPC connections to peer nodes."""
-        print(f"[DEBUG] Node {self.node_id} initializing peer connections")
-        self.unreachable_peers = set()
-        for node_id, address in self.cluster_config.items():
-            if node_id != self.node_id:
-                try:
-                    print(f"[DEBUG] Node {self.node_id} connecting to peer {node_id} at {address}")
-                    channel = grpc.insecure_channel(address)
-                    stub = exp_pb2_grpc.RaftServiceStub(channel)
-                    self.peers[node_id] = stub
-                    print(f"[DEBUG] Successfully created stub for {node_id}")
-                except Exception as e:
-                    print(f"[DEBUG] Error creating stub for {node_id}: {str(e)}")
-                # channel = grpc.insecure_channel(address)
-                # stub = exp_pb2_grpc.RaftServiceStub(channel)
-                # self.peers[node_id] = stub
-    
-                
-    def _run_raft_loop(self):
-        """Main Raft algorithm loop."""
-        while self.running:
-            current_time = time.time()
-            time_since_heartbeat = (current_time - self.last_heartbeat) * 1000  # Convert to ms
-            
-            if self.state == NodeState.FOLLOWER:
-                # Check if election timeout has elapsed
-                if time_since_heartbeat > self.election_timeout:
-                    logger.info(f"Node {self.node_id} election timeout elapsed: {time_since_heartbeat:.2f}ms > {self.election_timeout}ms")
-                    self._become_candidate()
-            
-            elif self.state == NodeState.CANDIDATE:
-                # Start election
-                self._start_election()
-            
-            elif self.state == NodeState.LEADER:
-                # Send heartbeats/AppendEntries more frequently (every 50ms)
-                if time_since_heartbeat > 50:
-                    self._send_heartbeats()
-                    self.last_heartbeat = current_time
-        
-            # Apply committed entries to state machine
-            self._apply_committed_entries()
-        
-            # Sleep briefly to avoid consuming too much CPU
-            time.sleep(0.05)
-    
-    def _become_candidate(self):
-        """Transition to candidate state and start an election."""
-        self.state = NodeState.CANDIDATE
-        self.current_term += 1
-        self.voted_for = self.node_id
-        self.election_timeout = self._generate_election_timeout()
-        self.last_heartbeat = time.time()
-        logger.debug(f"Node {self.node_id} becomes candidate for term {self.current_term}. New election timeout: {self.election_timeout}")
-        self._persist_raft_state()
-        
-        logger.info(f"Node {self.node_id} became candidate for term {self.current_term}")
-    
-    def _start_election(self):
-        """Start a leader election."""
-        # Increment current term and vote for self
-        self._init_peer_connections()
-        self.unreachable_peers.clear()
-        votes_received = 1  # Vote for self
-        reachable_peers = []
-        logger.debug(f"Node {self.node_id}: Starting election for term {self.current_term}")
-
-        for peer_id in self.cluster_config:
-            if peer_id == self.node_id:
-                continue
-            if peer_id in self.unreachable_peers:
-                continue  # Skip peers that are already marked as unreachable.
-            stub = self.peers.get(peer_id)
-            if not stub:
-                continue  # If there's no stub, skip this peer.
-            try:
-                request = exp_pb2.RequestVoteRequest(
-                    term=self.current_term,
-                    candidate_id=self.node_id,
-                    last_log_index=len(self.log) - 1,
-                    last_log_term=self.log[-1][0] if self.log else 0
-                )
-                # Use a short timeout to quickly fail if the peer is unreachable.
-                response = stub.RequestVote(request, timeout=20.0)
-                reachable_peers.append(peer_id)
-                if response.vote_granted:
-                    votes_received += 1
-                # If the peer has a higher term, immediately revert to follower.
-                if response.term > self.current_term:
-                    self.current_term = response.term
-                    self.state = NodeState.FOLLOWER
-                    self.voted_for = None
-                    self._persist_raft_state()
-                    logger.info(f"Node {self.node_id} reverted to follower (higher term {response.term}).")
-                    return
-            except Exception as e:
-                # Mark this peer as unreachable so that we skip it in subsequent election rounds.
-                self.unreachable_peers.add(peer_id)
-                logger.warning(f"Marking peer {peer_id} as unreachable: {str(e)}")
-
-        # Calculate the effective total nodes (self plus all reachable peers)
-        effective_total = len(reachable_peers) + 1
-        quorum_threshold = (effective_total // 2) + 1
-        logger.info(f"Election: votes_received={votes_received}, quorum_threshold={quorum_threshold}, reachable_peers={reachable_peers}")
-
-        if votes_received >= quorum_threshold:
-            self._become_leader()
-        else:
-            logger.warning("Not enough votes received in election. Retrying election cycle...")
-            self._become_candidate()
-        
-    def _become_leader(self):
-        """Transition to leader state."""
-        self.state = NodeState.LEADER
-        self.leader_id = self.node_id
-        
-        # Initialize leader state
-        self.next_index = {node_id: len(self.log) for node_id in self.cluster_config if node_id != self.node_id}
-        self.match_index = {node_id: -1 for node_id in self.cluster_config if node_id != self.node_id}
-        
-        logger.info(f"Node {self.node_id} became leader for term {self.current_term}")
-        
-        # Send immediate heartbeats
-        self._send_heartbeats()
-    
-    def _send_heartbeats(self):
-        """Send AppendEntries RPCs to all peers (as heartbeats or to replicate logs)."""
-        # self._init_peer_connections()
-        for peer_id, stub in self.peers.items():
-            try:
-                next_idx = self.next_index.get(peer_id, 0)
-                prev_log_index = next_idx - 1
-                prev_log_term = self.log[prev_log_index][0] if prev_log_index >= 0 and self.log else 0
-                
-                # Get entries to send
-                entries = self.log[next_idx:] if next_idx < len(self.log) else []
-                
-                # Convert entries to protobuf format
-                pb_entries = []
-                for term, command in entries:
-                    log_entry = exp_pb2.LogEntry(
-                        term=term,
-                        command=json.dumps(command)
-                    )
-                    pb_entries.append(log_entry)
-                
-                request = exp_pb2.AppendEntriesRequest(
-                    term=self.current_term,
-                    leader_id=self.node_id,
-                    prev_log_index=prev_log_index,
-                    prev_log_term=prev_log_term,
-                    entries=pb_entries,
-                    leader_commit=self.commit_index
-                )
-                
-                response = stub.AppendEntries(request, timeout=1)
-                
-                if response.success:
-                    # Update nextIndex and matchIndex for this follower
-                    if pb_entries:
-                        self.next_index[peer_id] = next_idx + len(pb_entries)
-                        self.match_index[peer_id] = self.next_index[peer_id] - 1
-                else:
-                    # If AppendEntries fails because of log inconsistency
-                    if self.next_index[peer_id] > 0:
-                        self.next_index[peer_id] -= 1
-                
-                # If we discover a higher term, revert to follower
-                if response.term > self.current_term:
-                    self.current_term = response.term
-                    self.state = NodeState.FOLLOWER
-                    self.voted_for = None
-                    self.leader_id = None
-                    self._persist_raft_state()
-                    logger.info(f"Node {self.node_id} reverted to follower (higher term)")
-                    return
-                
-            except Exception as e:
-                logger.warning(f"Failed to send AppendEntries to {peer_id}: {str(e)}")
-        
-        # Update commit index based on matchIndex values
-        self._update_commit_index()
-        
-        # Reset heartbeat timer
-        self.last_heartbeat = time.time()
-
-
-
-    def _update_commit_index(self):
-        if self.state != NodeState.LEADER:
-            return
-
-        # healthy_count = 1 + sum(1 for peer in self.peers if self.match_index.get(peer, -1) != -1)
-        # if healthy_count < (len(self.cluster_config) // 2) + 1:
-            # logger.warning("Not enough healthy nodes to reach quorum; commit index not updated.")
-            # return
-        
-        # Leader's own log is always replicated locally.
-        leader_index = len(self.log) - 1
-
-        # Select healthy peers (those that have a valid match index, not -1)
-        healthy_match_indices = [self.match_index[peer_id] for peer_id in self.peers 
-                                 if self.match_index.get(peer_id, -1) != -1]
-
-        # Include the leader's own index.
-        effective_indices = [leader_index] + healthy_match_indices
-        effective_indices_sorted = sorted(effective_indices, reverse=True)
-        logger.info(f"Effective match indices: {effective_indices_sorted}")
-
-        # Determine quorum based on the effective number of nodes.
-        quorum_count = (len(effective_indices) // 2) + 1
-        quorum_index = effective_indices_sorted[quorum_count - 1]
-        logger.info(f"Calculated quorum index: {quorum_index}")
-
-        # Update commit index for log entries from the current term, up to the quorum index.
-        for i in range(self.commit_index + 1, quorum_index + 1):
-            if i < len(self.log) and self.log[i][0] == self.current_term:
-                self.commit_index = i
-                self._persist_raft_state()
-                logger.info(f"Commit index updated to {i}")
-                break
-
-
-    """
-    def _update_commit_index(self):
-        if self.state != NodeState.LEADER:
-            return
-
-        # Log the current match_index values
-        logger.info(f"Current match_index dict: {self.match_index}")
-    
-        # Compute a list only for peers that have a match_index entry.
-        indices = [self.match_index[peer_id] for peer_id in self.peers if peer_id in self.match_index]
-        if not indices:
-            logger.info("No match indices available")
-            return
-
-        match_indices = sorted(indices, reverse=True)
-        logger.info(f"Sorted match indices: {match_indices}")
-
-        # Calculate majority using the count of peers in self.peers (or consider filtering unreachable peers)
-        majority_idx = match_indices[len(self.peers) // 2]
-        logger.info(f"Calculated majority index: {majority_idx}")
-
-        # Only update commit index for entries from the current term
-        for i in range(self.commit_index + 1, majority_idx + 1):
-            if i < len(self.log) and self.log[i][0] == self.current_term:
-                self.commit_index = i
-                self._persist_raft_state()
-                logger.info(f"Commit index updated to {i}")
-                break
-
-        
-
-    def _update_commit_index(self):
-        if self.state != NodeState.LEADER:
-            return
-        
-        # Sort matchIndex values in descending order
-        match_indices = sorted([self.match_index[peer_id] for peer_id in self.peers], reverse=True)
-        
-        # Find the highest index that has been replicated to a majority of servers
-        majority_idx = match_indices[len(self.peers) // 2]
-        
-        # Only update commit index for entries from current term
-        for i in range(self.commit_index + 1, majority_idx + 1):
-            if i < len(self.log) and self.log[i][0] == self.current_term:
-                self.commit_index = i
-                self._persist_raft_state()
-                break
-    """
-    
-    def _apply_committed_entries(self):
-        """Apply committed log entries to the state machine."""
-        while self.last_applied < self.commit_index:
-            self.last_applied += 1
-            
-            if self.last_applied < len(self.log):
-                entry = self.log[self.last_applied]
-                self._apply_command(entry[1])
-                
-                logger.debug(f"Applied command at index {self.last_applied}")
-    
-    def _apply_command(self, command: Dict):
-        """Apply a command to the state machine."""
-        cmd_type = command.get("type")
-        
-        if cmd_type == "CREATE_ACCOUNT":
-            username = command["username"]
-            password_hash = command["password_hash"]
-            user_id = command["user_id"]
-            session_token = command["session_token"]
-            
-            # Create user
-            user = User(user_id, username, password_hash)
-            self.user_base.users[user_id] = user
-            self.user_trie.add(username, user)
-
-            self.session_tokens.tokens[user_id] = session_token
-            self._persist_session_token(user_id, session_token)
-    
-            # Persist user
-            self._persist_user(user)
-            
-        elif cmd_type == "DELETE_ACCOUNT":
-            user_id = command["user_id"]
-            
-            if user_id in self.user_base.users:
-                user = self.user_base.users[user_id]
-                
-                # Delete from database
-                conn = sqlite3.connect(self.db_path)
-                c = conn.cursor()
-                c.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
-                c.execute("DELETE FROM session_tokens WHERE user_id = ?", (user_id,))
-                conn.commit()
-                conn.close()
-                
-                # Delete from memory
-                self.user_trie.delete(user.username)
-                del self.user_base.users[user_id]
-                if user_id in self.session_tokens.tokens:
-                    del self.session_tokens.tokens[user_id]
-                
-                # Handle deletion of associated data (messages, etc.)
-                # In a real implementation, you might want to cascade delete messages
-                
-        elif cmd_type == "SEND_MESSAGE":
-            
-            message_id = command["message_id"]
-            sender_id = command["sender_id"]
-            receiver_id = command["receiver_id"]
-            content = command["content"]
-            timestamp = command["timestamp"]
-
-            logger.info(f"(raft_node.py): _apply_command => SEND_MESSAGE from {sender_id} to {receiver_id}")
-            logger.info(f"(raft_node.py): Inserting message id={message_id} into message_base and conversations.")
-           
-            # Create message
-            message = Message(
-                message_id,
-                content,
-                sender_id,
-                receiver_id,
-                False,  # Not read yet
-                timestamp
-            )
-            
-            # Update state
-            self.message_base.messages[message_id] = message
-
-            # TODO: dump content of self.conversations before and after
-            logger.info(f"(raft_node.py) Before append, keys={list(self.conversations.conversations.keys())}")
-            # Update conversation
-            conversation_key = tuple(sorted([sender_id, receiver_id]))
-            self.conversations.conversations[conversation_key].append(message)
-            
-            logger.info(
-                f"(raft_node.py) After append, keys={list(self.conversations.conversations.keys())}. "
-                f"Added conversation_key={conversation_key} message_id={message_id}"
-            )
-            
-            # Update unread messages for receiver
-            if receiver_id in self.user_base.users:
-                self.user_base.users[receiver_id].add_unread_message(message_id)
-                
-                # Update recent conversants
-                if sender_id in self.user_base.users:
-                    self.user_base.users[sender_id].update_recent_conversant(receiver_id)
-                    self.user_base.users[receiver_id].update_recent_conversant(sender_id)
-                    
-                    # Persist updated users
-                    self._persist_user(self.user_base.users[sender_id])
-                    self._persist_user(self.user_base.users[receiver_id])
-            
-            # Persist message
-            self._persist_message(message)
-            
-        elif cmd_type == "MARK_READ":
-            user_id = command["user_id"]
-            message_id = command["message_id"]
-            
-            if message_id in self.message_base.messages:
-                message = self.message_base.messages[message_id]
-                message.has_been_read = True
-                
-                # Update user's unread messages
-                if user_id in self.user_base.users:
-                    self.user_base.users[user_id].mark_message_read(message_id)
-                    self._persist_user(self.user_base.users[user_id])
-                
-                # Persist updated message
-                self._persist_message(message)
-        
-        elif cmd_type == "READ_MESSAGES":
-            user_id = command["user_id"]
-            count = command["count"]
-            
-            if user_id in self.user_base.users:
-                user = self.user_base.users[user_id]
-                marked_count = 0
-                
-                # Mark up to 'count' messages as read
-                for _ in range(count):
-                    if not user.unread_messages:
-                        break
-                    
-                    message_id = user.unread_messages.popleft()
-                    if message_id in self.message_base.messages:
-                        self.message_base.messages[message_id].has_been_read = True
-                        self._persist_message(self.message_base.messages[message_id])
-                        marked_count += 1
-                
-                # Persist the updated user
-                self._persist_user(user)
-                
-                logger.info(f"Marked {marked_count} messages as read for user {user_id}")
-        
-        elif cmd_type == "DELETE_MESSAGE":
-            message_id = command["message_id"]
-            
-            if message_id in self.message_base.messages:
-                message = self.message_base.messages[message_id]
-                
-                # Remove from conversations
-                conversation_key = tuple(sorted([message.sender_id, message.receiver_id]))
-                if conversation_key in self.conversations.conversations:
-                    self.conversations.conversations[conversation_key] = [
-                        msg for msg in self.conversations.conversations[conversation_key]
-                        if msg.uid != message_id
-                    ]
-                
-                # Remove from user's unread messages if applicable
-                if message.receiver_id in self.user_base.users:
-                    user = self.user_base.users[message.receiver_id]
-                    if message_id in user.unread_messages:
-                        user.mark_message_read(message_id)
-                        self._persist_user(user)
-                
-                # Delete from database
-                conn = sqlite3.connect(self.db_path)
-                c = conn.cursor()
-                c.execute("DELETE FROM messages WHERE message_id = ?", (message_id,))
-                conn.commit()
-                conn.close()
-                
-                # Remove from message base
-                del self.message_base.messages[message_id]
-                
-                logger.info(f"Deleted message {message_id}")
-    
-    # RPC handlers
-    
-    def AppendEntries(self, request, context):
-        """Handle AppendEntries RPC."""
-        # Reset heartbeat timer since we heard from the leader
-        self.last_heartbeat = time.time()
-        
-        # If term < currentTerm, reject
-        if request.term < self.current_term:
-            return exp_pb2.AppendEntriesResponse(term=self.current_term, success=False)
-        
-        # If we discover a higher term, update our term
-        if request.term > self.current_term:
-            self.current_term = request.term
-            self.state = NodeState.FOLLOWER
-            self.voted_for = None
-            self._persist_raft_state()
-        
-        # Always accept current leader
-        self.leader_id = request.leader_id
-        
-        # Log consistency check
-        log_ok = (request.prev_log_index == -1 or 
-                  (request.prev_log_index < len(self.log) and 
-                   (request.prev_log_index == -1 or self.log[request.prev_log_index][0] == request.prev_log_term)))
-        
-        if not log_ok:
-            return exp_pb2.AppendEntriesResponse(term=self.current_term, success=False)
-        
-        # Process entries
-        if request.entries:
-            # If existing entries conflict with new ones, delete them
-            if request.prev_log_index + 1 < len(self.log):
-                self.log = self.log[:request.prev_log_index + 1]
-            
-            # Append new entries
-            for entry in request.entries:
-                self.log.append((entry.term, json.loads(entry.command)))
-                self._persist_log_entry(len(self.log) - 1, entry.term, json.loads(entry.command))
-        
-        # Update commit index
-        if request.leader_commit > self.commit_index:
-            self.commit_index = min(request.leader_commit, len(self.log) - 1)
-            self._persist_raft_state()
-        
-        return exp_pb2.AppendEntriesResponse(term=self.current_term, success=True)
-    
-    def RequestVote(self, request, context):
-        """Handle RequestVote RPC."""
-        logger.info(f"Received RequestVote from candidate {request.candidate_id} for term {request.term}")
-        logger.info(f"My current term: {self.current_term}, voted_for: {self.voted_for}")
-        # If term < currentTerm, reject
-        if request.term < self.current_term:
-            logger.info("Candidate's term is lower than my term. Rejecting vote.")
-            return exp_pb2.RequestVoteResponse(term=self.current_term, vote_granted=False)
-        
-        # If term > currentTerm, update term and convert to follower
-        if request.term > self.current_term:
-            logger.info("Candidate's term is higher. Updating my term and resetting vote.")
-            self.current_term = request.term
-            self.state = NodeState.FOLLOWER
-            self.voted_for = None
-            self._persist_raft_state()
-        
-        # Determine if candidate's log is at least as up-to-date as ours
-        last_log_index = len(self.log) - 1
-        last_log_term = self.log[last_log_index][0] if self.log else 0
-        
-        logger.info(f"My last log index: {last_log_index}, last log term: {last_log_term}")
-        logger.info(f"Candidate's last log index: {request.last_log_index}, term: {request.last_log_term}")
-
-        log_ok = (request.last_log_term > last_log_term or 
-                 (request.last_log_term == last_log_term and 
-                  request.last_log_index >= last_log_index))
-        
-        # Grant vote if we haven't voted for someone else and log is ok
-        vote_granted = (self.voted_for is None or self.voted_for == request.candidate_id) and log_ok
-        
-        if vote_granted:
-            logger.info(f"Granting vote to candidate {request.candidate_id}.")
-            self.voted_for = request.candidate_id
-            self.last_heartbeat = time.time()  # Reset timer when granting vote
-            self._persist_raft_state()
-        else:
-            logger.info(f"Not granting vote to candidate {request.candidate_id}. "
-                        f"Already voted for {self.voted_for} or log condition not met.")
-        
-        return exp_pb2.RequestVoteResponse(term=self.current_term, vote_granted=vote_granted)
-    
-    # Client-facing methods
-    
-    def create_account(self, username: str, password_hash: str) -> Tuple[bool, str]:
-        logger.info("(raft_node.py): Attempting to create account for %s", username)
-        """Create a new user account."""
-        # Check if this node is the leader
-        if self.state != NodeState.LEADER:
-            if self.leader_id and self.leader_id in self.peers:
-                logger.info("(raft_node.py): Node is not the leader. Attempting to forward request.")
-                # Forward to leader
-                try:
-                    stub = self.peers[self.leader_id]
-                    response = stub.CreateAccount(
-                        exp_pb2.CreateAccountRequest(username=username, password_hash=password_hash))
-                    return True, response.session_token
-                except Exception as e:
-                    logger.error(f"Failed to forward create_account to leader: {str(e)}")
-                    return False, ""
-            else:
-                # No known leader, inform client
-                return False, ""
-        
-        # Leader processing
-        try:
-            # Check if username exists
-            logger.info(f"(raft_node.py): Checking if username {username} already exists: {self.user_trie.get(username)}")
-            if self.user_trie.get(username):
-                logger.info(f"(raft_node.py): Username {username} already exists")
-                return False, "Username already exists"
-
-            user_id = -1
-            
-            # Generate user ID
-            if self.user_base._deleted_user_ids:
-                user_id = self.user_base._deleted_user_ids.pop()
-            else:
-                user_id = self.user_base._next_user_id
-                self.user_base._next_user_id += 1
-
-            logger.info(f"(raft_node.py): Assigned user ID {user_id} for new account {username}")
-                
-            # Generate session token
-            token = hashlib.sha256(f"{user_id}_{hash(time.time())}".encode()).hexdigest()
-            self.session_tokens.tokens[user_id] = token
-            
-            # Persist session token
-            self._persist_session_token(user_id, token)
-            
-            # Create log entry
-            command = {
-                "type": "CREATE_ACCOUNT",
-                "username": username,
-                "password_hash": password_hash,
-                "user_id": user_id,
-                "session_token": token,
-                "timestamp": int(time.time())
-            }
-
-            logger.info("(raft_node.py): Appending CREATE_ACCOUNT log entry for user %s", username)
-            # Append to log
-            appended_index = len(self.log)
-            self.log.append((self.current_term, command))
-            self._persist_log_entry(len(self.log) - 1, self.current_term, command)
-
-            start_time = time.time()
-            while True:
-                if self.commit_index >= appended_index and self.last_applied >= appended_index:
-                    break
-                if time.time() - start_time > 5.0:
-                    logger.warning("Timed out waiting for CREATE_ACCOUNT entry to commit/apply.")
-                    return (False, "Timeout waiting for commit/apply.")
-                time.sleep(0.01)
-            
-            logger.info("(raft_node.py): Successfully created account. Returning to client.")
-            # Return success and session token
-            return True, token
-            
-        except Exception as e:
-            logger.error(f"Error in create_account: {str(e)}")
-            return False, ""
-    
-    def login(self, username: str, password_hash: str) -> Tuple[bool, int, str, int]:
-        """
-        Log into an existing account.
-        
-        Args:
-            username: Username to log in with
-            password_hash: Hashed password to validate
-            
-        Returns:
-            Tuple[bool, int, str, int]: (success, user_id, session_token, unread_count)
-        """
-        # This can work on any node, doesn't need to be the leader
-        try:
-            # Find the user
-            user = self.user_trie.get(username)
-            if not user:
-                return (False, 0, "", 0)
-                
-            # Check password
-            if user.passwordHash != password_hash:
-                return (False, 0, "", 0)
-                
-            # Generate session token
-            token = hashlib.sha256(f"{user.userID}_{hash(time.time())}".encode()).hexdigest()
-            self.session_tokens.tokens[user.userID] = token
-            
-            # Persist session token
-            self._persist_session_token(user.userID, token)
-            
-            # Return success info
-            return (True, user.userID, token, len(user.unread_messages))
-            
-        except Exception as e:
-            logger.error(f"Error in login: {str(e)}")
-            return (False, 0, "", 0)
-    
-    def validate_session(self, user_id: int, session_token: str) -> bool:
-        """
-        Validate that a session token is valid for a user.
-        
-        Args:
-            user_id: The user ID
-            session_token: The session token to validate
-            
-        Returns:
-            bool: True if the token is valid, False otherwise
-        """
-        logger.info(f"(raft_node.py) validate_session: user_id={user_id}, provided_token={session_token[:10]}...")
-        # Check if the user exists
-        if user_id not in self.user_base.users:
-            logger.info("(raft_node.py) no such user_id in user_base")
-            return False
-            
-        # Check if the user has a session token
-        if user_id not in self.session_tokens.tokens:
-            logger.info("(raft_node.py) no session token for that user_id in session_tokens")
-            return False
-            
-        # Check if the token matches
-        stored = self.session_tokens.tokens[user_id]
-        logger.info(f"(raft_node.py) stored_token={stored[:10]}..., provided={session_token[:10]}...")
-        return self.session_tokens.tokens[user_id] == session_token
-    
-    def list_accounts(self, wildcard: str) -> List[str]:
-        """
-        List accounts matching a wildcard pattern.
-        
-        Args:
-            wildcard: Wildcard pattern to match usernames against
-            
-        Returns:
-            List of matching usernames
-        """
-        # This can work on any node, doesn't need to be the leader
-        try:
-            matching_users = self.user_trie.regex_search(wildcard, return_values=False)
-            return sorted(matching_users)
-        except Exception as e:
-            logger.error(f"Error in list_accounts: {str(e)}")
-            return []
-    
-    def display_conversation(self, user_id: int, conversant_id: int) -> List[Message]:
-        """
-        Retrieve the conversation between two users.
-        
-        Args:
-            user_id: First user ID
-            conversant_id: Second user ID
-            
-        Returns:
-            List of Message objects containing the conversation
-        """
-        # This can work on any node, doesn't need to be the leader
-        logger.info(f"(raft_node.py): display_conversation called on node {self.node_id} between {user_id} and {conversant_id}")
-        try:
-            conversation_key = tuple(sorted([user_id, conversant_id]))
-            if conversation_key in self.conversations.conversations:
-                convo = self.conversations.conversations[conversation_key]
-                logger.info(f"(raft_node.py): Found {len(convo)} messages in conversation {conversation_key}")
-                return self.conversations.conversations[conversation_key]
-            return []
-        except Exception as e:
-            logger.info(f"(raft_node.py): No conversation found for {conversation_key}")
-            return []
-    
-    def send_message(self, sender_id: int, recipient_id: int, content: str) -> bool:
-        """
-        Send a message from one user to another.
-        
-        Args:
-            sender_id: ID of the sender
-            recipient_id: ID of the recipient
-            content: Message content
-            
-        Returns:
-            bool: True if successful, False otherwise
-        """
-        # Check if this node is the leader
-        if self.state != NodeState.LEADER:
-            return False  # Only leader can process this
-        
-        try:
-            # Check if sender and recipient exist
-            if sender_id not in self.user_base.users or recipient_id not in self.user_base.users:
-                return False
-            
-            # Generate message ID
-            if self.message_base._deleted_message_ids:
-                message_id = self.message_base._deleted_message_ids.pop()
-            else:
-                message_id = self.message_base._next_message_id
-                self.message_base._next_message_id += 1
-            
-            # Create log entry
-            command = {
-                "type": "SEND_MESSAGE",
-                "message_id": message_id,
-                "sender_id": sender_id,
-                "receiver_id": recipient_id,
-                "content": content,
-                "timestamp": int(time.time())
-            }
-            
-            # Append to log
-            appended_index = len(self.log)
-            self.log.append((self.current_term, command))
-            self._persist_log_entry(len(self.log) - 1, self.current_term, command)
-
-            start_time = time.time()
-            while True:
-                # 1) 'commit_index' means the leader has determined it's safe to apply
-                # 2) 'last_applied' means we *actually* ran _apply_command on it
-                if self.commit_index >= appended_index and self.last_applied >= appended_index:
-                    break
-
-                # If we wait too long, we might want to time out
-                if time.time() - start_time > 5.0:  # 5 second timeout, for example
-                    logger.warning("Timed out waiting for SEND_MESSAGE entry to commit/apply.")
-                    return False
-
-                time.sleep(0.01)  # Sleep briefly to avoid busy loop
-
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error in send_message: {str(e)}")
-            return False
-    
-    def read_messages(self, user_id: int, count: int) -> bool:
-        """
-        Mark a number of messages as read.
-        
-        Args:
-            user_id: User ID
-            count: Number of messages to mark as read
-            
-        Returns:
-            bool: True if successful, False otherwise
-        """
-        # Check if this node is the leader
-        if self.state != NodeState.LEADER:
-            return False  # Only leader can process this
-        
-        try:
-            # Check if user exists
-            if user_id not in self.user_base.users:
-                return False
-            
-            # Create log entry
-            command = {
-                "type": "READ_MESSAGES",
-                "user_id": user_id,
-                "count": count,
-                "timestamp": int(time.time())
-            }
-            
-            # Append to log
-            self.log.append((self.current_term, command))
-            self._persist_log_entry(len(self.log) - 1, self.current_term, command)
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error in read_messages: {str(e)}")
-            return False
-    
-    def mark_message_as_read(self, user_id: int, message_id: int) -> bool:
-        """
-        Mark a specific message as read.
-        
-        Args:
-            user_id: User ID
-            message_id: Message ID
-            
-        Returns:
-            bool: True if successful, False otherwise
-        """
-        # Check if this node is the leader
-        if self.state != NodeState.LEADER:
-            return False  # Only leader can process this
-        
-        try:
-            # Check if user and message exist
-            if user_id not in self.user_base.users or message_id not in self.message_base.messages:
-                return False
-            
-            # Create log entry
-            command = {
-                "type": "MARK_READ",
-                "user_id": user_id,
-                "message_id": message_id,
-                "timestamp": int(time.time())
-            }
-            
-            # Append to log
-            self.log.append((self.current_term, command))
-            self._persist_log_entry(len(self.log) - 1, self.current_term, command)
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error in mark_message_as_read: {str(e)}")
-            return False
-    
-    def delete_message(self, message_id: int) -> bool:
-        """
-        Delete a message.
-        
-        Args:
-            message_id: Message ID to delete
-            
-        Returns:
-            bool: True if successful, False otherwise
-        """
-        # Check if this node is the leader
-        if self.state != NodeState.LEADER:
-            return False  # Only leader can process this
-        
-        try:
-            # Check if message exists
-            if message_id not in self.message_base.messages:
-                return False
-            
-            # Create log entry
-            command = {
-                "type": "DELETE_MESSAGE",
-                "message_id": message_id,
-                "timestamp": int(time.time())
-            }
-            
-            # Append to log
-            self.log.append((self.current_term, command))
-            self._persist_log_entry(len(self.log) - 1, self.current_term, command)
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error in delete_message: {str(e)}")
-            return False
-    
-    def delete_account(self, user_id: int) -> bool:
-        """
-        Delete a user account.
-        
-        Args:
-            user_id: User ID to delete
-            
-        Returns:
-            bool: True if successful, False otherwise
-        """
-        # Check if this node is the leader
-        if self.state != NodeState.LEADER:
-            return False  # Only leader can process this
-        
-        try:
-            # Check if user exists
-            if user_id not in self.user_base.users:
-                return False
-            
-            # Create log entry
-            command = {
-                "type": "DELETE_ACCOUNT",
-                "user_id": user_id,
-                "timestamp": int(time.time())
-            }
-            
-            # Append to log
-            self.log.append((self.current_term, command))
-            self._persist_log_entry(len(self.log) - 1, self.current_term, command)
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error in delete_account: {str(e)}")
-            return False
-    
-    def get_unread_messages(self, user_id: int) -> List[Tuple[int, int, int]]:
-        """
-        Get list of unread messages for a user.
-        
-        Args:
-            user_id: User ID
-            
-        Returns:
-            List of tuples (message_id, sender_id, receiver_id)
-        """
-        # This can work on any node, doesn't need to be the leader
-        try:
-            if user_id not in self.user_base.users:
-                return []
-                
-            user = self.user_base.users[user_id]
-            result = []
-            
-            for msg_id in user.unread_messages:
-                if msg_id in self.message_base.messages:
-                    msg = self.message_base.messages[msg_id]
-                    result.append((msg.uid, msg.sender_id, msg.receiver_id))
-                    
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error in get_unread_messages: {str(e)}")
-            return []
-    
-    def get_message_info(self, user_id: int, message_id: int) -> Tuple[bool, int, str, int]:
-        """
-        Get information about a specific message.
-        
-        Args:
-            user_id: User ID requesting the info
-            message_id: Message ID
-            
-        Returns:
-            Tuple[bool, int, str, int]: (read_flag, sender_id, content, timestamp)
-        """
-        # This can work on any node, doesn't need to be the leader
-        try:
-            # Check if message exists
-            if message_id not in self.message_base.messages:
-                return (False, 0, "", 0)
-                
-            # Get message
-            msg = self.message_base.messages[message_id]
-            
-            # Check if user is sender or receiver
-            if msg.sender_id != user_id and msg.receiver_id != user_id:
-                return (False, 0, "", 0)  # User not authorized to view this message
-                
-            return (msg.has_been_read, msg.sender_id, msg.contents, msg.timestamp)
-            
-        except Exception as e:
-            logger.error(f"Error in get_message_info: {str(e)}")
-            return (False, 0, "", 0)
-    
-    def get_username_by_id(self, user_id: int) -> str:
-        """
-        Get username from user ID.
-        
-        Args:
-            user_id: User ID
-            
-        Returns:
-            str: Username, or empty string if not found
-        """
-        # This can work on any node, doesn't need to be the leader
-        try:
-            if user_id in self.user_base.users:
-                return self.user_base.users[user_id].username
-            return ""
-        except Exception as e:
-            logger.error(f"Error in get_username_by_id: {str(e)}")
-            return ""
-    
-    def get_user_by_username(self, username: str) -> Tuple[bool, Optional[int]]:
-        """
-        Get user ID from username.
-        
-        Args:
-            username: Username to look up
-            
-        Returns:
-            Tuple[bool, Optional[int]]: (found, user_id)
-        """
-        # This can work on any node, doesn't need to be the leader
-        logger.info(f"(raft_node.py): get_user_by_username called on node {self.node_id} for {username}")
-        try:
-            user = self.user_trie.get(username)
-            if user:
-                logger.info(f"(raft_node.py): Found user ID {user.userID} for {username}")
-                return (True, user.userID)
-            return (False, None)
-        except Exception as e:
-            logger.info(f"(raft_node.py): No user found for {username}, error: {str(e)}")
-            return (False, None)
-    
-    def stop(self):
-        """Stop the node gracefully."""
-        self.running = False
-        if self.raft_thread.is_alive():
-            self.raft_thread.join(timeout=1)
-        
-        logger.info(f"Stopping Raft node {self.node_id}")
->>>>>>> b431b514291211d07da690767468c2f08bae4b61
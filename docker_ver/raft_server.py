@@ -4,13 +4,17 @@ import os
 import time
 import json
 import grpc
-from concurrent import futures
+import asyncio
 import logging
 import argparse
 import threading
+import itertools
 
 # Import our Raft implementation
 from raft_node import RaftNode, NodeState
+from raft_groups import group_for_user, group_for_username, group_for_conversation, group_for_message
+from rpc_metrics import InstrumentedThreadPool, ServiceLimiter, RETRY_AFTER_METADATA_KEY
+from raft_steps import Steps, Wait, run_steps, run_steps_async
 
 # Import the gRPC generated modules
 import exp_pb2
@@ -38,54 +42,231 @@ class RaftService(object):
         """Register the servicer for RaftService."""
         exp_pb2_grpc.add_RaftServiceServicer_to_server(servicer, server)
 
+class RaftGroupRouter(exp_pb2_grpc.RaftServiceServicer):
+    """
+    Dispatches Raft RPCs to this process's node of the Raft group they name.
+    """
+    
+    def __init__(self, raft_nodes):
+        self.raft_nodes = raft_nodes
+    
+    def _node(self, group_id, context):
+        if group_id >= len(self.raft_nodes):
+            context.abort(grpc.StatusCode.NOT_FOUND, f"No Raft group {group_id} on this node")
+        return self.raft_nodes[group_id]
+    
+    def RequestVote(self, request, context):
+        return self._node(request.group_id, context).RequestVote(request, context)
+    
+    def AppendEntries(self, request, context):
+        return self._node(request.group_id, context).AppendEntries(request, context)
+    
+    def ReadIndex(self, request, context):
+        return self._node(request.group_id, context).ReadIndex(request, context)
+    
+    def Propose(self, request, context):
+        return self._node(request.group_id, context).Propose(request, context)
+    
+    def InstallSnapshot(self, request_iterator, context):
+        # Every chunk carries the group, so the first one decides where the stream goes
+        first = next(request_iterator, None)
+        if first is None:
+            return exp_pb2.InstallSnapshotResponse(success=False)
+        node = self._node(first.group_id, context)
+        return node.InstallSnapshot(itertools.chain([first], request_iterator), context)
+
 class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
     """
-    gRPC service implementation that delegates operations to a Raft node.
+    gRPC service implementation that delegates operations to Raft nodes.
+    
+    raft_nodes holds this process's node of each Raft group. A request is
+    served by the group that owns the user, username, conversation or message
+    it concerns (see raft_groups.py); with one group, that is always the same
+    node.
     """
     
-    def __init__(self, raft_node):
-        self.raft_node = raft_node
+    def __init__(self, raft_nodes):
+        self.raft_nodes = raft_nodes
+        self.num_groups = len(raft_nodes)
+        self.delivery_attempts = 5  # Tries at handing a message copy to another group's leader
+    
+    def _user_node(self, user_id):
+        return self.raft_nodes[group_for_user(user_id, self.num_groups)]
+    
+    def _username_node(self, username):
+        return self.raft_nodes[group_for_username(username, self.num_groups)]
+    
+    def _conversation_node(self, user_a, user_b):
+        return self.raft_nodes[group_for_conversation(user_a, user_b, self.num_groups)]
+    
+    def _message_node(self, message_id):
+        return self.raft_nodes[group_for_message(message_id, self.num_groups)]
+    
+    def _require_leader(self, raft_node, context) -> bool:
+        """
+        Check that this process leads raft_node's group. Otherwise sets
+        FAILED_PRECONDITION with the group leader's address, if known, so the
+        client redirects there.
+        """
+        if raft_node.state == NodeState.LEADER:
+            return True
+        if raft_node.leader_id and raft_node.leader_id in raft_node.cluster_config:
+            context.set_details(f"Not the leader. Try {raft_node.cluster_config[raft_node.leader_id]}")
+        else:
+            context.set_details("No leader available")
+        context.set_code(grpc.StatusCode.FAILED_PRECONDITION)
+        return False
+    
+    def _admit(self, raft_node, context) -> bool:
+        """
+        Check that raft_node's group can take another write. Otherwise sets
+        RESOURCE_EXHAUSTED, with a hint of how long to wait in the trailing
+        metadata, so clients back off instead of piling on a lagging leader.
+        """
+        retry_after = raft_node.admission_retry_after()
+        if not retry_after:
+            return True
+        retry_after_ms = int(retry_after * 1000)
+        context.set_trailing_metadata(((RETRY_AFTER_METADATA_KEY, str(retry_after_ms)),))
+        context.set_details(f"Too many uncommitted writes. Retry after {retry_after_ms}ms")
+        context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+        return False
+    
+    def _ensure_read_consistency(self, raft_node, request, context) -> Steps:
+        """
+        Make a read linearizable via ReadIndex unless the request set allow_stale.
+        Sets ABORTED on the context and returns False if that isn't possible; the
+        node itself is healthy, so clients retry rather than drop it.
+        """
+        if request.allow_stale or (yield Wait(raft_node, "wait_for_linearizable_read")):
+            return True
+        context.set_details("Could not confirm a read index with the leader")
+        context.set_code(grpc.StatusCode.ABORTED)
+        return False
+    
+    def _delivery_batches(self, home_node, commands):
+        """Group message commands by the groups of their parties other than the home group."""
+        batches = {}
+        for command in commands:
+            for group_id in {group_for_user(command["sender_id"], self.num_groups),
+                             group_for_user(command["receiver_id"], self.num_groups)} - {home_node.group_id}:
+                batches.setdefault(group_id, []).append(command)
+        return batches
+    
+    def _deliver(self, home_node, commands) -> Steps:
+        """
+        Apply commands for messages to the groups of their parties other than
+        the messages' home group, retrying while a group elects a leader.
+        
+        This is the second half of a cross-group send or delete: the home group
+        has already applied the commands, and each party's own group applies
+        copies carrying the same message IDs so that its unread list, events and
+        message lookups stay local. Each group gets its share in one proposal.
+        Applying a copy is idempotent, so retrying after an attempt that timed
+        out but did commit is harmless.
+        """
+        for group_id, group_commands in self._delivery_batches(home_node, commands).items():
+            for attempt in range(self.delivery_attempts):
+                if (yield Wait(self.raft_nodes[group_id], "propose_many", group_commands)):
+                    break
+                yield Wait(self, "_back_off", attempt)
+            else:
+                message_ids = [command["message_id"] for command in group_commands]
+                logger.error(f"Could not apply {group_commands[0]['type']} for messages {message_ids} to group {group_id}")
+                return False
+        return True
+    
+    def _back_off(self, attempt):
+        """Wait before another delivery attempt."""
+        time.sleep(0.1 * (2 ** attempt))
+    
+    async def _back_off_async(self, attempt):
+        """Awaitable _back_off."""
+        await asyncio.sleep(0.1 * (2 ** attempt))
+    
+    def _send_copy(self, home_node, message_id):
+        """The SEND_MESSAGE command that delivers a stored message to another group, or None if it's gone."""
+        message = home_node.message_base.messages.get(message_id)
+        if message is None:
+            return None
+        return {
+            "type": "SEND_MESSAGE",
+            "message_id": message_id,
+            "sender_id": message.sender_id,
+            "receiver_id": message.receiver_id,
+            "content": message.contents,
+            "timestamp": message.timestamp
+        }
+    
+    def _plan_send_messages(self, request, context):
+        """
+        Validate a SendMessages request and split it by conversation home group.
+        
+        Returns a dict mapping each home group to the positions of its messages,
+        or None after setting an error on the context. Every group must be led
+        from this process and have room for the writes before any is committed.
+        """
+        sender_id = request.sender_user_id
+        if not self._user_node(sender_id).validate_session(sender_id, request.session_token.hex()):
+            context.set_details("Invalid session token")
+            context.set_code(grpc.StatusCode.UNAUTHENTICATED)
+            return None
+        
+        batches = {}
+        for position, message in enumerate(request.messages):
+            group_id = group_for_conversation(sender_id, message.recipient_user_id, self.num_groups)
+            batches.setdefault(group_id, []).append(position)
+        for group_id in batches:
+            raft_node = self.raft_nodes[group_id]
+            if not self._require_leader(raft_node, context) or not self._admit(raft_node, context):
+                return None
+        return batches
 
     def LeaderPing(self, request, context):
         """
-        A simple RPC that only succeeds if this node is currently the Raft leader.
-        Otherwise, return an error with redirect info.
+        A simple RPC that only succeeds if this node is currently the Raft leader
+        of the requested group. Otherwise, return an error with redirect info.
         """
-        if self.raft_node.state != NodeState.LEADER:
-            # If we know the leader's address, suggest it for redirection
-            if self.raft_node.leader_id and self.raft_node.leader_id in self.raft_node.cluster_config:
-                leader_addr = self.raft_node.cluster_config[self.raft_node.leader_id]
-                context.set_details(f"Not the leader. Try {leader_addr}")
-            else:
-                context.set_details("No leader available")
-            context.set_code(grpc.StatusCode.FAILED_PRECONDITION)
+        if request.group_id >= self.num_groups:
+            context.set_details(f"No Raft group {request.group_id}")
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            return exp_pb2.LeaderPingResponse()
+        
+        if not self._require_leader(self.raft_nodes[request.group_id], context):
             return exp_pb2.LeaderPingResponse()
     
-        # If we're leader, return success (an empty response)
-        return exp_pb2.LeaderPingResponse()
+        # If we're leader, report how requests are spread across groups
+        return exp_pb2.LeaderPingResponse(group_count=self.num_groups)
 
     
     def CreateAccount(self, request, context):
         """
         Create a new user account.
         
-        This operation is forwarded to the Raft leader, which will replicate it to all nodes.
+        This operation is forwarded to the leader of the username's Raft group,
+        which will replicate it to all nodes.
         """
+        return run_steps(self._create_account_steps(request, context))
+    
+    def _create_account_steps(self, request, context) -> Steps:
         username = request.username
         password_hash = request.password_hash.hex()
+        raft_node = self._username_node(username)
         
-        logger.info(f"(raft_server.py): Received CreateAccount request for user: {username}, at node: {self.raft_node.node_id}")
+        logger.info(f"(raft_server.py): Received CreateAccount request for user: {username}, at node: {raft_node.node_id}")
 
-        success, token = self.raft_node.create_account(username, password_hash)
+        if not self._admit(raft_node, context):
+            return exp_pb2.CreateAccountResponse()
         
+        success, token = yield Wait(raft_node, "create_account", username, password_hash)
         if not success:
 
             logger.info(f"(raft_server.py): create_account failed: {token}")
             
             # If we're not the leader, inform the client
-            if self.raft_node.state != NodeState.LEADER and self.raft_node.leader_id:
+            if raft_node.state != NodeState.LEADER and raft_node.leader_id:
                 # Return the leader's address so the client can redirect
-                leader_addr = self.raft_node.cluster_config.get(self.raft_node.leader_id, "")
+                leader_addr = raft_node.cluster_config.get(raft_node.leader_id, "")
                 context.set_details(f"Not the leader. Try {leader_addr}")
                 context.set_code(grpc.StatusCode.FAILED_PRECONDITION)
                 return exp_pb2.CreateAccountResponse()
@@ -100,18 +281,24 @@ class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
     
     def Login(self, request, context):
         """Handle login requests."""
+        return run_steps(self._login_steps(request, context))
+    
+    def _login_steps(self, request, context) -> Steps:
         username = request.username
         password_hash = request.password_hash.hex()
+        raft_node = self._username_node(username)
         
         logger.info(f"Received Login request for user: {username}")
         
         # Try to find the user
-        success, user_id, token, unread_count = self.raft_node.login(username, password_hash)
+        if not self._admit(raft_node, context):
+            return exp_pb2.LoginResponse()
         
+        success, user_id, token, unread_count = yield Wait(raft_node, "login", username, password_hash)
         if not success:
             # If we're not the leader, inform the client
-            if self.raft_node.state != NodeState.LEADER and self.raft_node.leader_id:
-                leader_addr = self.raft_node.cluster_config.get(self.raft_node.leader_id, "")
+            if raft_node.state != NodeState.LEADER and raft_node.leader_id:
+                leader_addr = raft_node.cluster_config.get(raft_node.leader_id, "")
                 context.set_details(f"Not the leader. Try {leader_addr}")
                 context.set_code(grpc.StatusCode.FAILED_PRECONDITION)
                 return exp_pb2.LoginResponse()
@@ -132,7 +319,7 @@ class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
         )
     
     def ListAccounts(self, request, context):
-        """List accounts matching a wildcard pattern."""
+        """List accounts matching a wildcard pattern, across every Raft group."""
         user_id = request.user_id
         session_token = request.session_token.hex()
         wildcard = request.wildcard
@@ -140,21 +327,34 @@ class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
         logger.info(f"Received ListAccounts request with wildcard: {wildcard}")
         
         # Validate session token
-        if not self.raft_node.validate_session(user_id, session_token):
+        if not self._user_node(user_id).validate_session(user_id, session_token):
             context.set_details("Invalid session token")
             context.set_code(grpc.StatusCode.UNAUTHENTICATED)
             return exp_pb2.ListAccountsResponse()
         
-        # Get matching usernames
-        usernames = self.raft_node.list_accounts(wildcard)
+        # Get matching usernames; each username lives in exactly one group, so
+        # one more than a page from each shows whether another page follows
+        limit = request.limit or None
+        after = request.after_username or None
+        group_limit = limit + 1 if limit is not None else None
+        users = sorted((user for raft_node in self.raft_nodes
+                        for user in raft_node.list_accounts(wildcard, group_limit, after)),
+                       key=lambda user: user.username)
+        has_more = limit is not None and len(users) > limit
+        users = users[:limit]
         
         return exp_pb2.ListAccountsResponse(
-            account_count=len(usernames),
-            usernames=usernames
+            account_count=len(users),
+            usernames=[user.username for user in users],
+            user_ids=[user.userID for user in users],
+            has_more=has_more
         )
     
     def DisplayConversation(self, request, context):
-        """Display conversation between two users."""
+        """Display conversation between two users, or one page of it."""
+        return run_steps(self._display_conversation_steps(request, context))
+    
+    def _display_conversation_steps(self, request, context) -> Steps:
         user_id = request.user_id
         session_token = request.session_token.hex()
         conversant_id = request.conversant_id
@@ -162,13 +362,26 @@ class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
         logger.info(f"Received DisplayConversation request between {user_id} and {conversant_id}")
         
         # Validate session token
-        if not self.raft_node.validate_session(user_id, session_token):
+        if not self._user_node(user_id).validate_session(user_id, session_token):
             context.set_details("Invalid session token")
             context.set_code(grpc.StatusCode.UNAUTHENTICATED)
             return exp_pb2.DisplayConversationResponse()
         
-        # Get conversation messages
-        messages = self.raft_node.display_conversation(user_id, conversant_id)
+        # The conversation's home group holds all of it, in message ID order
+        raft_node = self._conversation_node(user_id, conversant_id)
+        if not (yield from self._ensure_read_consistency(raft_node, request, context)):
+            return exp_pb2.DisplayConversationResponse()
+        
+        before_id = request.before_message_id if request.HasField("before_message_id") else None
+        after_id = request.after_message_id if request.HasField("after_message_id") else None
+        limit = request.limit or None
+        
+        # Get conversation messages, plus one beyond the page to tell whether there are more
+        messages = raft_node.display_conversation(user_id, conversant_id, before_id, after_id,
+                                                  limit + 1 if limit else None)
+        has_more = limit is not None and len(messages) > limit
+        if has_more:
+            messages = messages[:limit] if after_id is not None else messages[-limit:]
         
         # Convert to ConversationMessage protos
         conv_msgs = []
@@ -182,11 +395,20 @@ class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
         
         return exp_pb2.DisplayConversationResponse(
             message_count=len(conv_msgs),
-            messages=conv_msgs
+            messages=conv_msgs,
+            has_more=has_more
         )
     
     def SendMessage(self, request, context):
-        """Send a message from one user to another."""
+        """
+        Send a message from one user to another.
+        
+        The message is committed to the conversation's home group, which assigns
+        its ID, and then delivered to the other party's group if that differs.
+        """
+        return run_steps(self._send_message_steps(request, context))
+    
+    def _send_message_steps(self, request, context) -> Steps:
         sender_id = request.sender_user_id
         session_token = request.session_token.hex()
         recipient_id = request.recipient_user_id
@@ -195,73 +417,105 @@ class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
         logger.info(f"Received SendMessage from {sender_id} to {recipient_id}")
         
         # Validate session token
-        if not self.raft_node.validate_session(sender_id, session_token):
+        if not self._user_node(sender_id).validate_session(sender_id, session_token):
             context.set_details("Invalid session token")
             context.set_code(grpc.StatusCode.UNAUTHENTICATED)
             return exp_pb2.SendMessageResponse()
         
-        # Forward to the leader if we're not the leader
-        if self.raft_node.state != NodeState.LEADER:
-            if self.raft_node.leader_id and self.raft_node.leader_id in self.raft_node.peers:
-                try:
-                    stub = self.raft_node.peers[self.raft_node.leader_id]
-                    return stub.SendMessage(request)
-                except Exception as e:
-                    logger.error(f"Failed to forward SendMessage to leader: {str(e)}")
-                    context.set_details("Failed to forward to leader")
-                    context.set_code(grpc.StatusCode.UNAVAILABLE)
-                    return exp_pb2.SendMessageResponse()
-            else:
-                context.set_details("No leader available")
-                context.set_code(grpc.StatusCode.UNAVAILABLE)
-                return exp_pb2.SendMessageResponse()
+        # Only the home group's leader can process this
+        raft_node = self._conversation_node(sender_id, recipient_id)
+        if not self._require_leader(raft_node, context):
+            return exp_pb2.SendMessageResponse()
+        if not self._admit(raft_node, context):
+            return exp_pb2.SendMessageResponse()
         
-        # If we are the leader, process the message
-        success = self.raft_node.send_message(sender_id, recipient_id, content)
+        message_id = yield Wait(raft_node, "send_message", sender_id, recipient_id, content)
         
-        if not success:
+        if message_id is None:
             context.set_details("Failed to send message")
             context.set_code(grpc.StatusCode.INTERNAL)
+            return exp_pb2.SendMessageResponse()
+        
+        command = self._send_copy(raft_node, message_id)
+        if command is not None and not (yield from self._deliver(raft_node, [command])):
+            context.set_details("Message stored but not delivered to the recipient's group")
+            context.set_code(grpc.StatusCode.INTERNAL)
         
         return exp_pb2.SendMessageResponse()
     
+    def SendMessages(self, request, context):
+        """
+        Send several messages from one user, checking the session once.
+        
+        Each conversation home group commits its share of the messages in one
+        round of consecutive log entries, and copies for recipients in other
+        groups are delivered with one proposal per group.
+        """
+        return run_steps(self._send_messages_steps(request, context))
+    
+    def _send_messages_steps(self, request, context) -> Steps:
+        sender_id = request.sender_user_id
+        
+        logger.info(f"Received SendMessages from {sender_id} with {len(request.messages)} messages")
+        
+        batches = self._plan_send_messages(request, context)
+        if batches is None:
+            return exp_pb2.SendMessagesResponse()
+        
+        message_ids = [0] * len(request.messages)
+        for group_id, positions in batches.items():
+            raft_node = self.raft_nodes[group_id]
+            sent_ids = yield Wait(raft_node, "send_messages", sender_id,
+                                  [(request.messages[position].recipient_user_id,
+                                    request.messages[position].message_content)
+                                   for position in positions])
+            if sent_ids is None:
+                context.set_details("Failed to send messages")
+                context.set_code(grpc.StatusCode.INTERNAL)
+                return exp_pb2.SendMessagesResponse(message_ids=message_ids)
+            for position, message_id in zip(positions, sent_ids):
+                message_ids[position] = message_id
+            
+            commands = [self._send_copy(raft_node, message_id) for message_id in sent_ids]
+            if not (yield from self._deliver(raft_node, [command for command in commands if command is not None])):
+                context.set_details("Messages stored but not delivered to every recipient's group")
+                context.set_code(grpc.StatusCode.INTERNAL)
+        
+        return exp_pb2.SendMessagesResponse(message_ids=message_ids)
+    
     def ReadMessages(self, request, context):
         """Mark messages as read."""
+        return run_steps(self._read_messages_steps(request, context))
+    
+    def _read_messages_steps(self, request, context) -> Steps:
         user_id = request.user_id
         session_token = request.session_token.hex()
         count = request.number_of_messages_req
+        raft_node = self._user_node(user_id)
         
         logger.info(f"Received ReadMessages request for user {user_id}, count {count}")
         
         # Validate session token
-        if not self.raft_node.validate_session(user_id, session_token):
+        if not raft_node.validate_session(user_id, session_token):
             context.set_details("Invalid session token")
             context.set_code(grpc.StatusCode.UNAUTHENTICATED)
             return exp_pb2.ReadMessagesResponse()
         
-        # Forward to leader if needed
-        if self.raft_node.state != NodeState.LEADER:
-            if self.raft_node.leader_id and self.raft_node.leader_id in self.raft_node.peers:
-                try:
-                    stub = self.raft_node.peers[self.raft_node.leader_id]
-                    return stub.ReadMessages(request)
-                except Exception as e:
-                    logger.error(f"Failed to forward ReadMessages to leader: {str(e)}")
-                    context.set_details("Failed to forward to leader")
-                    context.set_code(grpc.StatusCode.UNAVAILABLE)
-                    return exp_pb2.ReadMessagesResponse()
-            else:
-                context.set_details("No leader available")
-                context.set_code(grpc.StatusCode.UNAVAILABLE)
-                return exp_pb2.ReadMessagesResponse()
+        if not self._require_leader(raft_node, context):
+            return exp_pb2.ReadMessagesResponse()
+        if not self._admit(raft_node, context):
+            return exp_pb2.ReadMessagesResponse()
         
         # Process on leader
-        self.raft_node.read_messages(user_id, count)
+        yield Wait(raft_node, "read_messages", user_id, count)
         
         return exp_pb2.ReadMessagesResponse()
     
     def DeleteMessage(self, request, context):
-        """Delete a message."""
+        """Delete a message from its home group, then the other party's copy."""
+        return run_steps(self._delete_message_steps(request, context))
+    
+    def _delete_message_steps(self, request, context) -> Steps:
         user_id = request.user_id
         message_uid = request.message_uid
         session_token = request.session_token.hex()
@@ -269,29 +523,29 @@ class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
         logger.info(f"Received DeleteMessage request for message {message_uid}")
         
         # Validate session token
-        if not self.raft_node.validate_session(user_id, session_token):
+        if not self._user_node(user_id).validate_session(user_id, session_token):
             context.set_details("Invalid session token")
             context.set_code(grpc.StatusCode.UNAUTHENTICATED)
             return exp_pb2.DeleteMessageResponse()
         
-        # Forward to leader if needed
-        if self.raft_node.state != NodeState.LEADER:
-            if self.raft_node.leader_id and self.raft_node.leader_id in self.raft_node.peers:
-                try:
-                    stub = self.raft_node.peers[self.raft_node.leader_id]
-                    return stub.DeleteMessage(request)
-                except Exception as e:
-                    logger.error(f"Failed to forward DeleteMessage to leader: {str(e)}")
-                    context.set_details("Failed to forward to leader")
-                    context.set_code(grpc.StatusCode.UNAVAILABLE)
-                    return exp_pb2.DeleteMessageResponse()
-            else:
-                context.set_details("No leader available")
-                context.set_code(grpc.StatusCode.UNAVAILABLE)
-                return exp_pb2.DeleteMessageResponse()
+        raft_node = self._message_node(message_uid)
+        if not self._require_leader(raft_node, context):
+            return exp_pb2.DeleteMessageResponse()
+        if not self._admit(raft_node, context):
+            return exp_pb2.DeleteMessageResponse()
         
         # Process on leader
-        success = self.raft_node.delete_message(message_uid)
+        message = raft_node.message_base.messages.get(message_uid)
+        success = yield Wait(raft_node, "delete_message", message_uid)
+        
+        if success and message is not None:
+            success = yield from self._deliver(raft_node, [{
+                "type": "DELETE_MESSAGE",
+                "message_id": message_uid,
+                "sender_id": message.sender_id,
+                "receiver_id": message.receiver_id,
+                "timestamp": int(time.time())
+            }])
         
         if not success:
             context.set_details("Failed to delete message")
@@ -301,35 +555,28 @@ class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
     
     def DeleteAccount(self, request, context):
         """Delete a user account."""
+        return run_steps(self._delete_account_steps(request, context))
+    
+    def _delete_account_steps(self, request, context) -> Steps:
         user_id = request.user_id
         session_token = request.session_token.hex()
+        raft_node = self._user_node(user_id)
         
         logger.info(f"Received DeleteAccount request for user {user_id}")
         
         # Validate session token
-        if not self.raft_node.validate_session(user_id, session_token):
+        if not raft_node.validate_session(user_id, session_token):
             context.set_details("Invalid session token")
             context.set_code(grpc.StatusCode.UNAUTHENTICATED)
             return exp_pb2.DeleteAccountResponse()
         
-        # Forward to leader if needed
-        if self.raft_node.state != NodeState.LEADER:
-            if self.raft_node.leader_id and self.raft_node.leader_id in self.raft_node.peers:
-                try:
-                    stub = self.raft_node.peers[self.raft_node.leader_id]
-                    return stub.DeleteAccount(request)
-                except Exception as e:
-                    logger.error(f"Failed to forward DeleteAccount to leader: {str(e)}")
-                    context.set_details("Failed to forward to leader")
-                    context.set_code(grpc.StatusCode.UNAVAILABLE)
-                    return exp_pb2.DeleteAccountResponse()
-            else:
-                context.set_details("No leader available")
-                context.set_code(grpc.StatusCode.UNAVAILABLE)
-                return exp_pb2.DeleteAccountResponse()
+        if not self._require_leader(raft_node, context):
+            return exp_pb2.DeleteAccountResponse()
+        if not self._admit(raft_node, context):
+            return exp_pb2.DeleteAccountResponse()
         
         # Process on leader
-        success = self.raft_node.delete_account(user_id)
+        success = yield Wait(raft_node, "delete_account", user_id)
         
         if not success:
             context.set_details("Failed to delete account")
@@ -339,19 +586,26 @@ class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
     
     def GetUnreadMessages(self, request, context):
         """Get unread messages for a user."""
+        return run_steps(self._get_unread_messages_steps(request, context))
+    
+    def _get_unread_messages_steps(self, request, context) -> Steps:
         user_id = request.user_id
         session_token = request.session_token.hex()
+        raft_node = self._user_node(user_id)
         
         logger.info(f"Received GetUnreadMessages request for user {user_id}")
         
         # Validate session token
-        if not self.raft_node.validate_session(user_id, session_token):
+        if not raft_node.validate_session(user_id, session_token):
             context.set_details("Invalid session token")
             context.set_code(grpc.StatusCode.UNAUTHENTICATED)
             return exp_pb2.GetUnreadMessagesResponse()
         
+        if not (yield from self._ensure_read_consistency(raft_node, request, context)):
+            return exp_pb2.GetUnreadMessagesResponse()
+        
         # Get unread messages (can work on any node, not just leader)
-        unread_msgs = self.raft_node.get_unread_messages(user_id)
+        unread_msgs = raft_node.get_unread_messages(user_id)
         
         # Convert to response format
         result_msgs = []
@@ -369,20 +623,28 @@ class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
     
     def GetMessageInformation(self, request, context):
         """Get information about a specific message."""
+        return run_steps(self._get_message_information_steps(request, context))
+    
+    def _get_message_information_steps(self, request, context) -> Steps:
         user_id = request.user_id
         message_uid = request.message_uid
         session_token = request.session_token.hex()
+        # The user's own group holds every message they sent or received
+        raft_node = self._user_node(user_id)
         
         logger.info(f"Received GetMessageInformation request for message {message_uid}")
         
         # Validate session token
-        if not self.raft_node.validate_session(user_id, session_token):
+        if not raft_node.validate_session(user_id, session_token):
             context.set_details("Invalid session token")
             context.set_code(grpc.StatusCode.UNAUTHENTICATED)
             return exp_pb2.GetMessageInformationResponse()
         
+        if not (yield from self._ensure_read_consistency(raft_node, request, context)):
+            return exp_pb2.GetMessageInformationResponse()
+        
         # Get message info (can work on any node)
-        read_flag, sender_id, content, timestamp = self.raft_node.get_message_info(user_id, message_uid)
+        read_flag, sender_id, content, timestamp = raft_node.get_message_info(user_id, message_uid)
         
         content_bytes = content.encode() if content else b''
         
@@ -400,7 +662,7 @@ class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
         logger.info(f"Received GetUsernameByID request for user {user_id}")
         
         # This can be processed on any node
-        username = self.raft_node.get_username_by_id(user_id)
+        username = self._user_node(user_id).get_username_by_id(user_id)
         
         return exp_pb2.GetUsernameByIDResponse(
             username=username
@@ -408,36 +670,29 @@ class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
     
     def MarkMessageAsRead(self, request, context):
         """Mark a message as read."""
+        return run_steps(self._mark_message_as_read_steps(request, context))
+    
+    def _mark_message_as_read_steps(self, request, context) -> Steps:
         user_id = request.user_id
         message_uid = request.message_uid
         session_token = request.session_token.hex()
+        raft_node = self._user_node(user_id)
         
         logger.info(f"Received MarkMessageAsRead request for message {message_uid}")
         
         # Validate session token
-        if not self.raft_node.validate_session(user_id, session_token):
+        if not raft_node.validate_session(user_id, session_token):
             context.set_details("Invalid session token")
             context.set_code(grpc.StatusCode.UNAUTHENTICATED)
             return exp_pb2.MarkMessageAsReadResponse()
         
-        # Forward to leader if needed
-        if self.raft_node.state != NodeState.LEADER:
-            if self.raft_node.leader_id and self.raft_node.leader_id in self.raft_node.peers:
-                try:
-                    stub = self.raft_node.peers[self.raft_node.leader_id]
-                    return stub.MarkMessageAsRead(request)
-                except Exception as e:
-                    logger.error(f"Failed to forward MarkMessageAsRead to leader: {str(e)}")
-                    context.set_details("Failed to forward to leader")
-                    context.set_code(grpc.StatusCode.UNAVAILABLE)
-                    return exp_pb2.MarkMessageAsReadResponse()
-            else:
-                context.set_details("No leader available")
-                context.set_code(grpc.StatusCode.UNAVAILABLE)
-                return exp_pb2.MarkMessageAsReadResponse()
+        if not self._require_leader(raft_node, context):
+            return exp_pb2.MarkMessageAsReadResponse()
+        if not self._admit(raft_node, context):
+            return exp_pb2.MarkMessageAsReadResponse()
         
         # Process on leader
-        success = self.raft_node.mark_message_as_read(user_id, message_uid)
+        success = yield Wait(raft_node, "mark_message_as_read", user_id, message_uid)
         
         if not success:
             context.set_details("Failed to mark message as read")
@@ -452,7 +707,7 @@ class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
         logger.info(f"Received GetUserByUsername request for username {username}")
         
         # This can be processed on any node
-        found, user_id = self.raft_node.get_user_by_username(username)
+        found, user_id = self._username_node(username).get_user_by_username(username)
         
         if found:
             return exp_pb2.GetUserByUsernameResponse(
@@ -464,9 +719,201 @@ class RaftMessagingServicer(exp_pb2_grpc.MessagingServiceServicer):
                 status=exp_pb2.NOT_FOUND,
                 user_id=0
             )
+    
+    def _watch_accounts(self, subscription):
+        """Add the account events of every group to a subscription."""
+        for raft_node in self.raft_nodes:
+            raft_node.user_events.watch_accounts(subscription)
+    
+    def _open_subscription(self, request):
+        """
+        Check a Subscribe request's session and open its subscription.
+        
+        Returns:
+            (subscription, the events that start the stream), or (None, the
+            status code and details to abort the stream with)
+        """
+        user_id = request.user_id
+        session_token = request.session_token.hex()
+        resume_after = request.resume_after if request.HasField("resume_after") else None
+        raft_node = self._user_node(user_id)
+        
+        logger.info(f"Received Subscribe request for user {user_id} (resume after {resume_after})")
+        
+        if not raft_node.validate_session(user_id, session_token):
+            return None, (grpc.StatusCode.UNAUTHENTICATED, "Invalid session token")
+        
+        subscription, backlog, complete, offset = raft_node.user_events.subscribe(user_id, resume_after)
+        if subscription is None:
+            return None, (grpc.StatusCode.RESOURCE_EXHAUSTED, "Too many subscribers on this node")
+        self._watch_accounts(subscription)
+        
+        events = [exp_pb2.UserEvent(type=exp_pb2.ACCOUNTS_SYNC)]
+        if resume_after is None or not complete:
+            user = raft_node.user_base.users.get(user_id)
+            unread_count = len(user.unread_messages) if user else 0
+            events.append(exp_pb2.UserEvent(offset=offset, type=exp_pb2.SYNC, unread_count=unread_count))
+        return subscription, events + backlog
+    
+    def Subscribe(self, request, context):
+        """
+        Stream a user's new-message, read and delete events as entries are applied.
+        
+        Any node can serve a subscription. A new subscription, or one whose resume
+        point is no longer covered, starts with a SYNC event carrying the current
+        offset; the client should refetch its state and resume from there. Offsets
+        are log indexes of the user's own group, which applies all of their events.
+        
+        Accounts created and deleted in any group are streamed too. Those events
+        are live only, so every stream starts with ACCOUNTS_SYNC, after which the
+        client refetches the account list.
+        """
+        subscription, events = self._open_subscription(request)
+        if subscription is None:
+            context.abort(*events)
+        
+        # Wake the stream when the client goes away or the server stops
+        context.add_callback(subscription.close)
+        try:
+            for event in events:
+                yield event
+            while True:
+                event = subscription.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            subscription.close()
+
+
+class AsyncRaftGroupRouter(RaftGroupRouter):
+    """
+    RaftGroupRouter for the asyncio server. Propose waits for a commit, so it is
+    awaited; the other Raft RPCs return without waiting on other nodes and run
+    on the server's migration thread pool.
+    """
+    
+    async def Propose(self, request, context):
+        if request.group_id >= len(self.raft_nodes):
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"No Raft group {request.group_id} on this node")
+        return await self.raft_nodes[request.group_id].ProposeAsync(request, context)
 
 
-def serve(node_id, cluster_config, data_dir, port=50051):
+class AsyncRaftMessagingServicer(RaftMessagingServicer):
+    """
+    RaftMessagingServicer for the asyncio server (grpc.aio).
+    
+    Handlers run the same steps as the threaded servicer's (see raft_steps.py)
+    and only drive them differently. Waits on Raft, for a commit, a read index
+    or a peer's RPC, are awaited on the event loop instead of blocking a worker
+    thread, so the number of requests in flight is not bounded by a thread
+    pool. The local work between the waits can block on a node's lock or on
+    loading state from SQLite, so it runs on the event loop's default executor.
+    Handlers that never wait on Raft are inherited and run on the server's
+    migration thread pool.
+    """
+    
+    async def CreateAccount(self, request, context):
+        return await run_steps_async(self._create_account_steps(request, context))
+    
+    async def Login(self, request, context):
+        return await run_steps_async(self._login_steps(request, context))
+    
+    async def DisplayConversation(self, request, context):
+        return await run_steps_async(self._display_conversation_steps(request, context))
+    
+    async def SendMessage(self, request, context):
+        return await run_steps_async(self._send_message_steps(request, context))
+    
+    async def SendMessages(self, request, context):
+        return await run_steps_async(self._send_messages_steps(request, context))
+    
+    async def ReadMessages(self, request, context):
+        return await run_steps_async(self._read_messages_steps(request, context))
+    
+    async def DeleteMessage(self, request, context):
+        return await run_steps_async(self._delete_message_steps(request, context))
+    
+    async def DeleteAccount(self, request, context):
+        return await run_steps_async(self._delete_account_steps(request, context))
+    
+    async def GetUnreadMessages(self, request, context):
+        return await run_steps_async(self._get_unread_messages_steps(request, context))
+    
+    async def GetMessageInformation(self, request, context):
+        return await run_steps_async(self._get_message_information_steps(request, context))
+    
+    async def MarkMessageAsRead(self, request, context):
+        return await run_steps_async(self._mark_message_as_read_steps(request, context))
+    
+    async def Subscribe(self, request, context):
+        """Stream a user's events; each open stream costs a coroutine rather than a thread."""
+        loop = asyncio.get_running_loop()
+        subscription, events = await loop.run_in_executor(None, self._open_subscription, request)
+        if subscription is None:
+            await context.abort(*events)
+        
+        # Wake the stream when the client goes away or the server stops
+        context.add_done_callback(lambda _: subscription.close())
+        try:
+            for event in events:
+                yield event
+            while True:
+                event = await subscription.get_async()
+                if event is None:
+                    break
+                yield event
+        finally:
+            subscription.close()
+
+
+def _offset_port(address, offset):
+    host, port = address.rsplit(":", 1)
+    return f"{host}:{int(port) + offset}"
+
+
+def _report_metrics(raft_nodes, pools, limiter, interval):
+    """Log thread pool queue depths, per-service RPC counts and each group's term every interval seconds."""
+    while True:
+        time.sleep(interval)
+        parts = []
+        for pool in pools:
+            stats = pool.stats()
+            parts.append(f"{pool.name} pool queued {stats['queued']} (peak {stats['peak_queued']}), "
+                         f"active {stats['active']}")
+        for service, stats in sorted(limiter.stats().items()):
+            parts.append(f"{service} in flight {stats['in_flight']} (peak {stats['peak']}), "
+                         f"rejected {stats['rejected']}")
+        # A term that keeps climbing means elections are being triggered
+        for raft_node in raft_nodes:
+            parts.append(f"group {raft_node.group_id} term {raft_node.current_term} {raft_node.state}")
+        logger.info("Metrics: " + "; ".join(parts))
+
+
+async def _serve_aio(raft_nodes, server_address, migration_pool, serve_raft):
+    """Run the asyncio server until it terminates, then stop the Raft nodes."""
+    # Synchronous handlers, including most Raft RPCs, run on the migration pool
+    server = grpc.aio.server(migration_thread_pool=migration_pool)
+    exp_pb2_grpc.add_MessagingServiceServicer_to_server(AsyncRaftMessagingServicer(raft_nodes), server)
+    if serve_raft:
+        exp_pb2_grpc.add_RaftServiceServicer_to_server(AsyncRaftGroupRouter(raft_nodes), server)
+    server.add_insecure_port(server_address)
+    await server.start()
+    try:
+        await server.wait_for_termination()
+    finally:
+        for raft_node in raft_nodes:
+            raft_node.stop()
+        await server.stop(0)
+
+
+def serve(node_id, cluster_config, data_dir, port=50051, sqlite_synchronous="FULL",
+          max_append_entries=512, max_append_bytes=1 << 20, max_inflight_appends=4,
+          snapshot_threshold=10000, snapshot_trailing=1000, lazy_state=False,
+          message_cache_size=100000, conversation_cache_bytes=64 << 20,
+          conversation_window=1000, max_subscribers=100, lease_reads=False, raft_groups=1, aio=False,
+          raft_port_offset=0, raft_workers=None, max_client_rpcs=0, max_raft_rpcs=0, metrics_interval=0,
+          max_pending_entries=1000, max_pending_bytes=8 << 20):
     """
     Start the gRPC server with both messaging and Raft services.
     
@@ -475,31 +922,114 @@ def serve(node_id, cluster_config, data_dir, port=50051):
         cluster_config: Dict mapping node_ids to addresses
         data_dir: Directory for persistent storage
         port: Port to listen on
+        sqlite_synchronous: SQLite synchronous level for the node's database
+        max_append_entries: Most log entries per AppendEntries RPC
+        max_append_bytes: Most encoded command bytes per AppendEntries RPC
+        max_inflight_appends: Outstanding AppendEntries RPCs per follower
+        snapshot_threshold: Applied entries accumulated before the log is compacted
+        snapshot_trailing: Applied entries kept in the log after compaction
+        lazy_state: Load messages and conversations on demand instead of at startup
+        message_cache_size: Messages kept in memory in lazy mode
+        conversation_cache_bytes: Approximate memory budget for cached conversations in lazy mode
+        conversation_window: Newest messages per conversation kept in memory in lazy mode
+        max_subscribers: Most Subscribe streams served at once; each holds a server thread
+        lease_reads: Serve linearizable reads on the leader under a lease instead of a heartbeat round
+        raft_groups: Independent Raft groups users are sharded across; this process
+            runs a node of each, with its own log and database
+        aio: Serve with grpc.aio, awaiting commits and read indexes on an event
+            loop instead of holding a worker thread per request in flight
+        raft_port_offset: If nonzero, serve Raft RPCs on port + raft_port_offset,
+            from their own server and thread pool, so client load can't delay
+            heartbeats; every node must use the same offset
+        raft_workers: Threads serving Raft RPCs (default 10 per group)
+        max_client_rpcs: Most MessagingService RPCs in progress at once; more are
+            rejected with RESOURCE_EXHAUSTED (0 for no limit; threaded servers only)
+        max_raft_rpcs: Most RaftService RPCs in progress at once (0 for no limit)
+        metrics_interval: Seconds between metrics log lines (0 to disable)
+        max_pending_entries: Uncommitted entries a leader accepts before rejecting
+            writes with RESOURCE_EXHAUSTED (0 for no limit)
+        max_pending_bytes: Encoded bytes of uncommitted entries a leader accepts
+            before rejecting writes (0 for no limit)
     """
-    # Initialize the Raft node
-    raft_node = RaftNode(node_id, cluster_config, data_dir)
+    raft_addresses = None
+    if raft_port_offset:
+        raft_addresses = {peer_id: _offset_port(address, raft_port_offset)
+                          for peer_id, address in cluster_config.items()}
+    raft_workers = raft_workers or 10 * raft_groups
     
-    # Create the gRPC server
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-
-    print(f"[DEBUG] Registering services for node {node_id}")
+    # Initialize a Raft node per group (an unsharded cluster keeps its data directly in data_dir)
+    raft_nodes = []
+    for group_id in range(raft_groups):
+        group_dir = data_dir if raft_groups == 1 else os.path.join(data_dir, f"group_{group_id}")
+        raft_nodes.append(RaftNode(node_id, cluster_config, group_dir, sqlite_synchronous=sqlite_synchronous,
+                                   max_append_entries=max_append_entries, max_append_bytes=max_append_bytes,
+                                   max_inflight_appends=max_inflight_appends,
+                                   snapshot_threshold=snapshot_threshold, snapshot_trailing=snapshot_trailing,
+                                   lazy_state=lazy_state, message_cache_size=message_cache_size,
+                                   conversation_cache_bytes=conversation_cache_bytes,
+                                   conversation_window=conversation_window, max_subscribers=max_subscribers,
+                                   lease_reads=lease_reads, group_id=group_id, num_groups=raft_groups,
+                                   raft_addresses=raft_addresses, max_pending_entries=max_pending_entries,
+                                   max_pending_bytes=max_pending_bytes))
+    
+    print(f"[DEBUG] Registering services for node {node_id} ({raft_groups} Raft group(s))")
     print(f"[DEBUG] RaftNode inherits from: {RaftNode.__mro__}")
-    print(f"[DEBUG] RaftNode implements RequestVote: {'RequestVote' in dir(raft_node)}")
-    print(f"[DEBUG] RaftNode implements AppendEntries: {'AppendEntries' in dir(raft_node)}")
+    print(f"[DEBUG] RaftNode implements RequestVote: {'RequestVote' in dir(raft_nodes[0])}")
+    print(f"[DEBUG] RaftNode implements AppendEntries: {'AppendEntries' in dir(raft_nodes[0])}")
+    
+    # server_address = f"[::]:{port}"
+    server_address = f"0.0.0.0:{port}"
+    limiter = ServiceLimiter({"MessagingService": max_client_rpcs, "RaftService": max_raft_rpcs})
+    pools = []
+    
+    # Raft peers get a server and workers of their own, which client requests never queue for
+    raft_server = None
+    if raft_port_offset:
+        raft_pool = InstrumentedThreadPool(raft_workers, "raft")
+        pools.append(raft_pool)
+        raft_server = grpc.server(raft_pool, interceptors=[limiter])
+        exp_pb2_grpc.add_RaftServiceServicer_to_server(RaftGroupRouter(raft_nodes), raft_server)
+        raft_server.add_insecure_port(f"0.0.0.0:{port + raft_port_offset}")
+        raft_server.start()
+        logger.info(f"Raft service listening on port {port + raft_port_offset}")
+    
+    if aio:
+        migration_pool = InstrumentedThreadPool(raft_workers, "migration")
+        pools.insert(0, migration_pool)
+        if metrics_interval:
+            threading.Thread(target=_report_metrics, args=(raft_nodes, pools, limiter, metrics_interval),
+                             daemon=True).start()
+        logger.info(f"Starting asyncio server as node {node_id} listening on {server_address}")
+        logger.info(f"Cluster configuration: {cluster_config}")
+        try:
+            asyncio.run(_serve_aio(raft_nodes, server_address, migration_pool, raft_server is None))
+        except KeyboardInterrupt:
+            logger.info("Server shutting down...")
+        if raft_server is not None:
+            raft_server.stop(0)
+        logger.info("Server shutdown complete")
+        return
+    
+    # Create the gRPC server (Subscribe streams each hold a worker for their lifetime)
+    client_pool = InstrumentedThreadPool(10 * raft_groups + max_subscribers, "client")
+    pools.insert(0, client_pool)
+    server = grpc.server(client_pool, interceptors=[limiter])
     
     # Add the messaging service
-    messaging_servicer = RaftMessagingServicer(raft_node)
+    messaging_servicer = RaftMessagingServicer(raft_nodes)
     exp_pb2_grpc.add_MessagingServiceServicer_to_server(messaging_servicer, server)
     
-    # Add the Raft service
+    # Add the Raft service, dispatching to the node of each request's group
     # RaftService.add_to_server(raft_node, server)
-    exp_pb2_grpc.add_RaftServiceServicer_to_server(raft_node, server)
+    if raft_server is None:
+        exp_pb2_grpc.add_RaftServiceServicer_to_server(RaftGroupRouter(raft_nodes), server)
     
     # Start the server
-    # server_address = f"[::]:{port}"
-    server_address = f"0.0.0.0:{port}"
     server.add_insecure_port(server_address)
     server.start()
+    if metrics_interval:
+        threading.Thread(target=_report_metrics, args=(raft_nodes, pools, limiter, metrics_interval),
+                         daemon=True).start()
     
     logger.info(f"Server started as node {node_id} listening on {server_address}")
     logger.info(f"Cluster configuration: {cluster_config}")
@@ -509,8 +1039,11 @@ def serve(node_id, cluster_config, data_dir, port=50051):
         server.wait_for_termination()
     except KeyboardInterrupt:
         logger.info("Server shutting down...")
-        raft_node.stop()
+        for raft_node in raft_nodes:
+            raft_node.stop()
         server.stop(0)
+        if raft_server is not None:
+            raft_server.stop(0)
     
     logger.info("Server shutdown complete")
 
@@ -521,6 +1054,50 @@ if __name__ == "__main__":
     parser.add_argument("--config", required=True, help="Path to cluster configuration file")
     parser.add_argument("--data-dir", required=True, help="Directory for data storage")
     parser.add_argument("--port", type=int, default=50051, help="Port to listen on")
+    parser.add_argument("--sqlite-synchronous", default="FULL", choices=["OFF", "NORMAL", "FULL", "EXTRA"],
+                        help="SQLite synchronous level for the node's database")
+    parser.add_argument("--max-append-entries", type=int, default=512,
+                        help="Maximum log entries per AppendEntries RPC")
+    parser.add_argument("--max-append-bytes", type=int, default=1 << 20,
+                        help="Maximum encoded command bytes per AppendEntries RPC")
+    parser.add_argument("--max-inflight-appends", type=int, default=4,
+                        help="Maximum outstanding AppendEntries RPCs per follower")
+    parser.add_argument("--snapshot-threshold", type=int, default=10000,
+                        help="Applied log entries accumulated before the log is compacted")
+    parser.add_argument("--snapshot-trailing", type=int, default=1000,
+                        help="Applied log entries kept after compaction for lagging followers")
+    parser.add_argument("--lazy-state", action="store_true",
+                        help="Load only users and sessions at startup; fetch messages and conversations on demand")
+    parser.add_argument("--message-cache-size", type=int, default=100000,
+                        help="Messages kept in memory with --lazy-state")
+    parser.add_argument("--conversation-cache-bytes", type=int, default=64 << 20,
+                        help="Approximate memory budget for cached conversations with --lazy-state")
+    parser.add_argument("--conversation-window", type=int, default=1000,
+                        help="Newest messages per conversation kept in memory with --lazy-state")
+    parser.add_argument("--max-subscribers", type=int, default=100,
+                        help="Most Subscribe streams served at once")
+    parser.add_argument("--lease-reads", action="store_true",
+                        help="Serve linearizable reads on the leader under a lease, without a heartbeat round")
+    parser.add_argument("--raft-groups", type=int, default=1,
+                        help="Independent Raft groups to shard users across; must match on every node")
+    parser.add_argument("--aio", action="store_true",
+                        help="Serve with grpc.aio so in-flight requests don't each hold a thread")
+    parser.add_argument("--raft-port-offset", type=int, default=0,
+                        help="Serve Raft RPCs on port + offset with their own threads (0 shares the client port); "
+                             "must match on every node")
+    parser.add_argument("--raft-workers", type=int, default=None,
+                        help="Threads serving Raft RPCs (default 10 per Raft group)")
+    parser.add_argument("--max-client-rpcs", type=int, default=0,
+                        help="Most client RPCs in progress at once, beyond which they are rejected (0 for no limit)")
+    parser.add_argument("--max-raft-rpcs", type=int, default=0,
+                        help="Most Raft RPCs in progress at once (0 for no limit)")
+    parser.add_argument("--metrics-interval", type=float, default=0,
+                        help="Seconds between logged thread pool and RPC metrics (0 to disable)")
+    parser.add_argument("--max-pending-entries", type=int, default=1000,
+                        help="Uncommitted entries a leader accepts before rejecting writes (0 for no limit)")
+    parser.add_argument("--max-pending-bytes", type=int, default=8 << 20,
+                        help="Encoded bytes of uncommitted entries a leader accepts before rejecting writes "
+                             "(0 for no limit)")
     
     args = parser.parse_args()
     
@@ -529,4 +1106,25 @@ if __name__ == "__main__":
         cluster_config = json.load(f)
     
     # Start the server
-    serve(args.node_id, cluster_config, args.data_dir, args.port)
+    serve(args.node_id, cluster_config, args.data_dir, args.port,
+          sqlite_synchronous=args.sqlite_synchronous,
+          max_append_entries=args.max_append_entries,
+          max_append_bytes=args.max_append_bytes,
+          max_inflight_appends=args.max_inflight_appends,
+          snapshot_threshold=args.snapshot_threshold,
+          snapshot_trailing=args.snapshot_trailing,
+          lazy_state=args.lazy_state,
+          message_cache_size=args.message_cache_size,
+          conversation_cache_bytes=args.conversation_cache_bytes,
+          conversation_window=args.conversation_window,
+          max_subscribers=args.max_subscribers,
+          lease_reads=args.lease_reads,
+          raft_groups=args.raft_groups,
+          aio=args.aio,
+          raft_port_offset=args.raft_port_offset,
+          raft_workers=args.raft_workers,
+          max_client_rpcs=args.max_client_rpcs,
+          max_raft_rpcs=args.max_raft_rpcs,
+          metrics_interval=args.metrics_interval,
+          max_pending_entries=args.max_pending_entries,
+          max_pending_bytes=args.max_pending_bytes)
@@ -0,0 +1,77 @@
+# raft_steps.py
+"""
+Client operations written once for both the threaded and the asyncio server.
+
+An operation is a generator. Between yields it does its local work: checking
+the session, building commands, reading state and building the response. At
+each point where it has to wait on Raft, for a commit, a read index or a peer's
+RPC, it yields a Wait and is sent back the result.
+
+run_steps drives an operation on the calling thread, blocking at each wait.
+run_steps_async drives it from an event loop: it awaits each wait, and runs the
+local work in between on the loop's default executor, because that work can
+take a node's lock or, with lazy state, load from SQLite under the storage
+write lock that the apply thread holds for a whole run of entries.
+"""
+import asyncio
+from typing import Any, Generator, Tuple
+
+Steps = Generator["Wait", Any, Any]
+
+
+class Wait:
+    """
+    A point where an operation waits on Raft. The threaded server calls
+    target.<method>(*args, **kwargs); the asyncio server awaits
+    target.<method>_async(*args, **kwargs), its awaitable twin.
+    """
+    def __init__(self, target: Any, method: str, *args, **kwargs):
+        self.target = target
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+
+    def call(self) -> Any:
+        return getattr(self.target, self.method)(*self.args, **self.kwargs)
+
+    async def call_async(self) -> Any:
+        return await getattr(self.target, f"{self.method}_async")(*self.args, **self.kwargs)
+
+
+def run_steps(steps: Steps) -> Any:
+    """Run an operation on this thread and return its result."""
+    result, error = None, None
+    while True:
+        done, value = _advance(steps, result, error)
+        if done:
+            return value
+        try:
+            result, error = value.call(), None
+        except Exception as e:
+            result, error = None, e
+
+
+async def run_steps_async(steps: Steps) -> Any:
+    """Run an operation from the event loop and return its result."""
+    loop = asyncio.get_running_loop()
+    result, error = None, None
+    while True:
+        done, value = await loop.run_in_executor(None, _advance, steps, result, error)
+        if done:
+            return value
+        try:
+            result, error = await value.call_async(), None
+        except Exception as e:
+            result, error = None, e
+
+
+def _advance(steps: Steps, result: Any, error: Exception) -> Tuple[bool, Any]:
+    """
+    Resume an operation with the result or error of its last wait. Returns
+    (True, its result) once it finishes, else (False, its next Wait); a
+    StopIteration can't be passed through an executor's future.
+    """
+    try:
+        return False, steps.throw(error) if error is not None else steps.send(result)
+    except StopIteration as stop:
+        return True, stop.value
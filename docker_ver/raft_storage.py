@@ -0,0 +1,470 @@
+# raft_storage.py
+import os
+import sqlite3
+import time
+import threading
+import queue
+import logging
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Sequence, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Valid values for PRAGMA synchronous
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# Table definitions for a node's database
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS raft_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS log_entries (
+        log_index INTEGER PRIMARY KEY,
+        term INTEGER,
+        command BLOB
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT UNIQUE,
+        password_hash TEXT,
+        data TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS messages (
+        message_id INTEGER PRIMARY KEY,
+        sender_id INTEGER,
+        receiver_id INTEGER,
+        content TEXT,
+        has_been_read INTEGER,
+        timestamp INTEGER
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS messages_by_conversation
+    ON messages (min(sender_id, receiver_id), max(sender_id, receiver_id), message_id)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS session_tokens (
+        user_id INTEGER PRIMARY KEY,
+        token TEXT,
+        expiry INTEGER
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS message_tombstones (
+        message_id INTEGER PRIMARY KEY
+    )
+    ''',
+]
+
+# Tables holding the applied chat state. Together with last_applied they form a
+# node's snapshot, which is what InstallSnapshot ships to lagging followers.
+SNAPSHOT_TABLES = ("users", "messages", "session_tokens", "message_tombstones")
+
+# Statements reused on the long-lived connections. sqlite3 keeps a per-connection
+# cache of compiled statements keyed on the SQL text, so keeping these as constants
+# means each one is only prepared once per connection.
+UPSERT_RAFT_STATE = "INSERT OR REPLACE INTO raft_state VALUES (?, ?)"
+SELECT_RAFT_STATE = "SELECT key, value FROM raft_state"
+UPSERT_LOG_ENTRY = "INSERT OR REPLACE INTO log_entries VALUES (?, ?, ?)"
+DELETE_LOG_SUFFIX = "DELETE FROM log_entries WHERE log_index >= ?"
+DELETE_LOG_PREFIX = "DELETE FROM log_entries WHERE log_index <= ?"
+SELECT_LOG_ENTRIES = "SELECT term, command FROM log_entries WHERE log_index > ? ORDER BY log_index ASC"
+SELECT_LOG_TERM = "SELECT term FROM log_entries WHERE log_index = ?"
+UPSERT_USER = "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?)"
+DELETE_USER = "DELETE FROM users WHERE user_id = ?"
+SELECT_USERS = "SELECT user_id, username, password_hash, data FROM users"
+UPSERT_MESSAGE = "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?)"
+DELETE_MESSAGE = "DELETE FROM messages WHERE message_id = ?"
+SELECT_MESSAGES = "SELECT message_id, sender_id, receiver_id, content, has_been_read, timestamp FROM messages"
+SELECT_MESSAGE = SELECT_MESSAGES + " WHERE message_id = ?"
+# Conversation pages walk the messages_by_conversation index from either end; a
+# LIMIT of -1 means no limit
+SELECT_CONVERSATION_AFTER = (SELECT_MESSAGES + " WHERE min(sender_id, receiver_id) = ? AND max(sender_id, receiver_id) = ?"
+                             " AND message_id > ? AND message_id < ? ORDER BY message_id ASC LIMIT ?")
+SELECT_CONVERSATION_BEFORE = (SELECT_MESSAGES + " WHERE min(sender_id, receiver_id) = ? AND max(sender_id, receiver_id) = ?"
+                              " AND message_id < ? ORDER BY message_id DESC LIMIT ?")
+UPSERT_SESSION_TOKEN = "INSERT OR REPLACE INTO session_tokens VALUES (?, ?, ?)"
+DELETE_SESSION_TOKEN = "DELETE FROM session_tokens WHERE user_id = ?"
+SELECT_SESSION_TOKENS = "SELECT user_id, token, expiry FROM session_tokens WHERE expiry > ?"
+# IDs of messages delivered from another group and deleted here
+UPSERT_MESSAGE_TOMBSTONE = "INSERT OR REPLACE INTO message_tombstones VALUES (?)"
+DELETE_MESSAGE_TOMBSTONE = "DELETE FROM message_tombstones WHERE message_id = ?"
+SELECT_MESSAGE_TOMBSTONE = "SELECT 1 FROM message_tombstones WHERE message_id = ?"
+
+
+class RaftStorage:
+    """
+    SQLite storage owned by a single RaftNode.
+
+    Keeps one long-lived writer connection (serialized by a lock) and a pool of
+    reader connections. The database runs in WAL mode so readers never block the
+    writer, and the synchronous level is configurable per node.
+    """
+
+    def __init__(self, db_path: str, synchronous: str = "FULL", reader_pool_size: int = 4,
+                 statement_cache_size: int = 128):
+        """
+        Open the writer and reader connections.
+
+        Args:
+            db_path: Path to the node's SQLite file
+            synchronous: PRAGMA synchronous level (OFF, NORMAL, FULL or EXTRA)
+            reader_pool_size: Number of pooled read-only connections
+            statement_cache_size: Compiled statements cached per connection
+        """
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Invalid synchronous level {synchronous!r}, expected one of {SYNCHRONOUS_LEVELS}")
+
+        self.db_path = db_path
+        self.synchronous = synchronous
+        self.statement_cache_size = statement_cache_size
+
+        self._write_lock = threading.RLock()
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode=WAL")
+
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._all_readers = []
+        for _ in range(max(1, reader_pool_size)):
+            conn = self._connect()
+            self._readers.put(conn)
+            self._all_readers.append(conn)
+
+        logger.info(f"Opened storage at {db_path} (journal_mode=WAL, synchronous={synchronous}, "
+                    f"readers={len(self._all_readers)})")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with the node's pragmas applied."""
+        # isolation_level=None puts the connection in autocommit mode so that
+        # transactions are only opened explicitly by transaction().
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=self.statement_cache_size
+        )
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute("PRAGMA foreign_keys=OFF")
+        return conn
+
+    def init_schema(self):
+        """Create the node's tables if they don't exist."""
+        with self.transaction() as c:
+            for statement in SCHEMA:
+                c.execute(statement)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Run a block of writes as a single transaction on the writer connection.
+
+        Nested calls from the same thread join the outer transaction.
+        """
+        with self._write_lock:
+            if self._writer.in_transaction:
+                yield self._writer.cursor()
+                return
+            c = self._writer.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                yield c
+            except BaseException:
+                self._writer.rollback()
+                raise
+            else:
+                self._writer.commit()
+
+    def execute(self, sql: str, params: Sequence[Any] = ()):
+        """Execute a single write statement in its own transaction."""
+        with self.transaction() as c:
+            c.execute(sql, params)
+
+    def executemany(self, sql: str, rows: Iterable[Sequence[Any]]):
+        """Execute a write statement for every row in one transaction."""
+        with self.transaction() as c:
+            c.executemany(sql, rows)
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled reader connection."""
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> list:
+        """Run a read query on a pooled connection and return all rows."""
+        with self.reader() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    @property
+    def write_lock(self) -> threading.RLock:
+        """Lock held for the duration of every write transaction."""
+        return self._write_lock
+
+    def query_latest(self, sql: str, params: Sequence[Any] = ()) -> list:
+        """
+        Run a read query on the writer connection and return all rows.
+
+        Waits for any open write transaction on another thread to finish, so
+        the result includes every write made before the call.
+        """
+        with self._write_lock:
+            return self._writer.execute(sql, params).fetchall()
+
+    def export_snapshot(self, path: str) -> Tuple[int, int]:
+        """
+        Copy the state tables into a standalone database file at path.
+
+        The copy is made from a single read transaction, so it reflects exactly
+        the entries applied up to the returned (last_applied, term).
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        snap = sqlite3.connect(path)
+        for statement in SCHEMA:
+            snap.execute(statement)
+        snap.commit()
+        snap.close()
+
+        with self.reader() as conn:
+            conn.execute("ATTACH DATABASE ? AS snap", (path,))
+            try:
+                conn.execute("BEGIN")
+                try:
+                    raft_state = dict(conn.execute(SELECT_RAFT_STATE).fetchall())
+                    last_applied = int(raft_state.get("last_applied", -1))
+                    if last_applied == int(raft_state.get("snapshot_index", -1)):
+                        term = int(raft_state.get("snapshot_term", 0))
+                    else:
+                        row = conn.execute(SELECT_LOG_TERM, (last_applied,)).fetchone()
+                        term = row[0] if row else 0
+                    for table in SNAPSHOT_TABLES:
+                        conn.execute(f"INSERT INTO snap.{table} SELECT * FROM main.{table}")
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.execute("DETACH DATABASE snap")
+        return last_applied, term
+
+    def install_snapshot(self, path: str, last_index: int, last_term: int, retain_log: bool):
+        """
+        Replace the state tables with those in the snapshot file at path.
+
+        The tables, the snapshot metadata and the log are updated in one
+        transaction. If retain_log is set, log entries after last_index are
+        kept; otherwise the whole log is discarded.
+        """
+        with self._write_lock:
+            # ATTACH is not allowed inside a transaction
+            self._writer.execute("ATTACH DATABASE ? AS snap", (path,))
+            try:
+                with self.transaction() as c:
+                    for table in SNAPSHOT_TABLES:
+                        c.execute(f"DELETE FROM main.{table}")
+                        c.execute(f"INSERT INTO main.{table} SELECT * FROM snap.{table}")
+                    c.executemany(UPSERT_RAFT_STATE, [
+                        ("snapshot_index", str(last_index)),
+                        ("snapshot_term", str(last_term)),
+                        ("last_applied", str(last_index)),
+                    ])
+                    if retain_log:
+                        c.execute(DELETE_LOG_PREFIX, (last_index,))
+                    else:
+                        c.execute(DELETE_LOG_SUFFIX, (0,))
+            finally:
+                self._writer.execute("DETACH DATABASE snap")
+
+    def close(self):
+        """Close every connection held by the storage layer."""
+        with self._write_lock:
+            self._writer.close()
+        for conn in self._all_readers:
+            conn.close()
+
+
+class GroupCommitLog:
+    """
+    Group-commit stage in front of the log_entries table.
+
+    Callers on any thread enqueue log rows and get back a Future. A single flusher
+    thread writes everything that queued up while the previous flush was running
+    (optionally lingering a little longer for stragglers) in one transaction, so
+    concurrent appends share one fsync. Each Future resolves only after its batch
+    has been committed.
+
+    Truncations go through the same queue so they are applied in order with the
+    appends around them.
+    """
+
+    def __init__(self, storage: RaftStorage, max_batch_entries: int = 256, max_wait: float = 0.0):
+        """
+        Start the flusher thread.
+
+        Args:
+            storage: Storage layer whose writer connection receives the batches
+            max_batch_entries: Flush as soon as this many rows are pending
+            max_wait: Extra seconds to wait for more rows once the first one arrives
+        """
+        self.storage = storage
+        self.max_batch_entries = max_batch_entries
+        self.max_wait = max_wait
+
+        self._cond = threading.Condition()
+        # Queued (rows, truncate_from, future); truncate_from is None for appends
+        self._pending: List[Tuple[Sequence[Any], Optional[int], Future]] = []
+        self._running = True
+
+        # Counters for observing how well appends are being grouped
+        self.batches_flushed = 0
+        self.rows_flushed = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def append(self, row: Sequence[Any]) -> Future:
+        """Queue one (log_index, term, command) row. The Future resolves once it is durable."""
+        return self.append_many([row])
+
+    def append_many(self, rows: Sequence[Sequence[Any]]) -> Future:
+        """Queue several rows that must land in the same batch."""
+        if not rows:
+            future = Future()
+            future.set_result(None)
+            return future
+        return self._enqueue(list(rows), None)
+
+    def truncate(self, from_index: int) -> Future:
+        """Queue deletion of every log row at or after from_index."""
+        return self._enqueue([], from_index)
+
+    def _enqueue(self, rows: List[Sequence[Any]], truncate_from: Optional[int]) -> Future:
+        future = Future()
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("GroupCommitLog is closed")
+            self._pending.append((rows, truncate_from, future))
+            self._cond.notify()
+        return future
+
+    def _run(self):
+        """Flusher loop: wait for rows, linger briefly to gather more, then commit."""
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._pending:
+                    return  # closed and drained
+
+                # Give concurrent writers a short window to join this batch
+                deadline = time.monotonic() + self.max_wait
+                while self._running and self._pending_row_count() < self.max_batch_entries:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._pending
+                self._pending = []
+
+            self._flush(batch)
+
+    def _pending_row_count(self) -> int:
+        return sum(len(rows) for rows, _, _ in self._pending)
+
+    def _flush(self, batch: List[Tuple[Sequence[Any], Optional[int], Future]]):
+        """Write every queued row in one transaction and release the waiters."""
+        num_rows = 0
+        try:
+            with self.storage.transaction() as c:
+                # Consecutive appends go out in one executemany; a truncation
+                # is applied at its position in the queue.
+                rows: List[Sequence[Any]] = []
+                for group, truncate_from, _ in batch:
+                    if truncate_from is None:
+                        rows.extend(group)
+                        continue
+                    if rows:
+                        c.executemany(UPSERT_LOG_ENTRY, rows)
+                        num_rows += len(rows)
+                        rows = []
+                    c.execute(DELETE_LOG_SUFFIX, (truncate_from,))
+                if rows:
+                    c.executemany(UPSERT_LOG_ENTRY, rows)
+                    num_rows += len(rows)
+        except Exception as e:
+            logger.error(f"Group commit of {len(batch)} log operations failed: {str(e)}")
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches_flushed += 1
+        self.rows_flushed += num_rows
+        for _, _, future in batch:
+            future.set_result(None)
+
+    def close(self):
+        """Flush anything still queued and stop the flusher thread."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join()
+
+
+class StateWriteBatch:
+    """
+    State-table writes staged while a run of committed entries is applied.
+
+    Only the final row of each key is kept, so a user touched by every entry of
+    the run is written once; flush() then issues one executemany per statement.
+    """
+
+    # table -> (upsert statement, delete statement)
+    STATEMENTS = {
+        "users": (UPSERT_USER, DELETE_USER),
+        "messages": (UPSERT_MESSAGE, DELETE_MESSAGE),
+        "session_tokens": (UPSERT_SESSION_TOKEN, DELETE_SESSION_TOKEN),
+        "message_tombstones": (UPSERT_MESSAGE_TOMBSTONE, DELETE_MESSAGE_TOMBSTONE),
+    }
+
+    def __init__(self):
+        self._upserts = {table: {} for table in self.STATEMENTS}
+        self._deletes = {table: set() for table in self.STATEMENTS}
+
+    def upsert(self, table: str, key: Any, row: Sequence[Any]):
+        """Stage the row to store under key, replacing anything staged for it."""
+        self._deletes[table].discard(key)
+        self._upserts[table][key] = row
+
+    def delete(self, table: str, key: Any):
+        """Stage the removal of key's row, dropping anything staged for it."""
+        self._upserts[table].pop(key, None)
+        self._deletes[table].add(key)
+
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self._upserts.values()) + sum(len(keys) for keys in self._deletes.values())
+
+    def flush(self, cursor: sqlite3.Cursor) -> int:
+        """Write everything staged on cursor (inside the caller's transaction) and clear it. Returns the row count."""
+        num_rows = len(self)
+        for table, (upsert, delete) in self.STATEMENTS.items():
+            if self._deletes[table]:
+                cursor.executemany(delete, [(key,) for key in self._deletes[table]])
+                self._deletes[table].clear()
+            if self._upserts[table]:
+                cursor.executemany(upsert, self._upserts[table].values())
+                self._upserts[table].clear()
+        return num_rows
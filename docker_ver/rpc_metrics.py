@@ -0,0 +1,127 @@
+# rpc_metrics.py
+"""
+Concurrency limits and queue-depth metrics for the gRPC servers.
+
+A synchronous gRPC server hands every incoming RPC to its thread pool; when
+all workers are busy the RPC waits in the pool's queue. InstrumentedThreadPool
+reports how deep that queue gets, and ServiceLimiter caps how many RPCs of each
+service run at once, rejecting the rest with RESOURCE_EXHAUSTED, so a burst of
+client requests can't take every worker away from Raft heartbeats.
+"""
+import threading
+from concurrent import futures
+from typing import Dict, Optional
+
+import grpc
+
+# Trailing metadata with which a RESOURCE_EXHAUSTED write rejection tells the
+# client how many milliseconds to wait before retrying
+RETRY_AFTER_METADATA_KEY = "retry-after-ms"
+
+
+class InstrumentedThreadPool(futures.ThreadPoolExecutor):
+    """A ThreadPoolExecutor that counts queued and running tasks."""
+
+    def __init__(self, max_workers: int, name: str):
+        super().__init__(max_workers=max_workers, thread_name_prefix=name)
+        self.name = name
+        self._stats_lock = threading.Lock()
+        self.queued = 0  # Submitted, waiting for a worker
+        self.active = 0  # Running on a worker
+        self.completed = 0
+        self._peak_queued = 0  # Deepest queue since the last stats() call
+
+    def submit(self, fn, *args, **kwargs):
+        with self._stats_lock:
+            self.queued += 1
+            self._peak_queued = max(self._peak_queued, self.queued)
+
+        def run():
+            with self._stats_lock:
+                self.queued -= 1
+                self.active += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._stats_lock:
+                    self.active -= 1
+                    self.completed += 1
+
+        return super().submit(run)
+
+    def stats(self) -> Dict[str, int]:
+        """Return current counts, and the peak queue depth since the previous call."""
+        with self._stats_lock:
+            stats = {"queued": self.queued, "peak_queued": self._peak_queued,
+                     "active": self.active, "completed": self.completed}
+            self._peak_queued = self.queued
+        return stats
+
+
+class ServiceLimiter(grpc.ServerInterceptor):
+    """
+    Server interceptor that counts the RPCs of each service in progress and
+    rejects new ones beyond the service's limit with RESOURCE_EXHAUSTED.
+
+    limits maps service names (e.g. "MessagingService") to their most
+    concurrent RPCs; services without a limit are only counted. Server-streaming
+    RPCs (Subscribe) aren't counted, as they are capped by max_subscribers.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits = {service: limit for service, limit in (limits or {}).items() if limit}
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, int] = {}
+        self._peak: Dict[str, int] = {}
+        self._rejected: Dict[str, int] = {}
+
+    def _enter(self, service: str) -> bool:
+        with self._lock:
+            in_flight = self._in_flight.get(service, 0)
+            limit = self.limits.get(service)
+            if limit is not None and in_flight >= limit:
+                self._rejected[service] = self._rejected.get(service, 0) + 1
+                return False
+            self._in_flight[service] = in_flight + 1
+            self._peak[service] = max(self._peak.get(service, 0), in_flight + 1)
+            return True
+
+    def _exit(self, service: str):
+        with self._lock:
+            self._in_flight[service] -= 1
+
+    def _limited(self, service: str, behavior):
+        def limited_behavior(request, context):
+            if not self._enter(service):
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, f"{service} is at its concurrency limit")
+            try:
+                return behavior(request, context)
+            finally:
+                self._exit(service)
+        return limited_behavior
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None or handler.response_streaming:
+            return handler
+        # Methods are named "/package.Service/Method"
+        service = handler_call_details.method.split("/")[1].rsplit(".", 1)[-1]
+        if handler.request_streaming:
+            return grpc.stream_unary_rpc_method_handler(
+                self._limited(service, handler.stream_unary),
+                request_deserializer=handler.request_deserializer,
+                response_serializer=handler.response_serializer)
+        return grpc.unary_unary_rpc_method_handler(
+            self._limited(service, handler.unary_unary),
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return in-flight, peak and rejected counts per service; peaks restart from the current count."""
+        with self._lock:
+            stats = {service: {"in_flight": self._in_flight.get(service, 0),
+                               "peak": self._peak.get(service, 0),
+                               "rejected": self._rejected.get(service, 0)}
+                     for service in set(self._in_flight) | set(self._rejected)}
+            self._peak = dict(self._in_flight)
+        return stats
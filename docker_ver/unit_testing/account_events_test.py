@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import socket
+import logging
+import tempfile
+from concurrent import futures
+
+import grpc
+
+# Adjust import path if needed
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, PARENT_DIR)
+
+import exp_pb2
+import exp_pb2_grpc
+from raft_node import RaftNode, NodeState
+from user_events import UserEventHub
+
+
+def free_port() -> int:
+    """
+    Returns a localhost port that is currently unused.
+    """
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def start_node(node_id: str, cluster_config: dict, data_dir: str):
+    """
+    Starts a RaftNode behind its own gRPC server and waits until it leads.
+    Returns (node, server).
+    """
+    node = RaftNode(node_id, cluster_config, data_dir, sqlite_synchronous="OFF")
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    exp_pb2_grpc.add_RaftServiceServicer_to_server(node, server)
+    server.add_insecure_port(cluster_config[node_id])
+    server.start()
+    node._become_leader()
+    deadline = time.time() + 10.0
+    while not (node.state == NodeState.LEADER and node.last_applied >= len(node.log) - 1 >= 0):
+        assert time.time() < deadline, "node did not become leader"
+        time.sleep(0.01)
+    return node, server
+
+
+def drain(subscription) -> list:
+    """
+    Returns the (type, account_id, username) of the events queued on a subscription.
+    """
+    events = []
+    subscription.close()
+    while True:
+        event = subscription.get()
+        if event is None:
+            return events
+        events.append((event.type, event.account_id, event.username))
+
+
+def main():
+    # Keep the node's own logging out of the results
+    logging.getLogger().setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cluster_config = {"solo": f"localhost:{free_port()}"}
+        node, server = start_node("solo", cluster_config, tmp_dir)
+        try:
+            node.create_account("alice", "hash")
+            alice = node.user_trie.get("alice").userID
+
+            # Alice's feed watches this node's accounts, and those of a second hub
+            other_hub = UserEventHub()
+            subscription, _, _, _ = node.user_events.subscribe(alice)
+            node.user_events.watch_accounts(subscription)
+            other_hub.watch_accounts(subscription)
+            offset = node.user_events.offset
+
+            node.create_account("bob", "hash")
+            bob = node.user_trie.get("bob").userID
+            node.delete_account(bob)
+            resumed, backlog, _, _ = node.user_events.subscribe(alice, resume_after=offset)
+            resumed.close()
+            assert backlog == []
+            assert drain(subscription) == [(exp_pb2.ACCOUNT_CREATED, bob, "bob"),
+                                           (exp_pb2.ACCOUNT_DELETED, bob, "bob")]
+            print("[TEST] Account events reach watchers and are not retained: OK")
+
+            assert not node.user_events._account_watchers and not other_hub._account_watchers
+            print("[TEST] Closing a subscription stops every hub it watched: OK")
+
+            assert [user.userID for user in node.list_accounts("*")] == [alice]
+            print("[TEST] list_accounts returns users: OK")
+        finally:
+            node.stop()
+            server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import socket
+import logging
+import tempfile
+from concurrent import futures
+
+import grpc
+
+# Adjust import path if needed
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, PARENT_DIR)
+
+import exp_pb2_grpc
+from raft_node import RaftNode, NodeState
+
+
+def free_port() -> int:
+    """
+    Returns a localhost port that is currently unused.
+    """
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def start_node(node_id: str, cluster_config: dict, data_dir: str):
+    """
+    Starts a RaftNode behind its own gRPC server. Returns (node, server).
+    """
+    node = RaftNode(node_id, cluster_config, data_dir, sqlite_synchronous="OFF")
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    exp_pb2_grpc.add_RaftServiceServicer_to_server(node, server)
+    server.add_insecure_port(cluster_config[node_id])
+    server.start()
+    return node, server
+
+
+def wait_for_leader(node: RaftNode, timeout: float = 10.0):
+    """
+    Waits until node is leader and has applied the no-op of its term.
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with node.lock:
+            if node.state == NodeState.LEADER and node.last_applied >= len(node.log) - 1 >= 0:
+                return
+        time.sleep(0.01)
+    raise AssertionError("node did not become leader")
+
+
+def sent_messages(node: RaftNode) -> int:
+    """
+    Returns the number of SEND_MESSAGE entries in node's log.
+    """
+    with node.lock:
+        return sum(1 for _, command in node.log if command["type"] == "SEND_MESSAGE")
+
+
+def main():
+    # Keep the node's own logging out of the results
+    logging.getLogger().setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cluster_config = {"solo": f"localhost:{free_port()}"}
+        node, server = start_node("solo", cluster_config, tmp_dir)
+        try:
+            node._become_leader()
+            wait_for_leader(node)
+            node.create_account("alice", "hash")
+            node.create_account("bob", "hash")
+            alice, bob = node.user_trie.get("alice"), node.user_trie.get("bob")
+            assert node.send_message(alice.userID, bob.userID, "while leader") is not None
+            print("[TEST] Leader appends a message: OK")
+
+            # Step down after send_message has checked for leadership but before it appends
+            build_command = node._send_message_command
+
+            def step_down_after_check(*args):
+                command = build_command(*args)
+                node._step_down(node.current_term + 1)
+                return command
+
+            node._send_message_command = step_down_after_check
+            before = sent_messages(node)
+            assert node.send_message(alice.userID, bob.userID, "after stepping down") is None
+            assert sent_messages(node) == before
+            node._send_message_command = build_command
+            print("[TEST] Append refused after stepping down between check and append: OK")
+
+            # A caller that saw an earlier term is refused even once the node leads again
+            wait_for_leader(node)
+            stale_term = node.current_term - 1
+            command = node._send_message_command(alice.userID, bob.userID, "stale term")
+            assert node._start_append_many([command], stale_term) is None
+            assert node._submit_many([command, command]) is not None
+            assert sent_messages(node) == before + 2
+            print("[TEST] Append refused for a term the node no longer leads in: OK")
+        finally:
+            node.stop()
+            server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
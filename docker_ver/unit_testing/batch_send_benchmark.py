@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import socket
+import hashlib
+import logging
+import argparse
+import tempfile
+from concurrent import futures
+
+import grpc
+
+# Adjust import path if needed
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, PARENT_DIR)
+
+import exp_pb2
+import exp_pb2_grpc
+from raft_node import RaftNode, NodeState
+from raft_server import RaftMessagingServicer, RaftGroupRouter
+
+
+def free_port() -> int:
+    """
+    Returns a localhost port that is currently unused.
+    """
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def start_cluster(data_dir: str, size: int, sqlite_synchronous: str):
+    """
+    Starts size RaftNodes, each serving the messaging and Raft services, and
+    waits for a leader. Returns (nodes, servers, messaging stub of the leader).
+    """
+    cluster_config = {f"node{i}": f"localhost:{free_port()}" for i in range(size)}
+    nodes, servers = [], []
+    for node_id, address in cluster_config.items():
+        node = RaftNode(node_id, cluster_config, os.path.join(data_dir, node_id),
+                        sqlite_synchronous=sqlite_synchronous)
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+        exp_pb2_grpc.add_MessagingServiceServicer_to_server(RaftMessagingServicer([node]), server)
+        exp_pb2_grpc.add_RaftServiceServicer_to_server(RaftGroupRouter([node]), server)
+        server.add_insecure_port(address)
+        server.start()
+        nodes.append(node)
+        servers.append(server)
+
+    while True:
+        leaders = [node for node in nodes if node.state == NodeState.LEADER]
+        if leaders and leaders[0].wait_for_linearizable_read():
+            channel = grpc.insecure_channel(cluster_config[leaders[0].node_id])
+            return nodes, servers, exp_pb2_grpc.MessagingServiceStub(channel)
+        time.sleep(0.1)
+
+
+def create_user(stub, username: str):
+    """
+    Creates and logs into an account. Returns (user_id, session_token).
+    """
+    password_hash = hashlib.sha256(b"benchmark").digest()
+    stub.CreateAccount(exp_pb2.CreateAccountRequest(username=username, password_hash=password_hash))
+    login = stub.Login(exp_pb2.LoginRequest(username=username, password_hash=password_hash))
+    user_id = stub.GetUserByUsername(exp_pb2.GetUserByUsernameRequest(username=username)).user_id
+    return user_id, login.session_token
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SendMessage calls against SendMessages batches")
+    parser.add_argument("--nodes", type=int, default=3, help="Cluster size")
+    parser.add_argument("--messages", type=int, default=2000, help="Messages sent per configuration")
+    parser.add_argument("--batch-size", type=int, default=100, help="Messages per SendMessages request")
+    parser.add_argument("--sqlite-synchronous", default="FULL", choices=["OFF", "NORMAL", "FULL", "EXTRA"],
+                        help="SQLite synchronous level for the nodes' databases")
+    args = parser.parse_args()
+
+    # Keep the nodes' own logging out of the results
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        nodes, servers, stub = start_cluster(tmp_dir, args.nodes, args.sqlite_synchronous)
+        try:
+            sender_id, token = create_user(stub, "sender")
+            recipient_id, _ = create_user(stub, "recipient")
+            print(f"[BENCH] {args.nodes} nodes, {args.messages} messages per configuration")
+
+            start = time.perf_counter()
+            for i in range(args.messages):
+                stub.SendMessage(exp_pb2.SendMessageRequest(sender_user_id=sender_id, session_token=token,
+                                                            recipient_user_id=recipient_id,
+                                                            message_content=f"single {i}"))
+            single = time.perf_counter() - start
+            print(f"[BENCH] SendMessage x {args.messages:6d}: {single:7.3f}s  {args.messages / single:9.1f} msg/s")
+
+            start = time.perf_counter()
+            for first in range(0, args.messages, args.batch_size):
+                count = min(args.batch_size, args.messages - first)
+                stub.SendMessages(exp_pb2.SendMessagesRequest(
+                    sender_user_id=sender_id, session_token=token,
+                    messages=[exp_pb2.OutgoingMessage(recipient_user_id=recipient_id,
+                                                      message_content=f"batched {first + i}")
+                              for i in range(count)]))
+            batched = time.perf_counter() - start
+            print(f"[BENCH] SendMessages of {args.batch_size:4d}: {batched:7.3f}s  "
+                  f"{args.messages / batched:9.1f} msg/s  ({single / batched:.1f}x)")
+        finally:
+            for node in nodes:
+                node.stop()
+            for server in servers:
+                server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import socket
+import logging
+import tempfile
+from concurrent import futures
+
+import grpc
+
+# Adjust import path if needed
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, PARENT_DIR)
+
+import exp_pb2
+import exp_pb2_grpc
+from raft_node import RaftNode, NodeState
+from raft_groups import group_for_message
+
+# The node under test is group 1 of 2; copies come from group 0
+GROUP_ID, NUM_GROUPS = 1, 2
+
+
+def free_port() -> int:
+    """
+    Returns a localhost port that is currently unused.
+    """
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def start_node(node_id: str, cluster_config: dict, data_dir: str, lazy_state: bool):
+    """
+    Starts a RaftNode behind its own gRPC server and waits until it leads.
+    Returns (node, server).
+    """
+    node = RaftNode(node_id, cluster_config, data_dir, sqlite_synchronous="OFF", lazy_state=lazy_state,
+                    group_id=GROUP_ID, num_groups=NUM_GROUPS)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    exp_pb2_grpc.add_RaftServiceServicer_to_server(node, server)
+    server.add_insecure_port(cluster_config[node_id])
+    server.start()
+    node._become_leader()
+    deadline = time.time() + 10.0
+    while not (node.state == NodeState.LEADER and node.last_applied >= len(node.log) - 1 >= 0):
+        assert time.time() < deadline, "node did not become leader"
+        time.sleep(0.01)
+    return node, server
+
+
+def events_since(node: RaftNode, user_id: int, offset: int) -> list:
+    """
+    Returns the types of the events published for user_id after offset.
+    """
+    subscription, backlog, _, _ = node.user_events.subscribe(user_id, resume_after=offset)
+    subscription.close()
+    return [event.type for event in backlog]
+
+
+def run(lazy_state: bool):
+    """
+    Delivers the same SEND_MESSAGE copy twice, then its DELETE_MESSAGE copy,
+    then the SEND_MESSAGE copy again, before and after a restart.
+    """
+    mode = "lazy state" if lazy_state else "full state"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cluster_config = {"solo": f"localhost:{free_port()}"}
+        node, server = start_node("solo", cluster_config, tmp_dir, lazy_state)
+        try:
+            node.create_account("alice", "hash")
+            alice = node.user_trie.get("alice").userID
+            sender = alice + 1  # A user of the other group
+            message_id = 2 * NUM_GROUPS + 1
+            assert group_for_message(message_id, NUM_GROUPS) != GROUP_ID
+            copy = {"type": "SEND_MESSAGE", "message_id": message_id, "sender_id": sender,
+                    "receiver_id": alice, "content": "hello", "timestamp": int(time.time())}
+            delete = {"type": "DELETE_MESSAGE", "message_id": message_id, "sender_id": sender,
+                      "receiver_id": alice, "timestamp": int(time.time())}
+
+            offset = node.user_events.offset
+            assert node.propose_many([copy]) and node.propose_many([copy])
+            assert [m.uid for m in node.display_conversation(alice, sender)] == [message_id]
+            assert node.get_unread_messages(alice) == [(message_id, sender, alice)]
+            assert events_since(node, alice, offset) == [exp_pb2.NEW_MESSAGE]
+            print(f"[TEST] {mode}: copy delivered twice is applied once: OK")
+
+            assert node.propose_many([delete]) and node.propose_many([copy])
+            assert node.display_conversation(alice, sender) == []
+            assert node.get_unread_messages(alice) == []
+            print(f"[TEST] {mode}: copy delivered after its delete stays deleted: OK")
+        finally:
+            node.stop()
+            server.stop(0)
+
+        node, server = start_node("solo", cluster_config, tmp_dir, lazy_state)
+        try:
+            assert node.propose_many([copy])
+            assert node.display_conversation(alice, sender) == []
+            print(f"[TEST] {mode}: deleted copy stays deleted after a restart: OK")
+        finally:
+            node.stop()
+            server.stop(0)
+
+
+def main():
+    # Keep the node's own logging out of the results
+    logging.getLogger().setLevel(logging.ERROR)
+
+    for lazy_state in (False, True):
+        run(lazy_state)
+
+
+if __name__ == "__main__":
+    main()
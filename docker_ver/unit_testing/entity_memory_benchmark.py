@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+from collections import deque
+
+# Adjust import path if needed
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, PARENT_DIR)
+
+from core_entities import Message, User
+
+
+class DictMessage:
+    """
+    Message as it was before __slots__, with a per-instance __dict__.
+    """
+    def __init__(self, uid, contents, sender_id, receiver_id, has_been_read=False, timestamp=None):
+        self.uid = uid
+        self.contents = contents
+        self.sender_id = sender_id
+        self.receiver_id = receiver_id
+        self.has_been_read = has_been_read
+        self.timestamp = timestamp if timestamp is not None else int(time.time())
+
+
+class DictUser:
+    """
+    User as it was before __slots__, with a per-instance __dict__.
+    """
+    def __init__(self, userID, username, passwordHash):
+        self.userID = userID
+        self.username = username
+        self.passwordHash = passwordHash
+        self.unread_messages = deque()
+        self.recent_conversants = []
+
+
+def measure_memory() -> float:
+    """
+    Returns the memory currently allocated through tracemalloc, in MB.
+    """
+    return tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+
+
+def run(label: str, create, num_batches: int, batch_size: int) -> float:
+    """
+    Creates batch_size entities per batch with create(i), holding them the way
+    a node does, and reports memory after each batch. Returns bytes per entity.
+    """
+    print(f"\n[TEST] {label}")
+    tracemalloc.start()
+    baseline_mem = measure_memory()
+    held = {}
+
+    for batch_num in range(1, num_batches + 1):
+        for i in range((batch_num - 1) * batch_size, batch_num * batch_size):
+            held[i] = create(i)
+        current_mem = measure_memory()
+        print(f"[TEST] Memory after batch #{batch_num}: {current_mem:.2f} MB "
+              f"(change from baseline: {current_mem - baseline_mem:.2f} MB)")
+
+    total = (measure_memory() - baseline_mem) * 1024 * 1024
+    tracemalloc.stop()
+    return total / (num_batches * batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the memory held per Message and User")
+    parser.add_argument("--batches", type=int, default=3, help="Number of batches")
+    parser.add_argument("--batch-size", type=int, default=200000, help="Entities created per batch")
+    args = parser.parse_args()
+
+    timestamp = int(time.time())
+    results = []
+    for name, before_class, after_class, create in (
+        ("Message", DictMessage, Message, lambda cls, i: cls(i, f"message number {i}", i, i + 1, False, timestamp)),
+        ("User", DictUser, User, lambda cls, i: cls(i, f"user{i}", "0" * 64)),
+    ):
+        before = run(f"Dict-backed {name}", lambda i: create(before_class, i), args.batches, args.batch_size)
+        after = run(f"__slots__ {name}", lambda i: create(after_class, i), args.batches, args.batch_size)
+        results.append((name, before, after))
+
+    print()
+    for name, before, after in results:
+        print(f"[TEST] Bytes per {name:<7}: {before:6.0f} with __dict__, {after:6.0f} with __slots__ "
+              f"({before - after:.0f} less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+
+# Adjust import path if needed
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, PARENT_DIR)
+
+from raft_commands import encode_command, decode_command
+from raft_storage import RaftStorage, UPSERT_LOG_ENTRY, SELECT_LOG_ENTRIES
+
+
+def make_command(i: int) -> dict:
+    """
+    Returns a SEND_MESSAGE command, roughly the size of a real chat entry.
+    """
+    return {
+        "type": "SEND_MESSAGE",
+        "sender_id": 1 + i % 50,
+        "receiver_id": 51 + i % 50,
+        "content": f"benchmark message number {i}",
+        "timestamp": int(time.time())
+    }
+
+
+def per_entry_us(fn, items) -> float:
+    """
+    Runs fn over items and returns the microseconds spent per item.
+    """
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def bench_persist(db_path: str, encoded: list) -> float:
+    """
+    Writes the encoded entries to log_entries in one transaction, as the group
+    commit stage does, and reads them back. Returns microseconds per entry.
+    """
+    storage = RaftStorage(db_path, synchronous="FULL")
+    storage.init_schema()
+    start = time.perf_counter()
+    storage.executemany(UPSERT_LOG_ENTRY, [(i, 1, command) for i, command in enumerate(encoded)])
+    with storage.reader() as conn:
+        conn.execute(SELECT_LOG_ENTRIES, (-1,)).fetchall()
+    elapsed = time.perf_counter() - start
+    storage.close()
+    return elapsed / len(encoded) * 1e6
+
+
+def bench_migrate(db_path: str, num_entries: int) -> float:
+    """
+    Seeds a log of JSON entries, then decodes and rewrites every one in the
+    binary encoding the way RaftNode does at startup. Returns seconds.
+    """
+    storage = RaftStorage(db_path, synchronous="FULL")
+    storage.init_schema()
+    storage.executemany(UPSERT_LOG_ENTRY, [(i, 1, json.dumps(make_command(i))) for i in range(num_entries)])
+    start = time.perf_counter()
+    with storage.reader() as conn:
+        rows = conn.execute(SELECT_LOG_ENTRIES, (-1,)).fetchall()
+    storage.executemany(UPSERT_LOG_ENTRY, [(i, term, encode_command(decode_command(command)))
+                                           for i, (term, command) in enumerate(rows)])
+    elapsed = time.perf_counter() - start
+    storage.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON and binary log-entry encodings")
+    parser.add_argument("--entries", type=int, default=50000, help="Log entries per measurement")
+    args = parser.parse_args()
+
+    commands = [make_command(i) for i in range(args.entries)]
+    as_json = [json.dumps(command) for command in commands]
+    as_binary = [encode_command(command) for command in commands]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"[BENCH] {args.entries} SEND_MESSAGE entries, microseconds per entry")
+        for label, encode, decode, encoded in (("JSON  ", json.dumps, json.loads, as_json),
+                                               ("binary", encode_command, decode_command, as_binary)):
+            size = sum(len(command) for command in encoded) / len(encoded)
+            encode_us = per_entry_us(encode, commands)
+            decode_us = per_entry_us(decode, encoded)
+            persist_us = bench_persist(os.path.join(tmp_dir, f"{label.strip()}.db"), encoded)
+            print(f"[BENCH] {label}: {size:6.1f} bytes  encode {encode_us:6.2f}  decode {decode_us:6.2f}  "
+                  f"persist+load {persist_us:6.2f}")
+
+        elapsed = bench_migrate(os.path.join(tmp_dir, "migrate.db"), args.entries)
+        print(f"[BENCH] Migrating {args.entries} JSON entries: {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
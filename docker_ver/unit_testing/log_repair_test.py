@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import argparse
+import tempfile
+from concurrent import futures
+
+import grpc
+
+# Adjust import path if needed
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, PARENT_DIR)
+
+import exp_pb2_grpc
+from raft_node import RaftNode
+from raft_storage import RaftStorage, UPSERT_LOG_ENTRY, UPSERT_RAFT_STATE
+
+
+def free_port() -> int:
+    """
+    Returns a localhost port that is currently unused.
+    """
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def seed_node(data_dir: str, node_id: str, current_term: int, terms: list):
+    """
+    Writes a node's database before it starts: its current term and one
+    no-op log entry per element of terms.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    storage = RaftStorage(os.path.join(data_dir, f"node_{node_id}.db"), synchronous="OFF")
+    storage.init_schema()
+    storage.executemany(UPSERT_RAFT_STATE, [("current_term", str(current_term)), ("voted_for", "None")])
+    storage.executemany(UPSERT_LOG_ENTRY, [
+        (i, term, json.dumps({"type": "NOOP", "seq": i, "term": term})) for i, term in enumerate(terms)
+    ])
+    storage.close()
+
+
+def start_node(node_id: str, cluster_config: dict, data_dir: str):
+    """
+    Starts a RaftNode behind its own gRPC server. Returns (node, server).
+    """
+    node = RaftNode(node_id, cluster_config, data_dir, sqlite_synchronous="OFF")
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    exp_pb2_grpc.add_RaftServiceServicer_to_server(node, server)
+    server.add_insecure_port(cluster_config[node_id])
+    server.start()
+    return node, server
+
+
+def measure_repair(shared: int, divergent_terms: int, entries_per_term: int, timeout: float = 120.0) -> float:
+    """
+    Leader and follower agree on `shared` entries, after which the follower holds
+    `divergent_terms` stale terms of `entries_per_term` entries each that the
+    leader never had. Returns seconds until the follower's log matches the leader's
+    (including the no-op the leader appends when it takes over).
+    """
+    diverged = divergent_terms * entries_per_term
+    leader_terms = [1] * shared + [divergent_terms + 2] * diverged
+    follower_terms = [1] * shared + [2 + i // entries_per_term for i in range(diverged)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cluster_config = {
+            "leader": f"localhost:{free_port()}",
+            "follower": f"localhost:{free_port()}",
+        }
+        seed_node(os.path.join(tmp_dir, "leader"), "leader", leader_terms[-1], leader_terms)
+        seed_node(os.path.join(tmp_dir, "follower"), "follower", follower_terms[-1], follower_terms)
+
+        follower, follower_server = start_node("follower", cluster_config, os.path.join(tmp_dir, "follower"))
+        leader, leader_server = start_node("leader", cluster_config, os.path.join(tmp_dir, "leader"))
+
+        try:
+            start = time.perf_counter()
+            leader._become_leader()
+            while time.perf_counter() - start < timeout:
+                with leader.lock:
+                    leader_terms_now = [term for term, _ in leader.log]
+                with follower.lock:
+                    follower_terms_now = [term for term, _ in follower.log]
+                if follower_terms_now == leader_terms_now:
+                    return time.perf_counter() - start
+                time.sleep(0.01)
+            return float("inf")
+        finally:
+            leader.stop()
+            follower.stop()
+            leader_server.stop(0)
+            follower_server.stop(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how long a divergent follower takes to repair its log")
+    parser.add_argument("--shared", type=int, default=100, help="Entries both logs agree on")
+    args = parser.parse_args()
+
+    # Keep the per-RPC logging of both nodes out of the results
+    logging.getLogger().setLevel(logging.WARNING)
+
+    for divergent_terms, entries_per_term in ((1, 1000), (1, 10000), (10, 1000)):
+        elapsed = measure_repair(args.shared, divergent_terms, entries_per_term)
+        print(f"[TEST] {divergent_terms:>2} divergent term(s) x {entries_per_term:>5} entries: "
+              f"repaired in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
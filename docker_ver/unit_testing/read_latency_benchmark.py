@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import socket
+import logging
+import argparse
+import tempfile
+from concurrent import futures
+
+import grpc
+
+# Adjust import path if needed
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, PARENT_DIR)
+
+import exp_pb2_grpc
+from raft_node import RaftNode, NodeState
+
+
+def free_port() -> int:
+    """
+    Returns a localhost port that is currently unused.
+    """
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def start_cluster(data_dir: str, size: int):
+    """
+    Starts size RaftNodes, each behind its own gRPC server, and waits for a
+    leader. Returns (nodes, servers, leader).
+    """
+    cluster_config = {f"node{i}": f"localhost:{free_port()}" for i in range(size)}
+    nodes, servers = [], []
+    for node_id, address in cluster_config.items():
+        node = RaftNode(node_id, cluster_config, os.path.join(data_dir, node_id), sqlite_synchronous="OFF")
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+        exp_pb2_grpc.add_RaftServiceServicer_to_server(node, server)
+        server.add_insecure_port(address)
+        server.start()
+        nodes.append(node)
+        servers.append(server)
+
+    while True:
+        leaders = [node for node in nodes if node.state == NodeState.LEADER]
+        if leaders and leaders[0].wait_for_linearizable_read():
+            return nodes, servers, leaders[0]
+        time.sleep(0.1)
+
+
+def measure_reads(node: RaftNode, num_reads: int) -> list:
+    """
+    Returns the sorted latencies, in seconds, of num_reads linearizable read checks on node.
+    """
+    latencies = []
+    for _ in range(num_reads):
+        start = time.perf_counter()
+        if not node.wait_for_linearizable_read():
+            raise RuntimeError(f"Read on {node.node_id} could not be confirmed")
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare read latency of ReadIndex and leader leases")
+    parser.add_argument("--nodes", type=int, default=3, help="Cluster size")
+    parser.add_argument("--reads", type=int, default=2000, help="Reads per configuration")
+    args = parser.parse_args()
+
+    # Keep the nodes' own logging out of the results
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        nodes, servers, leader = start_cluster(tmp_dir, args.nodes)
+        follower = next(node for node in nodes if node is not leader)
+        try:
+            print(f"[BENCH] {args.nodes} nodes, {args.reads} reads per configuration")
+            for label, node, lease_reads in (("leader, ReadIndex  ", leader, False),
+                                             ("leader, lease      ", leader, True),
+                                             ("follower, ReadIndex", follower, False)):
+                leader.lease_reads = lease_reads
+                latencies = measure_reads(node, args.reads)
+                p50 = latencies[len(latencies) // 2] * 1000
+                p99 = latencies[int(len(latencies) * 0.99)] * 1000
+                print(f"[BENCH] {label}: p50 {p50:7.3f}ms  p99 {p99:7.3f}ms")
+        finally:
+            for node in nodes:
+                node.stop()
+            for server in servers:
+                server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+# Adjust import path if needed
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, PARENT_DIR)
+
+from raft_node import RaftNode
+from raft_storage import RaftStorage, UPSERT_USER, UPSERT_MESSAGE, UPSERT_RAFT_STATE
+
+
+def seed_database(db_path: str, num_users: int, num_messages: int):
+    """
+    Writes a node database holding num_users users who have exchanged
+    num_messages messages, with every message already applied.
+    """
+    storage = RaftStorage(db_path, synchronous="OFF")
+    storage.init_schema()
+    storage.executemany(UPSERT_USER, [
+        (user_id, f"user{user_id}", "hash", json.dumps({"unread_messages": [], "recent_conversants": []}))
+        for user_id in range(1, num_users + 1)
+    ])
+    batch = []
+    for message_id in range(1, num_messages + 1):
+        sender_id = message_id % num_users + 1
+        receiver_id = (message_id * 7) % num_users + 1
+        batch.append((message_id, sender_id, receiver_id, f"benchmark message {message_id}", 1, int(time.time())))
+        if len(batch) == 50000:
+            storage.executemany(UPSERT_MESSAGE, batch)
+            batch = []
+    storage.executemany(UPSERT_MESSAGE, batch)
+    storage.executemany(UPSERT_RAFT_STATE, [("current_term", "1"), ("voted_for", "None")])
+    storage.close()
+
+
+def time_startup(data_dir: str, lazy_state: bool) -> float:
+    """
+    Returns seconds taken to construct a RaftNode over the seeded database.
+    """
+    start = time.perf_counter()
+    node = RaftNode("bench", {"bench": "localhost:0"}, data_dir, lazy_state=lazy_state)
+    elapsed = time.perf_counter() - start
+    node.stop()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RaftNode startup with eager vs lazy state loading")
+    parser.add_argument("--users", type=int, default=1000, help="Number of users")
+    parser.add_argument("--messages", type=int, default=500000, help="Number of messages")
+    args = parser.parse_args()
+
+    # Keep the nodes' own logging out of the results
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"[BENCH] Seeding {args.users} users and {args.messages} messages")
+        seed_database(os.path.join(tmp_dir, "node_bench.db"), args.users, args.messages)
+
+        for lazy_state in (False, True):
+            label = "lazy " if lazy_state else "eager"
+            print(f"[BENCH] {label} startup: {time_startup(tmp_dir, lazy_state):8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+import os
+import sys
+import asyncio
+import threading
+
+# Adjust import path if needed
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, PARENT_DIR)
+
+from raft_steps import Wait, run_steps, run_steps_async
+
+
+class FakeNode:
+    """
+    Stands in for a RaftNode: _submit returns the next log index, or raises
+    once fail is set, blocking or awaitably.
+    """
+    def __init__(self):
+        self.next_index = 1
+        self.fail = False
+
+    def _submit(self, command):
+        if self.fail:
+            raise RuntimeError("lost leadership")
+        self.next_index += 1
+        return self.next_index - 1
+
+    async def _submit_async(self, command):
+        await asyncio.sleep(0)
+        return self._submit(command)
+
+
+def operation(node, threads):
+    """
+    Submits two commands and returns their indexes, or "failed" if a submit
+    raised. Records the thread each run of local work happened on.
+    """
+    threads.append(threading.get_ident())
+    try:
+        first = yield Wait(node, "_submit", {"type": "A"})
+        threads.append(threading.get_ident())
+        second = yield Wait(node, "_submit", {"type": "B"})
+    except RuntimeError:
+        threads.append(threading.get_ident())
+        return "failed"
+    threads.append(threading.get_ident())
+    return [first, second]
+
+
+def nested(node, threads):
+    """
+    Runs operation as a sub-step and adds to its result.
+    """
+    indexes = yield from operation(node, threads)
+    return indexes + [(yield Wait(node, "_submit", {"type": "C"}))]
+
+
+async def run_async(steps):
+    """
+    Drives steps from an event loop. Returns (result, the loop's thread).
+    """
+    return await run_steps_async(steps), threading.get_ident()
+
+
+def main():
+    threads = []
+    assert run_steps(operation(FakeNode(), threads)) == [1, 2]
+    assert set(threads) == {threading.get_ident()}
+    print("[TEST] run_steps runs the operation on the calling thread: OK")
+
+    threads = []
+    result, loop_thread = asyncio.run(run_async(operation(FakeNode(), threads)))
+    assert result == [1, 2]
+    assert len(threads) == 3 and loop_thread not in threads
+    print("[TEST] run_steps_async gives the same result, with local work off the loop: OK")
+
+    node = FakeNode()
+    node.fail = True
+    assert run_steps(operation(node, [])) == "failed"
+    assert asyncio.run(run_async(operation(node, [])))[0] == "failed"
+    print("[TEST] An error from a wait is raised inside the operation: OK")
+
+    assert run_steps(nested(FakeNode(), [])) == [1, 2, 3]
+    assert asyncio.run(run_async(nested(FakeNode(), [])))[0] == [1, 2, 3]
+    print("[TEST] Operations compose with yield from: OK")
+
+
+if __name__ == "__main__":
+    main()
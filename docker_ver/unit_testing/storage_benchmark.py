@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import sqlite3
+import tempfile
+import argparse
+import threading
+
+# Adjust import path if needed
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, PARENT_DIR)
+
+from raft_storage import RaftStorage, GroupCommitLog, UPSERT_LOG_ENTRY
+
+
+def make_command(i: int) -> str:
+    """
+    Returns a JSON-encoded SEND_MESSAGE command, roughly the size of a real chat entry.
+    """
+    return json.dumps({
+        "type": "SEND_MESSAGE",
+        "message_id": i,
+        "sender_id": 1,
+        "receiver_id": 2,
+        "content": f"benchmark message number {i}",
+        "timestamp": int(time.time())
+    })
+
+
+def bench_connect_per_write(db_path: str, num_writes: int) -> float:
+    """
+    The previous RaftNode persistence pattern: connect, write, commit and close per entry.
+    Returns writes/sec.
+    """
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS log_entries (log_index INTEGER PRIMARY KEY, term INTEGER, command TEXT)")
+    conn.commit()
+    conn.close()
+
+    start = time.perf_counter()
+    for i in range(num_writes):
+        conn = sqlite3.connect(db_path)
+        c = conn.cursor()
+        c.execute("INSERT OR REPLACE INTO log_entries VALUES (?, ?, ?)", (i, 1, make_command(i)))
+        conn.commit()
+        conn.close()
+    elapsed = time.perf_counter() - start
+    return num_writes / elapsed
+
+
+def bench_storage(db_path: str, num_writes: int, synchronous: str) -> float:
+    """
+    RaftStorage with a long-lived writer connection in WAL mode, one transaction per entry.
+    Returns writes/sec.
+    """
+    storage = RaftStorage(db_path, synchronous=synchronous)
+    storage.init_schema()
+
+    start = time.perf_counter()
+    for i in range(num_writes):
+        storage.execute(UPSERT_LOG_ENTRY, (i, 1, make_command(i)))
+    elapsed = time.perf_counter() - start
+
+    storage.close()
+    return num_writes / elapsed
+
+
+def bench_concurrent(db_path: str, num_writes: int, num_threads: int, group_commit: bool) -> float:
+    """
+    num_threads writers each append their share of entries, waiting for durability
+    after every entry the way a client request does. Returns writes/sec.
+    """
+    storage = RaftStorage(db_path, synchronous="FULL")
+    storage.init_schema()
+    log_writer = GroupCommitLog(storage) if group_commit else None
+    next_index = iter(range(num_writes))
+    index_lock = threading.Lock()
+
+    def writer():
+        for _ in range(num_writes // num_threads):
+            with index_lock:
+                i = next(next_index)
+            row = (i, 1, make_command(i))
+            if log_writer:
+                log_writer.append(row).result()
+            else:
+                storage.execute(UPSERT_LOG_ENTRY, row)
+
+    threads = [threading.Thread(target=writer) for _ in range(num_threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    if log_writer:
+        print(f"[BENCH]     {log_writer.rows_flushed} rows in {log_writer.batches_flushed} transactions")
+        log_writer.close()
+    storage.close()
+    return (num_writes // num_threads) * num_threads / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RaftNode log persistence")
+    parser.add_argument("--writes", type=int, default=2000, help="Number of log entries to write")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"[BENCH] Writing {args.writes} log entries per configuration")
+
+        rate = bench_connect_per_write(os.path.join(tmp_dir, "legacy.db"), args.writes)
+        print(f"[BENCH] connect-per-write (rollback journal): {rate:10.1f} writes/sec")
+        baseline = rate
+
+        for synchronous in ("FULL", "NORMAL"):
+            rate = bench_storage(os.path.join(tmp_dir, f"storage_{synchronous}.db"), args.writes, synchronous)
+            print(f"[BENCH] RaftStorage WAL synchronous={synchronous:<6}:   {rate:10.1f} writes/sec "
+                  f"({rate / baseline:.1f}x)")
+
+        print("\n[BENCH] Concurrent appends, synchronous=FULL")
+        for num_threads in (1, 4, 16, 64):
+            for group_commit in (False, True):
+                label = "group commit " if group_commit else "per-request  "
+                db_path = os.path.join(tmp_dir, f"concurrent_{num_threads}_{int(group_commit)}.db")
+                rate = bench_concurrent(db_path, args.writes, num_threads, group_commit)
+                print(f"[BENCH] {label} threads={num_threads:<3}: {rate:10.1f} writes/sec")
+
+
+if __name__ == "__main__":
+    main()
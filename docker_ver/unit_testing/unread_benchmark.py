@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import random
+import argparse
+from collections import deque
+
+# Adjust import path if needed
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, PARENT_DIR)
+
+from core_entities import User
+
+
+class DequeUser(User):
+    """
+    User with the previous deque unread queue and list of recent conversants.
+    """
+    __slots__ = ()
+
+    def __init__(self, userID: int, username: str, passwordHash: str):
+        super().__init__(userID, username, passwordHash)
+        self.unread_messages = deque()
+        self.recent_conversants = []
+
+    def add_unread_message(self, message_uid: int):
+        self.unread_messages.append(message_uid)
+
+    def mark_message_read(self, message_uid: int) -> bool:
+        try:
+            self.unread_messages.remove(message_uid)
+            return True
+        except ValueError:
+            return False
+
+    def update_recent_conversant(self, user_id: int):
+        if user_id in self.recent_conversants:
+            self.recent_conversants.remove(user_id)
+        self.recent_conversants.insert(0, user_id)
+
+
+def pop_oldest(user: User) -> int:
+    """
+    Takes the oldest unread UID the way READ_MESSAGES does.
+    """
+    if isinstance(user.unread_messages, deque):
+        return user.unread_messages.popleft()
+    return user.unread_messages.popitem(last=False)[0]
+
+
+def timed(fn) -> float:
+    """
+    Returns the seconds fn takes.
+    """
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run(user_class, unread: int, marks: int, conversants: int, updates: int) -> dict:
+    """
+    Times each unread and recent-conversant operation on one user. Returns
+    microseconds per operation by name.
+    """
+    rng = random.Random(0)
+    user = user_class(1, "reader", "hash")
+    to_mark = rng.sample(range(unread), marks)
+    partners = [rng.randrange(conversants) for _ in range(updates)]
+
+    results = {}
+    results["add"] = timed(lambda: [user.add_unread_message(uid) for uid in range(unread)]) / unread
+    results["mark read"] = timed(lambda: [user.mark_message_read(uid) for uid in to_mark]) / marks
+    results["count"] = timed(lambda: [len(user.unread_messages) for _ in range(marks)]) / marks
+    remaining = unread - marks
+    results["pop oldest"] = timed(lambda: [pop_oldest(user) for _ in range(remaining)]) / remaining
+    results["recent update"] = timed(lambda: [user.update_recent_conversant(p) for p in partners]) / updates
+    return {name: seconds * 1e6 for name, seconds in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark unread tracking and recent conversants")
+    parser.add_argument("--unread", type=int, default=100000, help="Unread messages held by the user")
+    parser.add_argument("--marks", type=int, default=5000, help="Messages marked read by ID")
+    parser.add_argument("--conversants", type=int, default=10000, help="Distinct conversation partners")
+    parser.add_argument("--updates", type=int, default=20000, help="Recent-conversant updates")
+    args = parser.parse_args()
+
+    print(f"[BENCH] {args.unread} unread, {args.marks} marked read by ID, "
+          f"{args.updates} updates over {args.conversants} conversants; microseconds per operation")
+    before = run(DequeUser, args.unread, args.marks, args.conversants, args.updates)
+    after = run(User, args.unread, args.marks, args.conversants, args.updates)
+    for name in before:
+        print(f"[BENCH] {name:<14}: deque/list {before[name]:10.3f}  ordered set {after[name]:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
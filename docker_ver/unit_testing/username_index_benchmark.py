@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+import os
+import re
+import sys
+import time
+import argparse
+
+# Adjust import path if needed
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, PARENT_DIR)
+
+from core_structures import GlobalUserTrie
+
+
+def scan_search(store: dict, pattern: str) -> list:
+    """
+    The previous GlobalUserTrie.regex_search: a regex per username over the whole store.
+    """
+    results = []
+    for key in store:
+        if re.fullmatch(pattern.replace("*", ".*").replace("?", "."), key):
+            results.append(key)
+    return results
+
+
+def time_ms(fn, repeats: int) -> float:
+    """
+    Returns the mean milliseconds per call of fn over repeats calls.
+    """
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ListAccounts username queries")
+    parser.add_argument("--users", type=int, default=1000000, help="Usernames in the index")
+    parser.add_argument("--repeats", type=int, default=1000, help="Calls per indexed query")
+    args = parser.parse_args()
+
+    index = GlobalUserTrie()
+    start = time.perf_counter()
+    for i in range(args.users):
+        index.add(f"user{i}", None)
+    index.regex_search("")  # Sorts the names added so far
+    print(f"[BENCH] Indexed {args.users} usernames in {time.perf_counter() - start:.2f}s")
+
+    queries = (
+        ("user12345*", None),
+        ("user1*", 100),
+        ("*", 100),
+        ("user99999?", None),
+        ("user4242", None),
+        ("*777", None),
+    )
+    for pattern, limit in queries:
+        matches = len(index.regex_search(pattern, limit=limit))
+        repeats = args.repeats if pattern[0] != "*" or limit else 3
+        indexed = time_ms(lambda: index.regex_search(pattern, limit=limit), repeats)
+        scanned = time_ms(lambda: scan_search(index.store, pattern), 1)
+        print(f"[BENCH] {pattern:<12} limit={str(limit):<4} {matches:6d} matches: "
+              f"indexed {indexed:9.4f}ms  full scan {scanned:9.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
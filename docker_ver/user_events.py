@@ -0,0 +1,181 @@
+# user_events.py
+import asyncio
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+# Key under which account events are published; they go to the subscriptions
+# watching the hub's accounts rather than to one user, and are not retained
+ACCOUNT_EVENTS = -1
+
+
+class Subscription:
+    """
+    A live feed of one user's events, and of the account events of every hub
+    it watches. Events are queued as they are published; get() blocks until the
+    next one arrives or the subscription is closed, and get_async() awaits it
+    the same way from an event loop.
+    """
+    def __init__(self, hub: "UserEventHub", user_id: int, max_pending: int):
+        self.user_id = user_id
+        self._hubs = [hub]
+        self._max_pending = max_pending
+        self._pending: Deque[Any] = deque()
+        self._cond = threading.Condition()
+        self.closed = False
+        # Set when the subscriber fell too far behind and events were dropped
+        self.overflowed = False
+        self._async_waiter = None  # (loop, asyncio.Future) of a pending get_async()
+
+    def _wake(self):
+        # Called with _cond held after the queue or closed flag changed
+        self._cond.notify()
+        if self._async_waiter is not None:
+            loop, waiter = self._async_waiter
+            self._async_waiter = None
+            loop.call_soon_threadsafe(lambda: waiter.done() or waiter.set_result(None))
+
+    def _push(self, event: Any):
+        with self._cond:
+            if self.closed:
+                return
+            if len(self._pending) >= self._max_pending:
+                self.overflowed = True
+                self.closed = True
+            else:
+                self._pending.append(event)
+            self._wake()
+
+    def get(self) -> Optional[Any]:
+        """Return the next event, or None once the subscription is closed and drained."""
+        with self._cond:
+            while not self._pending and not self.closed:
+                self._cond.wait()
+            if self._pending and not self.overflowed:
+                return self._pending.popleft()
+            return None
+
+    async def get_async(self) -> Optional[Any]:
+        """Awaitable get(), for the asyncio server; waits without holding a thread."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._pending or self.closed:
+                    if self._pending and not self.overflowed:
+                        return self._pending.popleft()
+                    return None
+                waiter = loop.create_future()
+                self._async_waiter = (loop, waiter)
+            await waiter
+
+    def close(self):
+        """Stop the feed and wake a blocked get() or get_async(). Safe to call more than once."""
+        with self._cond:
+            self.closed = True
+            self._wake()
+        for hub in list(self._hubs):
+            hub._remove(self)
+
+
+class UserEventHub:
+    """
+    Fans out per-user events produced by applied log entries to live
+    subscriptions, and keeps each user's most recent events so a client that
+    reconnects can resume from the offset (log index) of the last event it saw.
+
+    An offset can be resumed from only if every event after it is still held;
+    otherwise the subscriber is told to resynchronise.
+    """
+    def __init__(self, start_offset: int = 0, retained_per_user: int = 1000,
+                 max_subscribers: Optional[int] = None, max_pending: int = 10000):
+        self._lock = threading.Lock()
+        self._retained_per_user = retained_per_user
+        self._max_subscribers = max_subscribers
+        self._max_pending = max_pending
+        self._subscriptions: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._account_watchers: Set[Subscription] = set()
+        self._subscriber_count = 0
+        self._recent: Dict[int, Deque[Tuple[int, Any]]] = {}
+        # Per user, the offset from which retained events are complete
+        self._floors: Dict[int, int] = {}
+        self._start_offset = start_offset
+        self.offset = start_offset  # Offset of the last published entry
+
+    def publish(self, offset: int, events: Iterable[Tuple[int, Any]]):
+        """
+        Record the (user_id, event) pairs produced by the entry at `offset`. Pairs
+        keyed ACCOUNT_EVENTS are pushed to the account watchers instead.
+        """
+        with self._lock:
+            self.offset = offset
+            for user_id, event in events:
+                if user_id == ACCOUNT_EVENTS:
+                    for subscription in self._account_watchers:
+                        subscription._push(event)
+                    continue
+                recent = self._recent.get(user_id)
+                if recent is None:
+                    recent = self._recent[user_id] = deque()
+                recent.append((offset, event))
+                if len(recent) > self._retained_per_user:
+                    dropped_offset, _ = recent.popleft()
+                    self._floors[user_id] = dropped_offset
+                for subscription in self._subscriptions.get(user_id, ()):
+                    subscription._push(event)
+
+    def subscribe(self, user_id: int, resume_after: Optional[int] = None
+                  ) -> Tuple[Optional[Subscription], List[Any], bool, int]:
+        """
+        Start a live feed for a user.
+
+        Returns (subscription, backlog, complete, offset). The backlog holds the
+        retained events after resume_after; complete is False if some of them
+        were no longer held. offset is the last offset published so far. The
+        subscription is None if the subscriber limit has been reached.
+        """
+        with self._lock:
+            if self._max_subscribers is not None and self._subscriber_count >= self._max_subscribers:
+                return None, [], False, self.offset
+            subscription = Subscription(self, user_id, self._max_pending)
+            self._subscriptions[user_id].add(subscription)
+            self._subscriber_count += 1
+
+            if resume_after is None:
+                return subscription, [], True, self.offset
+            floor = max(self._floors.get(user_id, self._start_offset), self._start_offset)
+            complete = resume_after >= floor
+            backlog = [event for offset, event in self._recent.get(user_id, ()) if offset > resume_after]
+            return subscription, backlog, complete, self.offset
+
+    def watch_accounts(self, subscription: Subscription):
+        """Push this hub's account events to a subscription, which may belong to another hub."""
+        with self._lock:
+            self._account_watchers.add(subscription)
+        subscription._hubs.append(self)
+        if subscription.closed:
+            self._remove(subscription)
+
+    def reset(self, offset: int):
+        """
+        Forget retained events, e.g. after a snapshot replaced the state. Live
+        subscriptions, and those watching the accounts, are closed so their
+        clients resynchronise.
+        """
+        with self._lock:
+            self._recent.clear()
+            self._floors.clear()
+            self._start_offset = offset
+            self.offset = offset
+            subscriptions = {s for subs in self._subscriptions.values() for s in subs} | self._account_watchers
+        for subscription in subscriptions:
+            subscription.close()
+
+    def _remove(self, subscription: Subscription):
+        with self._lock:
+            self._account_watchers.discard(subscription)
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                self._subscriber_count -= 1
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
@@ -1,9 +1,12 @@
 import re
-from typing import Optional, List, TypeVar, Generic, Union, Tuple
+from typing import Dict, Optional, List, TypeVar, Generic, Union, Tuple
 
 T = TypeVar('T')
 
 class TSTNode(Generic[T]):
+    # Slots instead of a per-node __dict__: a tree holds a node per character
+    __slots__ = ("char", "left", "eq", "right", "is_end", "value")
+
     def __init__(self, char: str):
         self.char = char
         self.left: Optional[TSTNode[T]] = None
@@ -13,6 +16,10 @@ class TSTNode(Generic[T]):
         self.value: Optional[T] = None
 
 class TernarySearchTree(Generic[T]):  # Key fix: make the class Generic[T]
+    """
+    Ternary search tree mapping words to values. Every operation walks the tree
+    iteratively, so long keys can't hit the recursion limit.
+    """
     def __init__(self):
         self.root: Optional[TSTNode[T]] = None
 
@@ -20,24 +27,29 @@ class TernarySearchTree(Generic[T]):  # Key fix: make the class Generic[T]
         """Add a word to the TST, optionally with a value."""
         if not word:
             return
-        self.root = self._add(self.root, word, value, 0)
-
-    def _add(self, node: Optional[TSTNode[T]], word: str, value: Optional[T], index: int) -> TSTNode[T]:
-        char = word[index]
-        if node is None:
-            node = TSTNode[T](char)  # Note: Added [T] here
-        
-        if char < node.char:
-            node.left = self._add(node.left, word, value, index)
-        elif char > node.char:
-            node.right = self._add(node.right, word, value, index)
-        else:
-            if index + 1 == len(word):
-                node.is_end = True
-                node.value = value
+        if self.root is None:
+            self.root = TSTNode(word[0])
+        node = self.root
+        index = 0
+        while True:
+            char = word[index]
+            if char < node.char:
+                if node.left is None:
+                    node.left = TSTNode(char)
+                node = node.left
+            elif char > node.char:
+                if node.right is None:
+                    node.right = TSTNode(char)
+                node = node.right
             else:
-                node.eq = self._add(node.eq, word, value, index + 1)
-        return node
+                index += 1
+                if index == len(word):
+                    node.is_end = True
+                    node.value = value
+                    return
+                if node.eq is None:
+                    node.eq = TSTNode(word[index])
+                node = node.eq
 
     def get(self, word: str) -> Optional[T]:
         """Get the value associated with a word."""
@@ -62,62 +74,111 @@ class TernarySearchTree(Generic[T]):  # Key fix: make the class Generic[T]
         return None
 
     def delete(self, word: str) -> None:
-        """Delete a word from the TST."""
+        """Delete a word from the TST, pruning nodes that no longer lead to a word."""
         if not word:
             return
-        self.root = self._delete(self.root, word, 0)
-
-    def _delete(self, node: Optional[TSTNode[T]], word: str, index: int) -> Optional[TSTNode[T]]:
-        if node is None:
-            return None
 
-        char = word[index]
-        if char < node.char:
-            node.left = self._delete(node.left, word, index)
-        elif char > node.char:
-            node.right = self._delete(node.right, word, index)
-        else:
-            if index + 1 == len(word):
-                node.is_end = False
-                node.value = None
+        # (parent, attribute of parent holding node) for each node on the path
+        path: List[Tuple[Optional[TSTNode[T]], str]] = []
+        parent: Optional[TSTNode[T]] = None
+        attr = "root"
+        node = self.root
+        index = 0
+        while node is not None:
+            path.append((parent, attr))
+            char = word[index]
+            if char < node.char:
+                parent, attr, node = node, "left", node.left
+            elif char > node.char:
+                parent, attr, node = node, "right", node.right
+            elif index + 1 < len(word):
+                parent, attr, node = node, "eq", node.eq
+                index += 1
             else:
-                node.eq = self._delete(node.eq, word, index + 1)
+                break
+        if node is None or not node.is_end:
+            return
+        node.is_end = False
+        node.value = None
 
-        if not node.is_end and node.eq is None:
-            if node.left is None and node.right is None:
-                return None
-        return node
+        # Unlink childless nodes from the end of the path upwards
+        for parent, attr in reversed(path):
+            holder = self if parent is None else parent
+            node = getattr(holder, attr)
+            if node.is_end or node.eq is not None or node.left is not None or node.right is not None:
+                break
+            setattr(holder, attr, None)
 
     def regex_search(self, pattern: str, return_values: bool = False) -> Union[List[str], List[T]]:
         """
-        Search for matches using wildcards (* and ?).
+        Search for matches using wildcards (* and ?), in word order.
         If return_values is True, returns list of values, otherwise returns list of words.
+
+        Up to the first *, the walk follows the pattern: a literal character
+        descends only the branch holding it and ? every branch at its position,
+        so words outside a literal prefix are never visited. Below that point
+        each word is checked against one compiled regex for the rest of the pattern.
         """
-        regex_pattern = '^' + re.escape(pattern).replace(r'\*', '.*').replace(r'\?', '.') + '$'
-        prog = re.compile(regex_pattern)
-        
-        results: List[Tuple[str, Optional[T]]] = []
-        self._collect(self.root, "", results)
-        
+        star = pattern.find("*")
+        if star < 0:
+            star = len(pattern)
+        rest = pattern[star:]
+        only_stars = not rest.strip("*")
+        if not only_stars:
+            regex = "".join(".*" if c == "*" else "." if c == "?" else re.escape(c) for c in rest)
+            rest_matches = re.compile(regex, re.DOTALL).fullmatch
+        else:
+            rest_matches = None
+
+        matches: Dict[str, Optional[T]] = {}
+        # Walk to the levels where the part before the first * has been matched:
+        # (node, pattern position, characters above node's level)
+        stack: List[Tuple[Optional[TSTNode[T]], int, str]] = [(self.root, 0, "")]
+        levels: List[Tuple[TSTNode[T], str]] = []
+        while stack:
+            node, i, prefix = stack.pop()
+            if node is None:
+                continue
+            if i == star:
+                levels.append((node, prefix))
+                continue
+            symbol = pattern[i]
+            if symbol == "?":
+                stack.append((node.left, i, prefix))
+                stack.append((node.right, i, prefix))
+            elif symbol < node.char:
+                stack.append((node.left, i, prefix))
+                continue
+            elif symbol > node.char:
+                stack.append((node.right, i, prefix))
+                continue
+            word = prefix + node.char
+            if node.is_end and i + 1 == star and only_stars:
+                matches[word] = node.value
+            stack.append((node.eq, i + 1, word))
+
+        # Words that continue below those levels, if the pattern has a *
+        if star < len(pattern):
+            for level, prefix in levels:
+                start = len(prefix)
+                subtree = [(level, prefix)]
+                while subtree:
+                    node, prefix = subtree.pop()
+                    if node.left is not None:
+                        subtree.append((node.left, prefix))
+                    if node.right is not None:
+                        subtree.append((node.right, prefix))
+                    word = prefix + node.char
+                    if node.eq is not None:
+                        subtree.append((node.eq, word))
+                    if node.is_end and (rest_matches is None or rest_matches(word, start)):
+                        matches[word] = node.value
+
+        words = sorted(matches)
         if return_values:
-            return [value for word, value in results if prog.match(word) and value is not None]
+            return [matches[word] for word in words if matches[word] is not None]
         else:
-            return [word for word, _ in results if prog.match(word)]
-
-    def _collect(self, node: Optional[TSTNode[T]], prefix: str, 
-                result: List[Tuple[str, Optional[T]]]) -> None:
-        """Collect all (word, value) pairs in the tree."""
-        if node is None:
-            return
-
-        self._collect(node.left, prefix, result)
-
-        new_prefix = prefix + node.char
-        if node.is_end:
-            result.append((new_prefix, node.value))
-
-        self._collect(node.eq, new_prefix, result)
-        self._collect(node.right, prefix, result)
+            return words
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+
+# Adjust import path if needed
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, PARENT_DIR)
+# The replicated server's username index; its core_structures shadows this directory's
+sys.path.insert(0, os.path.join(os.path.dirname(PARENT_DIR), "docker_ver"))
+
+from tst_implementation import TernarySearchTree
+from core_structures import GlobalUserTrie
+
+
+def scan_search(store: dict, pattern: str) -> list:
+    """
+    Dict-based search as GlobalUserTrie first did it: a regex per username over the whole store.
+    """
+    results = []
+    for key in store:
+        if re.fullmatch(pattern.replace("*", ".*").replace("?", "."), key):
+            results.append(key)
+    return results
+
+
+def build(factory, usernames):
+    """
+    Adds every username to a new index. Returns (index, seconds, MB allocated).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = factory()
+    for name in usernames:
+        index.add(name, None)
+    index.regex_search("")  # GlobalUserTrie sorts names added since its last query
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+    tracemalloc.stop()
+    return index, elapsed, size
+
+
+def time_ms(fn, repeats: int) -> float:
+    """
+    Returns the mean milliseconds per call of fn over repeats calls.
+    """
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the TernarySearchTree with GlobalUserTrie")
+    parser.add_argument("--users", type=int, default=200000, help="Usernames per index")
+    parser.add_argument("--repeats", type=int, default=100, help="Calls per query")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    syllables = ["al", "bo", "ca", "da", "el", "fi", "go", "ha", "is", "jo", "ka", "lu"]
+    usernames = list({"".join(rng.choice(syllables) for _ in range(rng.randint(2, 5))) + str(rng.randint(0, 99))
+                      for _ in range(args.users)})
+
+    tst, tst_build, tst_mb = build(TernarySearchTree, usernames)
+    trie, trie_build, trie_mb = build(GlobalUserTrie, usernames)
+    print(f"[BENCH] {len(usernames)} usernames")
+    print(f"[BENCH] TernarySearchTree: built in {tst_build:6.2f}s, {tst_mb:7.1f} MB")
+    print(f"[BENCH] GlobalUserTrie   : built in {trie_build:6.2f}s, {trie_mb:7.1f} MB")
+
+    for pattern in ("alboca*", "al?o*", "*ka7", "a*l*u?", usernames[0]):
+        expected = trie.regex_search(pattern)
+        assert tst.regex_search(pattern) == expected
+        repeats = args.repeats if not pattern.startswith("*") else max(1, args.repeats // 20)
+        tst_ms = time_ms(lambda: tst.regex_search(pattern), repeats)
+        trie_ms = time_ms(lambda: trie.regex_search(pattern), repeats)
+        scan_ms = time_ms(lambda: scan_search(trie.store, pattern), 1)
+        print(f"[BENCH] {pattern:<16} {len(expected):6d} matches: TST {tst_ms:9.3f}ms  "
+              f"sorted index {trie_ms:9.3f}ms  dict scan {scan_ms:9.1f}ms")
+
+
+if __name__ == "__main__":
+    main()